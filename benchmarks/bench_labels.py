@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک آفلاین سه تولیدکننده لیبل (اصلی، جزئیات، میکس)
+
+سفارش‌های مصنوعی (از یک محصول تا ۵۰ محصول میکس و عادی) مثل cron به لیبل
+تبدیل می‌شوند: برای هر محصول میکس لیبل میکس، برای هر محصول عادی لیبل
+جزئیات و برای کل سفارش یک لیبل پشت. لینک QR محصولات از یک کاتالوگ موقت
+خوانده می‌شود که با WooCommerceAPI جعلی پر شده است (بدون شبکه).
+
+برای هر سناریو و نوع لیبل گزارش می‌شود:
+    wall_ms   زمان واقعی تولید و ذخیره فایل (میانه)
+    cpu_ms    زمان CPU همین پروسه (میانه)
+    bytes     حجم فایل نوشته‌شده (میانگین)
+و برای هر سناریو بیشینه RSS پروسه (MB) پس از اجرای آن.
+
+نتایج با فایل baseline مقایسه می‌شوند و اگر هر معیار بیش از --threshold
+بدتر شده باشد کد خروج 1 است.
+
+اجرا:
+    python benchmarks/bench_labels.py --update-baseline        # ثبت baseline
+    python benchmarks/bench_labels.py --threshold 0.2          # مقایسه
+    python benchmarks/bench_labels.py --linux --scenarios single items_10
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+try:
+    import resource
+except ImportError:  # ویندوز
+    resource = None
+
+import PIL
+
+import product_catalog
+from config import LABEL_CONFIG
+from render_mode import label_extension
+
+DEFAULT_BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'label_baseline.json')
+
+# نوع لیبل -> (ماژول ویندوز، ماژول لینوکس، تابع تولید)
+GENERATORS = {
+    'main': ('label_main', 'label_main_linux', 'generate_main_label'),
+    'details': ('label_details', 'label_details_linux', 'generate_details_label'),
+    'mixed': ('label_mixed', 'label_mixed_linux', 'generate_mixed_label'),
+}
+
+# سناریو -> (تعداد محصول، هر چندمین محصول میکس است؛ 0 = هیچ)
+SCENARIOS = {
+    'single': (1, 0),
+    'single_mixed': (1, 1),
+    'items_10': (10, 3),
+    'items_50_mixed': (50, 2),
+}
+
+COFFEES = ['عربیکا برزیل سانتوز', 'روبوستا هند', 'کلمبیا سوپریمو', 'اتیوپی یرگاچف', 'گواتمالا آنتیگوا']
+GRINDS = ['اسپرسو', 'موکاپات', 'فرانسه', 'ترک', 'دانه']
+
+
+class StubWooCommerceAPI:
+    """WooCommerceAPI جعلی: محصولات مصنوعی بدون درخواست شبکه"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def get_products(self, include=None, modified_after=None, per_page=100, page=1):
+        self.requests += 1
+        return [
+            {
+                'id': pid,
+                'slug': f'coffee-{pid}',
+                'permalink': f'https://offercoffee.ir/product/coffee-{pid}/',
+                'name': f'قهوه {pid}',
+                'date_modified_gmt': '2024-01-01T00:00:00',
+            }
+            for pid in (include or [])
+        ]
+
+
+def synthetic_order(order_id, items, mixed_every):
+    line_items = []
+    for i in range(items):
+        coffee = COFFEES[i % len(COFFEES)]
+        mixed = mixed_every and (i + 1) % mixed_every == 0
+        meta = [
+            {'key': 'weight', 'value': str(250 * (1 + i % 4))},
+            {'key': 'grinding_grade', 'value': GRINDS[i % len(GRINDS)]},
+        ]
+        if mixed:
+            second = COFFEES[(i + 1) % len(COFFEES)]
+            meta += [
+                {'key': 'blend_coffee', 'value': 'بله'},
+                {'key': f'قهوه {coffee}', 'value': '70%'},
+                {'key': f'قهوه {second}', 'value': '30%'},
+            ]
+        line_items.append({
+            'name': f"قهوه ترکیبی {coffee} و {COFFEES[(i + 1) % len(COFFEES)]}" if mixed else f"قهوه {coffee}",
+            'quantity': 1 + i % 3,
+            'product_id': 100 + i,
+            'meta_data': meta,
+        })
+    return {
+        'id': order_id,
+        'status': 'processing',
+        'total': '1250000',
+        'payment_method': 'cod',
+        'payment_method_title': 'پرداخت در محل',
+        'line_items': line_items,
+    }
+
+
+def is_item_mixed(item):
+    name = str(item.get('name', '')).lower()
+    return any(kw in name for kw in ['ترکیبی', 'میکس', 'combine', 'mixed', 'blend'])
+
+
+def plan_labels(order):
+    """لیبل‌های یکتای سفارش مثل cron: (نوع، سفارش تک‌محصولی)"""
+    jobs = []
+    for item in order['line_items']:
+        if int(item.get('quantity', 1)) <= 0:
+            continue
+        single = dict(order, line_items=[item])
+        if not jobs:
+            jobs.append(('main', single))
+        jobs.append(('mixed' if is_item_mixed(item) else 'details', single))
+    return jobs
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # لینوکس: کیلوبایت؛ مک: بایت
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_scenario(generators, order, iterations, out_dir):
+    jobs = plan_labels(order)
+    samples = {}
+    for iteration in range(iterations + 1):  # اجرای اول گرم‌کردن است (فونت‌ها، لایه ثابت، کش متن)
+        for n, (kind, single) in enumerate(jobs):
+            path = os.path.join(out_dir, f"{kind}_{n}{label_extension()}")
+            render = generators[kind]
+            wall, cpu = time.perf_counter(), time.process_time()
+            render(single, path)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if iteration:
+                entry = samples.setdefault(kind, {'wall': [], 'cpu': [], 'bytes': []})
+                entry['wall'].append(wall)
+                entry['cpu'].append(cpu)
+                entry['bytes'].append(os.path.getsize(path))
+
+    labels = {
+        kind: {
+            'count': len(entry['wall']) // iterations,
+            'wall_ms': round(statistics.median(entry['wall']) * 1000, 2),
+            'cpu_ms': round(statistics.median(entry['cpu']) * 1000, 2),
+            'bytes': int(statistics.mean(entry['bytes'])),
+        }
+        for kind, entry in sorted(samples.items())
+    }
+    order_ms = sum(v['wall_ms'] * v['count'] for v in labels.values())
+    return {'items': len(order['line_items']), 'labels': labels,
+            'order_wall_ms': round(order_ms, 1), 'peak_rss_mb': peak_rss_mb()}
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """لیست پسرفت‌ها: (سناریو، معیار، baseline، فعلی)"""
+    regressions = []
+
+    def check(scenario, metric, old, new):
+        if not old or new is None or new <= old * (1 + threshold):
+            return
+        # زمان‌های چند میلی‌ثانیه‌ای نویز زیادی دارند؛ اختلاف مطلق هم باید معنی‌دار باشد
+        if metric.endswith('_ms') and new - old < min_delta_ms:
+            return
+        regressions.append((scenario, metric, old, new))
+
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        check(name, 'peak_rss_mb', previous.get('peak_rss_mb'), current['peak_rss_mb'])
+        for kind, entry in current['labels'].items():
+            old = previous['labels'].get(kind)
+            if not old:
+                continue
+            for metric in ('wall_ms', 'cpu_ms', 'bytes'):
+                check(f"{name}/{kind}", metric, old[metric], entry[metric])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline label generator benchmark")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--linux", action="store_true", help="ماژول‌های _linux (بوم بزرگ‌تر، DPI 300)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="مسیر فایل baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="ذخیره نتایج به عنوان baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="حداکثر افزایش مجاز (0.2 = ۲۰٪)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="حداقل اختلاف مطلق زمان برای گزارش پسرفت")
+    args = parser.parse_args()
+
+    generators = {
+        kind: getattr(__import__(linux if args.linux else windows), func)
+        for kind, (windows, linux, func) in GENERATORS.items()
+    }
+
+    results = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'variant': 'linux' if args.linux else 'windows',
+            'color_mode': LABEL_CONFIG.get('color_mode', 'RGB'),
+            'iterations': args.iterations,
+        },
+        'scenarios': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # کاتالوگ موقت که از API جعلی پر می‌شود (لینک QR لیبل جزئیات)
+        catalog = product_catalog.ProductCatalog(os.path.join(tmp, 'products.db'))
+        product_catalog._catalog = catalog
+        api = StubWooCommerceAPI()
+
+        print(f"{'سناریو':<16} {'لیبل':<8} {'تعداد':>5} {'wall (ms)':>10} {'cpu (ms)':>9} {'فایل (KB)':>10}")
+        for n, name in enumerate(args.scenarios):
+            items, mixed_every = SCENARIOS[name]
+            order = synthetic_order(9000 + n, items, mixed_every)
+            catalog.ensure_products(api, product_catalog.order_product_ids(order))
+            out_dir = os.path.join(tmp, name)
+            os.makedirs(out_dir)
+            scenario = run_scenario(generators, order, args.iterations, out_dir)
+            results['scenarios'][name] = scenario
+            for kind, entry in scenario['labels'].items():
+                print(f"{name:<16} {kind:<8} {entry['count']:>5} {entry['wall_ms']:10.1f} {entry['cpu_ms']:9.1f} "
+                      f"{entry['bytes'] / 1024:10.1f}")
+            print(f"{name:<16} {'سفارش':<8} {sum(e['count'] for e in scenario['labels'].values()):>5} "
+                  f"{scenario['order_wall_ms']:10.1f}   RSS: {scenario['peak_rss_mb']} MB")
+        product_catalog._catalog = None
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 baseline در {args.baseline} ذخیره شد")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️ baseline یافت نشد ({args.baseline}) - با --update-baseline ثبت کنید")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    for key in ('variant', 'platform', 'color_mode'):
+        if baseline.get('meta', {}).get(key) != results['meta'][key]:
+            print(f"\n⚠️ baseline با {key}={baseline.get('meta', {}).get(key)} ثبت شده است (فعلی: {results['meta'][key]})")
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n❌ پسرفت بیش از {args.threshold:.0%} نسبت به baseline ({baseline['meta']['created_at']}):")
+        for scenario, metric, old, new in regressions:
+            print(f"   {scenario} {metric}: {old} → {new} (+{(new / old - 1):.0%})")
+        return 1
+    print(f"\n✅ بدون پسرفت بیش از {args.threshold:.0%} نسبت به baseline ({baseline['meta']['created_at']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
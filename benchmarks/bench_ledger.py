@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک ثبت سفارش‌های پردازش‌شده: فایل متنی قدیمی در برابر دفتر SQLite
+
+فایل متنی بعد از هر سفارش کامل مرتب و بازنویسی می‌شد (هزینه با رشد تاریخچه
+زیاد می‌شود)؛ دفتر برای هر سفارش فقط یک سطر درج می‌کند. برای هر اندازه
+تاریخچه، زمان ثبت یک دسته سفارش جدید و بررسی «قبلاً پردازش شده» گزارش می‌شود.
+
+اجرا:
+    python benchmarks/bench_ledger.py --history 1000 10000 50000 --batch 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+from order_ledger import OrderLedger, PRINTED
+
+
+def _legacy_save(path, ids):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for oid in sorted(ids):
+            f.write(f"{oid}\n")
+    os.replace(tmp, path)
+
+
+def _legacy_load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {int(line) for line in f if line.strip()}
+
+
+def _bench_text(tmp, history, batch):
+    path = os.path.join(tmp, f"processed_{history}.txt")
+    ids = set(range(1, history + 1))
+    _legacy_save(path, ids)
+
+    started = time.perf_counter()
+    processed = _legacy_load(path)
+    hits = sum(1 for oid in range(history - batch, history + batch) if oid in processed)
+    lookup_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for oid in range(history + 1, history + batch + 1):
+        processed.add(oid)
+        _legacy_save(path, processed)
+    return (time.perf_counter() - started) / batch, lookup_s, hits
+
+
+def _bench_ledger(tmp, history, batch):
+    ledger = OrderLedger(os.path.join(tmp, f"orders_{history}.db"))
+    with ledger._conn() as conn:
+        conn.executemany("INSERT INTO orders (id, state, created_at, updated_at) VALUES (?, ?, '', '')",
+                         [(oid, PRINTED) for oid in range(1, history + 1)])
+
+    started = time.perf_counter()
+    hits = len(ledger.done_ids(range(history - batch, history + batch)))
+    lookup_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for oid in range(history + 1, history + batch + 1):
+        ledger.mark(oid, PRINTED, source='bench')
+    return (time.perf_counter() - started) / batch, lookup_s, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="processed_orders.txt vs SQLite ledger benchmark")
+    parser.add_argument("--history", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="تعداد سفارش‌های قبلی")
+    parser.add_argument("--batch", type=int, default=200, help="سفارش‌های جدید در هر اجرا")
+    args = parser.parse_args()
+
+    print(f"{'تاریخچه':>8} {'روش':<7} {'ثبت هر سفارش (ms)':>18} {'بررسی دسته (ms)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for history in args.history:
+            for name, bench in (("text", _bench_text), ("sqlite", _bench_ledger)):
+                per_order, lookup_s, hits = bench(tmp, history, args.batch)
+                assert hits == args.batch + 1
+                print(f"{history:>8} {name:<7} {per_order * 1000:18.3f} {lookup_s * 1000:16.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مقایسه رندر RGB/JPEG با حالت‌های خاکستری (L) و ۱ بیتی (PNG/PBM)
+
+برای هر لیبل لینوکس و هر حالت رنگ: زمان رندر (با لایه ثابت کش‌شده)، زمان
+فشرده‌سازی فایل، حجم فایل و حافظه پیکسل‌های بوم گزارش می‌شود. حافظه بوم
+بر اساس ذخیره‌سازی داخلی Pillow است (RGB چهار بایت، L و 1 یک بایت برای هر
+پیکسل)؛ ستون packed حجم بیت‌های فشرده‌ای است که برای چاپگر ارسال می‌شود.
+
+اجرا:
+    python benchmarks/bench_mono.py --iterations 20
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+import label_details_linux
+import label_main_linux
+import label_mixed_linux
+from config import LABEL_CONFIG
+from render_mode import save_options
+from template_cache import invalidate_templates
+
+SAMPLE_ORDER = {
+    'id': 1234,
+    'total': '150000',
+    'payment_method': 'cod',
+    'payment_method_title': 'پرداخت در محل',
+    'line_items': [{
+        'name': 'قهوه اسپرسو میکس ۷۰/۳۰ عربیکا',
+        'quantity': 1,
+        'product_id': 11,
+        'meta_data': [
+            {'key': 'blend_coffee', 'value': 'بله'},
+            {'key': 'weight', 'value': '250'},
+            {'key': 'grinding_grade', 'value': 'اسپرسو'},
+        ],
+    }],
+}
+
+LABELS = {
+    'main': (label_main_linux, 'generate_main_label'),
+    'details': (label_details_linux, 'generate_details_label'),
+    'mixed': (label_mixed_linux, 'generate_mixed_label'),
+}
+
+# حالت رنگ -> فرمت فایل
+MODES = [
+    ('RGB', 'JPEG', None),
+    ('L', 'PNG', 'png'),
+    ('1', 'PNG', 'png'),
+    ('1', 'PPM', 'pbm'),
+]
+
+BYTES_PER_PIXEL = {'RGB': 4, 'L': 1, '1': 1}
+
+
+def _measure(module, func_name, fmt, iterations):
+    render = getattr(module, func_name)
+    img = render(dict(SAMPLE_ORDER))  # warm-up (فونت‌ها، لایه ثابت و کش متن)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        img = render(dict(SAMPLE_ORDER))
+    render_s = (time.perf_counter() - started) / iterations
+
+    options = save_options(module.SAVE_OPTIONS)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        buf = io.BytesIO()
+        img.save(buf, format=fmt, **options)
+    encode_s = (time.perf_counter() - started) / iterations
+
+    memory = img.width * img.height * BYTES_PER_PIXEL[img.mode]
+    packed = len(img.tobytes()) if img.mode == '1' else memory
+    return render_s, encode_s, len(buf.getvalue()), memory, packed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RGB/JPEG vs monochrome label benchmark")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    saved = dict(LABEL_CONFIG)
+    try:
+        print(f"{'لیبل':<9} {'حالت':<8} {'رندر (ms)':>10} {'ذخیره (ms)':>11} {'فایل (KB)':>10} "
+              f"{'بوم (KB)':>9} {'packed (KB)':>12}")
+        for kind, (module, func_name) in LABELS.items():
+            for mode, fmt, ext in MODES:
+                LABEL_CONFIG['color_mode'] = mode
+                if ext:
+                    LABEL_CONFIG['lossless_format'] = ext
+                invalidate_templates()
+                render_s, encode_s, size, memory, packed = _measure(module, func_name, fmt, args.iterations)
+                label = f"{mode}/{ext or 'jpg'}"
+                print(f"{kind:<9} {label:<8} {render_s * 1000:10.1f} {encode_s * 1000:11.2f} "
+                      f"{size / 1024:10.1f} {memory / 1024:9.0f} {packed / 1024:12.1f}")
+    finally:
+        LABEL_CONFIG.clear()
+        LABEL_CONFIG.update(saved)
+        invalidate_templates()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
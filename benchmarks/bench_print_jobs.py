@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک مسیر چاپ بدون ویندوز: یک کار برای هر لیبل در برابر یک کار چندصفحه‌ای
+
+یک سفارش نمونه (لیبل پشت + لیبل جزئیات برای هر محصول) رندر می‌شود و سپس
+با هر دو روش به پیاده‌سازی‌های file (PDF در پوشه موقت) و ezpl (شنونده TCP
+محلی در همین پروسه) ارسال می‌شود.
+
+اجرا:
+    python benchmarks/bench_print_jobs.py --items 10 --rounds 3
+"""
+
+import argparse
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+import ezpl_printer
+import label_details
+import label_main
+from printer_backend import EzplBackend, FileBackend
+
+SAMPLE_ITEM = {
+    'name': 'قهوه اسپرسو میکس ۷۰/۳۰ عربیکا',
+    'quantity': 1,
+    'product_id': 11,
+    'meta_data': [{'key': 'weight', 'value': '250'}, {'key': 'grinding_grade', 'value': 'اسپرسو'}],
+}
+
+
+class _Sink(socketserver.BaseRequestHandler):
+    received = 0
+
+    def handle(self):
+        while True:
+            chunk = self.request.recv(65536)
+            if not chunk:
+                break
+            _Sink.received += len(chunk)
+
+
+def _order_pages(items):
+    order = {'id': 1234, 'total': '150000', 'payment_method': 'cod', 'line_items': [SAMPLE_ITEM]}
+    pages = [(label_main.generate_main_label(order), items, 'main')]
+    for i in range(items):
+        item = dict(SAMPLE_ITEM, name=f"{SAMPLE_ITEM['name']} {i + 1}")
+        pages.append((label_details.generate_details_label(dict(order, line_items=[item])), 1, 'details'))
+    return pages
+
+
+def _time(backend, pages, per_label, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        if per_label:
+            for label, copies, kind in pages:
+                for _ in range(copies):
+                    backend.print_job([(label, 1, kind)])
+        else:
+            backend.print_job(pages)
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-label vs multi-page print job benchmark")
+    parser.add_argument("--items", type=int, default=10, help="تعداد محصولات سفارش نمونه")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = _order_pages(args.items)
+    page_count = sum(copies for _, copies, _ in pages)
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _Sink)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ezpl_printer.get_ezpl_printer().target = f"tcp://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as spool:
+        backends = [FileBackend(spool), EzplBackend()]
+        print(f"سفارش نمونه: {len(pages)} لیبل یکتا، {page_count} صفحه")
+        print(f"{'چاپگر':<8} {'کار به ازای هر لیبل (ms)':>24} {'یک کار (ms)':>12} {'تسریع':>8}")
+        for backend in backends:
+            _time(backend, pages, False, 1)  # warm-up (اتصال و گرافیک‌های ثابت)
+            per_label = _time(backend, pages, True, args.rounds)
+            single = _time(backend, pages, False, args.rounds)
+            print(f"{backend.name:<8} {per_label * 1000:24.1f} {single * 1000:12.1f} {per_label / single:7.1f}x")
+        jobs = len(os.listdir(spool))
+
+    ezpl_printer.get_ezpl_printer().close_connection()
+    server.shutdown()
+    print(f"\nfile: {jobs} فایل PDF نوشته شد؛ ezpl: {_Sink.received / 1024:.0f} KB ارسال شد")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
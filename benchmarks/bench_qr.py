@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+زمان ساخت QR و بررسی خوانایی آن در جای لیبل
+
+برای لینک‌های کوتاه و بلند (نامک فارسی percent-encoded با نسخه QR بالا)
+زمان ساخت بدون کش گزارش و بررسی می‌شود که تصویر دقیقاً size×size باشد، کل
+جای QR را پر کند (حداکثر یک ماژول حاشیه اضافه) و هیچ ماژولی بریده یا جابه‌جا
+نشده باشد: مرکز هر ماژول در تصویر نهایی با ماتریس QR مقایسه می‌شود.
+
+اجرا:
+    python benchmarks/bench_qr.py --size 150
+"""
+
+import argparse
+import os
+import sys
+import time
+from urllib.parse import quote
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+import qrcode
+
+from qr_cache import ERROR_CORRECT_M, QR_BORDER, _build_qr
+
+SLUGS = {
+    'short': 'https://offercoffee.ir/?p=123',
+    'persian_30': 'https://offercoffee.ir/product/' + quote('قهوه-اسپرسو-میکس-عربیکا-۷۰'),
+    'persian_60': 'https://offercoffee.ir/product/' + quote('قهوه-اسپرسو-میکس-۷۰-۳۰-عربیکا-روبوستا-برشته-متوسط-۲۵۰-گرمی'),
+    'persian_90': 'https://offercoffee.ir/product/' + quote(
+        'قهوه-اسپرسو-میکس-۷۰-۳۰-عربیکا-روبوستا-برشته-متوسط-۲۵۰-گرمی-آسیاب-برای-موکاپات-و-اسپرسوساز-خانگی'),
+}
+
+
+def modules_of(data, error_correction=ERROR_CORRECT_M):
+    qr = qrcode.QRCode(error_correction=error_correction, box_size=1, border=QR_BORDER)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version, qr.get_matrix()  # شامل حاشیه
+
+
+def check(img, size, matrix):
+    """(درست، اندازه ماژول به پیکسل، تعداد ماژول‌های نادرست)"""
+    if img.size != (size, size):
+        return False, 0, -1
+    count = len(matrix)
+    pixel = img.load()
+    # جای کد: یا کل تصویر (مقیاس‌شده) یا وسط‌چین با ماژول صحیح
+    module = size / count
+    offset = 0.0
+    if size - (size // count) * count < size // count:
+        module = size // count
+        offset = (size - module * count) // 2
+    wrong = 0
+    for row in range(count):
+        for col in range(count):
+            x = int(offset + (col + 0.5) * module)
+            y = int(offset + (row + 0.5) * module)
+            dark = pixel[x, y] == 0
+            wrong += dark != matrix[row][col]
+    return wrong == 0 and module * count >= size - module, module, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QR build time and slot fit check")
+    parser.add_argument("--size", type=int, nargs="+", default=[150, 180])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    ok = True
+    print(f"{'لینک':<12} {'طول':>5} {'نسخه':>5} {'size':>5} {'ماژول (px)':>11} {'ساخت (ms)':>10}  نتیجه")
+    for name, url in SLUGS.items():
+        version, matrix = modules_of(url)
+        for size in args.size:
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                img = _build_qr(url, size, ERROR_CORRECT_M)
+            ms = (time.perf_counter() - started) * 1000 / args.iterations
+            passed, module, wrong = check(img, size, matrix)
+            ok &= passed
+            result = "✅" if passed else f"❌ ({wrong} ماژول نادرست)"
+            print(f"{name:<12} {len(url):>5} {version:>5} {size:>5} {module:>11.2f} {ms:>10.2f}  {result}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک و مقایسه پیکسلی رسم متن با حاشیه در لیبل‌های لینوکس
+
+حلقه قدیمی (۸ بار رسم سفید با جابه‌جایی + متن اصلی) با رسم چیدمان
+(یک فراخوانی با stroke_width=1 در label_layout) مقایسه می‌شود. برای هر نوع لیبل زمان رندر
+کامل (لایه ثابت + اطلاعات سفارش) و تعداد پیکسل‌های متفاوت گزارش می‌شود.
+
+اجرا:
+    python benchmarks/bench_stroke.py --iterations 20 --max-diff-pixels 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+from PIL import Image, ImageChops
+
+import label_details_linux
+import label_layout
+import label_main_linux
+import label_mixed_linux
+from template_cache import invalidate_templates
+from text_cache import RTL_KWARGS
+
+SAMPLE_ORDER = {
+    'id': 1234,
+    'total': '150000',
+    'payment_method': 'cod',
+    'payment_method_title': 'پرداخت در محل',
+    'line_items': [{
+        'name': 'قهوه اسپرسو میکس ۷۰/۳۰ عربیکا',
+        'quantity': 1,
+        'product_id': 11,
+        'meta_data': [
+            {'key': 'blend_coffee', 'value': 'بله'},
+            {'key': 'pa_weight', 'value': '250 گرم'},
+            {'key': 'ترکیب', 'value': 'عربیکا ۷۰٪ روبوستا ۳۰٪'},
+        ],
+    }],
+}
+
+OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+new_draw_text = label_layout._draw_text
+
+
+def legacy_draw_text(draw, xy, shaped, font, rtl, stroke):
+    kwargs = RTL_KWARGS if rtl else {}
+    if stroke:
+        for adj in OFFSETS:
+            draw.text((xy[0] + adj[0], xy[1] + adj[1]), shaped, font=font, fill="white", **kwargs)
+    draw.text(xy, shaped, font=font, fill="black", **kwargs)
+
+
+# نوع لیبل -> (ماژول، تابع تولید)
+LABELS = {
+    'main': (label_main_linux, 'generate_main_label'),
+    'details': (label_details_linux, 'generate_details_label'),
+    'mixed': (label_mixed_linux, 'generate_mixed_label'),
+}
+
+
+def _render(module, func_name, path):
+    # لایه ثابت هم هر بار ساخته می‌شود تا هزینه تمام متن‌های لیبل سنجیده شود
+    invalidate_templates()
+    getattr(module, func_name)(dict(SAMPLE_ORDER), path)
+
+
+def _measure(module, func_name, path, iterations):
+    _render(module, func_name, path)  # warm-up (فونت‌ها و کش متن)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        _render(module, func_name, path)
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stroked text benchmark and pixel diff")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--max-diff-pixels", type=int, default=500,
+                        help="حداکثر تعداد پیکسل متفاوت مجاز برای هر لیبل")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'لیبل':<10} {'قدیمی (ms)':>12} {'جدید (ms)':>12} {'تسریع':>8} {'پیکسل متفاوت':>14}")
+        for kind, (module, func_name) in LABELS.items():
+            legacy_path = os.path.join(tmp, f"{kind}_legacy.bmp")
+            new_path = os.path.join(tmp, f"{kind}_new.bmp")
+
+            label_layout._draw_text = legacy_draw_text
+            try:
+                legacy_s = _measure(module, func_name, legacy_path, args.iterations)
+            finally:
+                label_layout._draw_text = new_draw_text
+            new_s = _measure(module, func_name, new_path, args.iterations)
+
+            with Image.open(legacy_path) as a, Image.open(new_path) as b:
+                diff = ImageChops.difference(a.convert("L"), b.convert("L"))
+                changed = diff.point(lambda v: 255 if v else 0).histogram()[255]
+
+            print(f"{kind:<10} {legacy_s * 1000:12.1f} {new_s * 1000:12.1f} {legacy_s / new_s:7.1f}x {changed:14d}")
+            if changed > args.max_diff_pixels:
+                failed = True
+
+    invalidate_templates()
+    if failed:
+        print(f"\n❌ تفاوت پیکسلی بیش از {args.max_diff_pixels} پیکسل")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بنچمارک شکل‌دهی و اندازه‌گیری متن فارسی
+
+مسیرهای مقایسه‌شده:
+  - reshape/bidi بدون کش (رفتار قبلی تابع fa_shape و draw.textbbox)
+  - reshape/bidi با کش text_cache
+  - raqm (فقط اگر Pillow با libraqm ساخته شده باشد)
+
+اجرا:
+    python benchmarks/bench_text_shaping.py --iterations 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+from PIL import ImageFont, features
+
+import text_cache
+from label_main import ADDRESS_LINES, DESC_LINES, FONT_FA
+from label_details import ADDRESSES
+
+SAMPLES = ADDRESS_LINES + DESC_LINES + ADDRESSES + [
+    "ترکیبات:",
+    "پروانه بهداشت",
+    "انقضا ۲ سال پس از تولید",
+    "قهوه اسپرسو میکس ۷۰/۳۰ عربیکا",
+]
+FONT_SIZE = 28
+
+
+def _run(label, func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in SAMPLES:
+            func(text)
+    elapsed = time.perf_counter() - started
+    calls = iterations * len(SAMPLES)
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms   {elapsed / calls * 1e6:8.2f} µs/متن")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persian text shaping benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"raqm: {'موجود' if features.check('raqm') else 'ناموجود'} - {len(SAMPLES)} متن × {args.iterations} تکرار\n")
+
+    basic = ImageFont.truetype(FONT_FA, FONT_SIZE, layout_engine=ImageFont.Layout.BASIC)
+
+    def uncached(text):
+        shaped = text_cache.shape_uncached(text) if not text_cache.HAS_RAQM else text
+        return basic.getbbox(shaped, mode="L")
+
+    def cached(text):
+        return text_cache.text_bbox(text, basic, fa=True)
+
+    baseline = _run("reshape/bidi (بدون کش)", uncached, args.iterations)
+    text_cache.clear_text_cache()
+    fast = _run("reshape/bidi (text_cache)", cached, args.iterations)
+    print(f"{'':<28} {baseline / fast:9.1f}x سریع‌تر")
+
+    if features.check("raqm"):
+        raqm = ImageFont.truetype(FONT_FA, FONT_SIZE, layout_engine=ImageFont.Layout.RAQM)
+        _run("raqm (بدون کش)", lambda t: raqm.getbbox(t, mode="L", direction="rtl", language="fa"), args.iterations)
+    else:
+        print(f"{'raqm (بدون کش)':<28} رد شد - libraqm نصب نیست")
+
+    print(f"\n{text_cache.text_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
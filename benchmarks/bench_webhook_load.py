@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تولید بار روی /webhook/new-order با امضای معتبر X-WC-Webhook-Signature
+
+سفارش‌ها (مصنوعی، یا دریافت‌شده از ووکامرس جعلی با --store) با نرخ ثابت
+(بار باز: زمان ارسال هر درخواست از قبل مشخص است) ارسال می‌شوند. برای هر
+درخواست زمان پاسخ HTTP (پذیرش در صف) و با پیگیری /webhook/jobs زمان
+انتهابه‌انتها تا پایان تولید و چاپ لیبل‌ها اندازه‌گیری می‌شود.
+
+برای نتیجه واقعی، سرور webhook باید به ووکامرس جعلی وصل باشد و چاپگر در
+حالت 'file' یا 'ezpl' (با ezpl_listener.py) باشد:
+    python fake_woocommerce.py --port 8081 --latency-ms 80
+    # config.py: WOOCOMMERCE_CONFIG['site_url'] = 'http://127.0.0.1:8081'
+    python webhook_server.py
+    python benchmarks/bench_webhook_load.py --rate 5 --requests 200
+
+شناسه سفارش‌ها هر بار تازه است (--start-id) تا دفتر سفارش‌ها آن‌ها را
+تکراری حساب نکند.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+import requests
+
+from fake_woocommerce import synthetic_order
+from woocommerce_api import WooCommerceAPI
+
+FINISHED = ('done', 'failed')
+
+
+def sign(body: bytes, secret: str) -> str:
+    """امضای webhook ووکامرس: base64(HMAC-SHA256(body))"""
+    return base64.b64encode(hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()).decode('ascii')
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # nearest-rank
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def load_orders(args):
+    if args.store:
+        api = WooCommerceAPI(args.store, 'ck_load_test', 'cs_load_test')
+        orders = list(api.iter_orders(['processing', 'on-hold']))
+        if not orders:
+            raise SystemExit(f"❌ سفارشی از {args.store} دریافت نشد")
+        orders = [orders[i % len(orders)] for i in range(args.requests)]
+    else:
+        rng = random.Random(args.seed)
+        orders = [synthetic_order(0, datetime.utcnow(), rng) for _ in range(args.requests)]
+    if not args.keep_ids:
+        orders = [dict(order, id=args.start_id + i) for i, order in enumerate(orders)]
+    return orders
+
+
+class LoadRun:
+    def __init__(self, args, orders):
+        self.args = args
+        self.orders = orders
+        self.url = args.url.rstrip('/')
+        self._local = threading.local()
+        self.results = [None] * len(orders)  # هر درخواست: dict
+        self.started = None
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def send(self, index, scheduled):
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        body = json.dumps(self.orders[index], ensure_ascii=False).encode('utf-8')
+        headers = {
+            'Content-Type': 'application/json',
+            'X-WC-Webhook-Topic': 'order.created',
+            'X-WC-Webhook-Delivery-ID': uuid.uuid4().hex,
+            'X-WC-Webhook-Signature': sign(body, self.args.secret),
+        }
+        sent = time.perf_counter()
+        result = {'sent': sent, 'lag': sent - scheduled, 'status': None, 'job_id': None}
+        try:
+            response = self._session().post(f"{self.url}/webhook/new-order", data=body, headers=headers,
+                                             timeout=self.args.timeout)
+            result['status'] = response.status_code
+            if response.status_code == 202:
+                result['job_id'] = response.json().get('job_id')
+        except requests.exceptions.RequestException as e:
+            result['error'] = str(e)
+        result['accept'] = time.perf_counter() - sent
+        self.results[index] = result
+
+    def poll_completion(self, deadline):
+        """پیگیری پایان کارها تا زمانی که همه تمام شوند یا مهلت برسد"""
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            pending = {r['job_id']: r for r in self.results
+                       if r and r['job_id'] and 'finished' not in r}
+            sending = any(r is None for r in self.results)
+            if not pending and not sending:
+                return True
+            ids = list(pending)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                try:
+                    response = session.get(f"{self.url}/webhook/jobs",
+                                           params={'ids': ','.join(map(str, chunk))}, timeout=10)
+                    statuses = response.json()
+                except (requests.exceptions.RequestException, ValueError):
+                    continue
+                now = time.perf_counter()
+                for job_id in chunk:
+                    status = statuses.get(str(job_id), {}).get('status')
+                    if status in FINISHED:
+                        pending[job_id]['finished'] = now
+                        pending[job_id]['job_status'] = status
+            time.sleep(self.args.poll_interval)
+        return False
+
+    def run(self):
+        interval = 1.0 / self.args.rate
+        self.started = time.perf_counter() + 0.2
+        poller = None
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            if not self.args.no_wait:
+                deadline = self.started + len(self.orders) * interval + self.args.drain_timeout
+                poller = threading.Thread(target=self.poll_completion, args=(deadline,), daemon=True)
+                poller.start()
+            for i in range(len(self.orders)):
+                executor.submit(self.send, i, self.started + i * interval)
+        if poller:
+            poller.join()
+
+    def report(self):
+        results = [r for r in self.results if r]
+        accepted = [r for r in results if r['status'] == 202]
+        errors = [r for r in results if r['status'] is None]
+        rejected = [r for r in results if r['status'] not in (None, 202)]
+        finished = [r for r in accepted if 'finished' in r]
+        done = [r for r in finished if r['job_status'] == 'done']
+
+        accept_ms = [r['accept'] * 1000 for r in accepted]
+        e2e_ms = [(r['finished'] - r['sent']) * 1000 for r in done]
+        send_span = max(r['sent'] for r in results) - self.started if results else 0
+        finish_span = (max(r['finished'] for r in finished) - self.started) if finished else 0
+
+        summary = {
+            'requests': len(results),
+            'accepted': len(accepted),
+            'rejected': len(rejected),
+            'errors': len(errors),
+            'completed': len(done),
+            'failed_jobs': len(finished) - len(done),
+            'unfinished': len(accepted) - len(finished),
+            'target_rate': self.args.rate,
+            'send_rate': round(len(results) / send_span, 2) if send_span else None,
+            'completion_rate': round(len(done) / finish_span, 2) if finish_span else None,
+            'max_send_lag_ms': round(max((r['lag'] for r in results), default=0) * 1000, 1),
+            'accept_ms': {f'p{p}': _round(percentile(accept_ms, p)) for p in (50, 95, 99)},
+            'end_to_end_ms': {f'p{p}': _round(percentile(e2e_ms, p)) for p in (50, 95, 99)},
+        }
+
+        print(f"📨 {summary['requests']} درخواست با نرخ هدف {self.args.rate}/s (واقعی {summary['send_rate']}/s، "
+              f"بیشینه تأخیر ارسال {summary['max_send_lag_ms']}ms)")
+        print(f"   پذیرفته {summary['accepted']}، رد شده {summary['rejected']}، خطای اتصال {summary['errors']}")
+        print(f"{'':<20} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+        for name, key in (('پذیرش (HTTP)', 'accept_ms'), ('انتها‌به‌انتها', 'end_to_end_ms')):
+            values = summary[key]
+            print(f"{name:<20} {_fmt(values['p50']):>9} {_fmt(values['p95']):>9} {_fmt(values['p99']):>9}")
+        if not self.args.no_wait:
+            print(f"✅ {summary['completed']} سفارش کامل شد ({summary['completion_rate']} سفارش/ثانیه)، "
+                  f"{summary['failed_jobs']} ناموفق، {summary['unfinished']} ناتمام")
+        return summary
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signed webhook load generator")
+    parser.add_argument("--url", default="http://127.0.0.1:5443", help="آدرس سرور webhook")
+    parser.add_argument("--secret", default=os.environ.get('WEBHOOK_SECRET', 'your_webhook_secret_here'),
+                        help="کلید مخفی webhook (همان WEBHOOK_SECRET سرور)")
+    parser.add_argument("--rate", type=float, default=5.0, help="درخواست در ثانیه")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32, help="حداکثر درخواست همزمان")
+    parser.add_argument("--store", help="آدرس ووکامرس جعلی برای بازپخش سفارش‌های آن (پیش‌فرض: سفارش مصنوعی)")
+    parser.add_argument("--start-id", type=int, default=int(time.time()) % 1000000 * 1000,
+                        help="اولین شناسه سفارش (پیش‌فرض: بر اساس زمان، یکتا در هر اجرا)")
+    parser.add_argument("--keep-ids", action="store_true", help="شناسه سفارش‌ها تغییر نکند")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0, help="مهلت هر درخواست HTTP")
+    parser.add_argument("--no-wait", action="store_true", help="فقط زمان پذیرش؛ منتظر پایان پردازش نمی‌ماند")
+    parser.add_argument("--drain-timeout", type=float, default=300.0,
+                        help="مهلت انتظار برای پایان کارها پس از آخرین ارسال")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--json", help="ذخیره خلاصه نتایج در این فایل")
+    args = parser.parse_args()
+
+    run = LoadRun(args, load_orders(args))
+    run.run()
+    summary = run.report()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 0 if summary['accepted'] == summary['requests'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مقایسه حالت‌های اجرای سرور webhook زیر بار یکسان
+
+هر حالت (flask = سرور توسعه تک‌پروسه‌ای فعلی، gunicorn با preload، waitress)
+در یک پروسه جدا با پوشه داده موقت اجرا می‌شود و به ووکامرس جعلی داخلی وصل
+است (چاپگر در حالت 'file'). بعد از چند درخواست گرم‌کردن، بار باز
+bench_webhook_load.py با نرخ ثابت ارسال و زمان پذیرش، زمان انتها‌به‌انتها،
+توان عملیاتی و حافظه (PSS مجموع پروسه‌ها، فقط لینوکس) گزارش می‌شود.
+
+اجرا:
+    python benchmarks/bench_wsgi.py --rate 20 --requests 300 --workers 4
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.chdir(BASE_DIR)
+
+import requests
+
+from bench_webhook_load import LoadRun, load_orders
+from fake_woocommerce import FakeStore, start_fake_store
+from product_catalog import ProductCatalog
+
+# پروسه سرور: تنظیمات به ووکامرس جعلی و پوشه موقت اشاره می‌کنند
+_SERVER_CODE = """
+import sys
+sys.path.insert(0, {base!r})
+from config import (WOOCOMMERCE_CONFIG, PRINTER_CONFIG, QUEUE_CONFIG, LEDGER_CONFIG,
+                    CATALOG_CONFIG, LABEL_CONFIG)
+WOOCOMMERCE_CONFIG.update(site_url={store!r}, consumer_key='ck_bench', consumer_secret='cs_bench')
+PRINTER_CONFIG.update(mode='file', spool_dir={data!r} + '/print_spool')
+QUEUE_CONFIG['db_path'] = {data!r} + '/jobs.db'
+LEDGER_CONFIG.update(db_path={data!r} + '/orders.db', legacy_path={data!r} + '/processed_orders.txt')
+CATALOG_CONFIG['db_path'] = {catalog!r}
+LABEL_CONFIG['output_dir'] = {data!r} + '/labels'
+import wsgi
+wsgi.serve({mode!r}, '127.0.0.1', {port}, {workers}, {threads})
+"""
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def process_tree_pss(pid):
+    """(مجموع PSS به مگابایت، تعداد پروسه‌ها) یا (None، 0) اگر /proc در دسترس نباشد"""
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        stack.extend(_children(current))
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            return None, 0
+    return round(total_kb / 1024, 1), len(pids)
+
+
+def wait_healthy(url, process, timeout=90):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if requests.get(f"{url}/health", timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.3)
+    return False
+
+
+def stop(process):
+    if process.poll() is not None:
+        return
+    if hasattr(os, 'killpg'):
+        os.killpg(process.pid, signal.SIGTERM)
+    else:
+        process.terminate()
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def load_args(args, url, requests_count, start_id, no_wait=False):
+    return argparse.Namespace(
+        url=url, secret=args.secret, rate=args.rate, requests=requests_count, concurrency=args.concurrency,
+        store=None, start_id=start_id, keep_ids=False, seed=args.seed, timeout=30.0, no_wait=no_wait,
+        drain_timeout=args.drain_timeout, poll_interval=0.05,
+    )
+
+
+def run_mode(args, mode, store_url, catalog_path, tmp, port, start_id):
+    data = os.path.join(tmp, mode)
+    os.makedirs(data)
+    code = _SERVER_CODE.format(base=BASE_DIR, store=store_url, data=data, catalog=catalog_path,
+                               mode=mode, port=port, workers=args.workers, threads=args.threads)
+    log = open(os.path.join(data, 'server.log'), 'w', encoding='utf-8')
+    process = subprocess.Popen([sys.executable, '-c', code], stdout=log, stderr=subprocess.STDOUT,
+                               start_new_session=hasattr(os, 'killpg'))
+    url = f"http://127.0.0.1:{port}"
+    try:
+        started = time.perf_counter()
+        if not wait_healthy(url, process):
+            print(f"❌ {mode}: سرور بالا نیامد (لاگ: {log.name})")
+            return None
+        startup_s = time.perf_counter() - started
+
+        # گرم‌کردن: اتصال‌ها، کش متن‌ها و پروسه‌ها
+        warm = load_args(args, url, args.warmup, start_id)
+        warm_run = LoadRun(warm, load_orders(warm))
+        warm_run.run()
+
+        measured = load_args(args, url, args.requests, start_id + args.warmup)
+        run = LoadRun(measured, load_orders(measured))
+        run.run()
+        print(f"\n🧪 {mode}")
+        summary = run.report()
+        summary['startup_s'] = round(startup_s, 2)
+        summary['pss_mb'], summary['processes'] = process_tree_pss(process.pid)
+        return summary
+    finally:
+        stop(process)
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook server modes under load (flask vs gunicorn vs waitress)")
+    available = ['flask'] + [name for name in ('gunicorn', 'waitress') if importlib.util.find_spec(name)]
+    parser.add_argument("--modes", nargs="+", default=available, choices=['flask', 'gunicorn', 'waitress'])
+    parser.add_argument("--rate", type=float, default=10.0, help="درخواست در ثانیه")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20, help="درخواست‌های گرم‌کردن (گزارش نمی‌شوند)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=0, help="پروسه‌های gunicorn (0 = SERVER_CONFIG)")
+    parser.add_argument("--threads", type=int, default=0, help="ترد هر پروسه (0 = SERVER_CONFIG)")
+    parser.add_argument("--port", type=int, default=5601)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="تأخیر ووکامرس جعلی")
+    parser.add_argument("--drain-timeout", type=float, default=300.0)
+    parser.add_argument("--secret", default='your_webhook_secret_here', help="WEBHOOK_SECRET سرور")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="ذخیره نتایج در این فایل")
+    args = parser.parse_args()
+
+    store = FakeStore(orders=0, seed=args.seed, latency_ms=args.latency_ms)
+    server = start_fake_store(store)
+    store_url = "http://127.0.0.1:%d" % server.server_address[1]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # کاتالوگ محصولات مشترک و از قبل پر تا همه حالت‌ها شرایط یکسان داشته باشند
+        catalog_path = os.path.join(tmp, 'products.db')
+        ProductCatalog(catalog_path).upsert_many(store.products)
+        start_id = random.Random().randrange(1, 1000) * 1000000
+        for i, mode in enumerate(args.modes):
+            summary = run_mode(args, mode, store_url, catalog_path, tmp, args.port + i,
+                               start_id + i * 100000)
+            if summary:
+                results[mode] = summary
+    server.shutdown()
+
+    print(f"\n{'حالت':<10} {'پذیرش p50/p95':>16} {'انتها‌به‌انتها p50/p95/p99':>28} {'سفارش/ث':>9} "
+          f"{'شروع (s)':>9} {'PSS (MB)':>12}")
+    for mode, s in results.items():
+        accept, e2e = s['accept_ms'], s['end_to_end_ms']
+        memory = f"{s['pss_mb']} ({s['processes']})" if s['pss_mb'] is not None else '-'
+        print(f"{mode:<10} {_fmt(accept['p50']):>7}/{_fmt(accept['p95']):<8} "
+              f"{_fmt(e2e['p50']):>9}/{_fmt(e2e['p95'])}/{_fmt(e2e['p99']):<9} "
+              f"{_fmt(s['completion_rate']):>9} {s['startup_s']:>9} {memory:>12}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0 if len(results) == len(args.modes) else 1
+
+
+def _fmt(value):
+    return '-' if value is None else f"{value:.1f}"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
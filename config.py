@@ -2,12 +2,98 @@
 WOOCOMMERCE_CONFIG = {
     'site_url': 'https://offercoffee.ir',  # آدرس سایت شما
     'consumer_key': 'ck_your_consumer_key_here',
-    'consumer_secret': 'cs_your_consumer_secret_here'
+    'consumer_secret': 'cs_your_consumer_secret_here',
+    # تنظیمات اتصال HTTP
+    'connect_timeout': 5,   # ثانیه
+    'read_timeout': 30,     # ثانیه
+    'max_retries': 3,       # تلاش مجدد برای خطاهای 5xx و اتصال
+    'backoff_factor': 0.5,  # فاصله تلاش‌ها: 0.5، 1، 2 ثانیه ...
+    'pool_size': 10         # تعداد اتصال‌های باز نگه‌داشته‌شده
 }
 
 # تنظیمات لیبل
 LABEL_CONFIG = {
     'output_dir': 'labels',
     'font_en': 'Galatican.ttf',
-    'font_fa': 'BTitrBd.ttf'
+    'font_fa': 'BTitrBd.ttf',
+    'qr_cache_size': 256,   # حداکثر تعداد QR کد نگهداری‌شده در حافظه
+    'text_cache_size': 4096,  # حداکثر تعداد متن شکل‌دهی‌شده/اندازه‌گیری‌شده در حافظه
+    'archive_labels': True,   # ذخیره غیرهمزمان لیبل‌ها در output_dir (چاپ مستقیماً از حافظه است)
+    'color_mode': 'RGB',      # 'RGB' (JPEG)، 'L' (خاکستری) یا '1' (سیاه و سفید) - دو حالت آخر با فرمت بدون افت
+    'mono_threshold': 160,    # آستانه سیاه و سفید در حالت '1' (تنظیم‌شده برای فونت BTitr)
+    'lossless_format': 'png'  # فرمت بایگانی در حالت‌های L و 1: 'png' یا 'pbm'
+}
+
+# کپی محلی کاتالوگ محصولات (برای لینک QR لیبل جزئیات بدون درخواست شبکه)
+CATALOG_CONFIG = {
+    'db_path': 'data/products.db'
+}
+
+# تنظیمات پردازشگر زمان‌بندی‌شده (cron_processor.py)
+CRON_CONFIG = {
+    'statuses': ['processing', 'on-hold'],       # وضعیت‌هایی که پرداخت‌شده حساب می‌شوند
+    'per_page': 100,
+    'cursor_path': 'data/order_sync_cursor.json',  # نشانگر همگام‌سازی افزایشی
+    'cursor_overlap_seconds': 60,                  # همپوشانی برای جبران اختلاف ساعت
+    # حالت دائمی (python cron_processor.py --daemon)
+    'daemon_poll_seconds': 15,        # فاصله دورها وقتی سفارش جدید می‌رسد
+    'daemon_idle_max_seconds': 120,   # حداکثر فاصله دورها در زمان بیکاری فروشگاه
+    'daemon_backoff': 2.0             # ضریب افزایش فاصله بعد از هر دور بدون سفارش
+}
+
+# دفتر سفارش‌ها و لیبل‌های پردازش‌شده (order_ledger.py)
+LEDGER_CONFIG = {
+    'db_path': 'data/orders.db',
+    'legacy_path': 'data/processed_orders.txt',  # فایل متنی قدیمی؛ یک بار منتقل می‌شود
+    'lease_seconds': 600,  # مهلت اجاره پردازش سفارش (بعد از توقف ناگهانی پروسه دوباره قابل claim است)
+    'max_attempts': 3  # سفارش ناموفق بعد از این تعداد تلاش دیگر نشانگر همگام‌سازی cron را عقب نگه نمی‌دارد
+}
+
+# صف پایدار سفارش‌های webhook (پردازش در پس‌زمینه)
+QUEUE_CONFIG = {
+    'db_path': 'data/jobs.db',
+    'workers': 2,                # تعداد تردهای تولید/چاپ لیبل
+    'max_attempts': 3,           # حداکثر تلاش برای هر سفارش
+    'retry_delay_seconds': 30,   # تأخیر تلاش مجدد (ضرب در شماره تلاش)
+    'poll_interval': 1.0         # ثانیه
+}
+
+# رندر موازی لیبل‌ها (render_executor.py)
+RENDER_CONFIG = {
+    'workers': 0  # تعداد پروسه‌های رندر؛ 0 = خودکار (حداکثر ۴)، 1 = بدون پروسه جداگانه
+}
+
+# خروجی چاپگر (printer_backend.py): 'gdi' (درایور ویندوز)، 'ezpl' (دستورات خام EZPL روی
+# شبکه/فایل دستگاه) یا 'file' (هر کار چاپ یک PDF در spool_dir - برای تست روی لینوکس)
+PRINTER_CONFIG = {
+    'mode': 'gdi',
+    'printer_name': 'Godex G500',       # نام چاپگر ویندوز (حالت gdi)
+    'spool_dir': 'data/print_spool',    # حالت file
+    'target': 'tcp://127.0.0.1:9100',  # tcp://host:port یا مسیر دستگاه مثل /dev/usb/lp0
+    'timeout': 10,
+    'dpi': 203,                 # رزولوشن Godex G500
+    'label_width_mm': 80,
+    'label_height_mm': 100,
+    'gap_mm': 3,
+    'darkness': 10,             # ^H
+    'speed': 3,                 # ^S (اینچ بر ثانیه)
+    'threshold': 128,           # آستانه تبدیل به سیاه و سفید
+    'cache_static': True        # ذخیره لایه ثابت لیبل‌ها در حافظه چاپگر
+}
+
+# متریک‌های Prometheus (metrics.py): /metrics در webhook و فایل snapshot در پایان هر اجرای cron
+METRICS_CONFIG = {
+    'buckets': [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],  # ثانیه
+    'snapshot_path': 'data/cron_metrics.prom'  # قالب textfile collector در node_exporter
+}
+
+# وب‌سرور تولید (wsgi.py / start_webhook.py)
+SERVER_CONFIG = {
+    'server': 'auto',       # 'gunicorn' (لینوکس، چندپروسه‌ای)، 'waitress' (ویندوز)، 'flask' (سرور توسعه)؛ auto = اولین موجود
+    'host': '0.0.0.0',
+    'port': 5443,
+    'workers': 0,           # پروسه‌های gunicorn؛ 0 = خودکار (حداکثر ۴)
+    'threads': 4,           # ترد هر پروسه gunicorn / تردهای waitress
+    'render_workers': 1,    # پروسه‌های رندر در پروسه مصرف‌کننده صف؛ 1 = رندر در همان پروسه با کش‌های preload‌شده
+    'timeout': 60           # مهلت پاسخ هر پروسه gunicorn (ثانیه)
 }
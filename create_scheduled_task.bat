@@ -3,7 +3,12 @@ REM حذف task قبلی اگر وجود داشته باشد
 schtasks /Delete /TN "OfferCoffee Cron" /F 2>nul
 
 REM ایجاد task جدید با استفاده از batch file
-schtasks /Create /TN "OfferCoffee Cron" /SC MINUTE /MO 15 /TR "%~dp0run_offercoffee.bat" /RL HIGHEST /RU SYSTEM
+REM create_scheduled_task.bat daemon: یک پروسه دائمی هنگام روشن شدن سیستم (cron_processor.py --daemon)
+if /I "%~1"=="daemon" (
+    schtasks /Create /TN "OfferCoffee Cron" /SC ONSTART /TR "\"%~dp0run_offercoffee.bat\" --daemon" /RL HIGHEST /RU SYSTEM
+) else (
+    schtasks /Create /TN "OfferCoffee Cron" /SC MINUTE /MO 15 /TR "%~dp0run_offercoffee.bat" /RL HIGHEST /RU SYSTEM
+)
 
 echo Scheduled task created successfully!
 schtasks /Query /TN "OfferCoffee Cron" /V /FO LIST
@@ -3,18 +3,24 @@
 
 """
 Cron-friendly processor for WooCommerce orders.
-- Fetches recently paid orders
+- Fetches paid orders modified since the last run (all pages, persisted cursor)
 - Generates labels (mixed or per-item back + details)
-- Skips already-processed orders using a local state file
+- Skips already-processed orders using the SQLite order ledger
 - Logs to logs/ with UTF-8
+- --daemon: stays resident and polls every few seconds (warm caches and HTTP session)
 """
 
 import os
 import sys
 import json
 import logging
-from datetime import datetime
-from typing import Dict, Any, List, Set
+import logging.handlers
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import requests
 
 # Ensure we run from the project root (so relative font files work)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -22,21 +28,14 @@ os.chdir(BASE_DIR)
 
 # Local imports
 from woocommerce_api import WooCommerceAPI
-from config import WOOCOMMERCE_CONFIG, LABEL_CONFIG
-from label_main import generate_main_label
-from label_details import generate_details_label
-from label_mixed import generate_mixed_label
-
-# Import printing functionality
-try:
-    import win32print, win32ui
-    from PIL import Image, ImageWin
-    PRINTING_AVAILABLE = True
-except ImportError:
-    PRINTING_AVAILABLE = False
-
-# تنظیمات چاپگر
-PRINTER_NAME = "Godex G500"  # نام چاپگر
+from config import WOOCOMMERCE_CONFIG, LABEL_CONFIG, CRON_CONFIG, LEDGER_CONFIG
+from product_catalog import get_catalog, order_product_ids
+from render_executor import get_render_executor, shutdown_render_executor, template_version
+from label_archive import get_archiver
+from printer_backend import get_printer_backend, close_printer_backend
+from render_mode import label_extension
+from order_ledger import get_ledger, BUSY, CLAIMED, RENDERED, PRINTED, FAILED
+from metrics import get_metrics
 
 
 # -----------------------
@@ -48,10 +47,14 @@ def ensure_directories() -> None:
     os.makedirs(os.path.join(BASE_DIR, 'data'), exist_ok=True)
 
 
-def setup_logger() -> logging.Logger:
+def setup_logger(rotate: bool = False) -> logging.Logger:
+    """لاگ هر اجرا در فایل جدا؛ با rotate=True (حالت دائمی) یک فایل که هر شب چرخانده می‌شود"""
     ensure_directories()
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    logfile = os.path.join('logs', f'cron_processor_{timestamp}.log')
+    if rotate:
+        logfile = os.path.join('logs', 'cron_processor_daemon.log')
+    else:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        logfile = os.path.join('logs', f'cron_processor_{timestamp}.log')
 
     # Try to ensure stdout is UTF-8 (cron often runs with minimal locales)
     try:
@@ -64,7 +67,10 @@ def setup_logger() -> logging.Logger:
     logger.setLevel(logging.INFO)
     logger.handlers.clear()
 
-    fh = logging.FileHandler(logfile, encoding='utf-8')
+    if rotate:
+        fh = logging.handlers.TimedRotatingFileHandler(logfile, when='midnight', backupCount=14, encoding='utf-8')
+    else:
+        fh = logging.FileHandler(logfile, encoding='utf-8')
     sh = logging.StreamHandler(sys.stdout)
 
     fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
@@ -78,63 +84,6 @@ def setup_logger() -> logging.Logger:
     return logger
 
 
-def print_label(image_path: str, logger: logging.Logger) -> bool:
-    """چاپ لیبل با مدیریت حالت وجود چندین چاپگر"""
-    try:
-        if not PRINTING_AVAILABLE:
-            logger.info(f"💾 چاپگر در دسترس نیست - تصویر ذخیره شد: {image_path}")
-            return True
-            
-        # بررسی وجود چاپگر با لیست دقیق‌تر چاپگرها
-        try:
-            all_printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
-            printer_names = [printer[2] for printer in all_printers]
-            logger.info(f"🖨️ چاپگرهای در دسترس: {', '.join(printer_names) if printer_names else 'هیچ'}")
-            
-            # جستجوی دقیق‌تر نام چاپگر (با در نظر گیری حروف کوچک و بزرگ)
-            matching_printer = None
-            for printer_name in printer_names:
-                if PRINTER_NAME.lower() in printer_name.lower() or printer_name.lower() in PRINTER_NAME.lower():
-                    matching_printer = printer_name
-                    logger.info(f"✅ چاپگر مورد نظر یافت شد: {matching_printer}")
-                    break
-            
-            if not matching_printer:
-                logger.warning(f"⚠️ چاپگر '{PRINTER_NAME}' در لیست چاپگرهای موجود نیست")
-                logger.warning(f"📋 چاپگرهای موجود: {printer_names}")
-                return True
-            
-            # بارگذاری و چاپ تصویر
-            img = Image.open(image_path)
-            
-            # باز کردن چاپگر
-            hprinter = win32print.OpenPrinter(matching_printer)
-            pdc = win32ui.CreateDC()
-            pdc.CreatePrinterDC(matching_printer)
-            pdc.StartDoc("Offer Coffee Label")
-            pdc.StartPage()
-            
-            dib = ImageWin.Dib(img)
-            dib.draw(pdc.GetHandleOutput(), (0, 0, img.width, img.height))
-            
-            pdc.EndPage()
-            pdc.EndDoc()
-            pdc.DeleteDC()
-            
-            logger.info(f"✅ لیبل با موفقیت چاپ شد: {os.path.basename(image_path)}")
-            return True
-            
-        except Exception as printer_error:
-            logger.error(f"❌ خطا در دسترسی به چاپگر: {printer_error}")
-            return False
-        
-    except Exception as e:
-        logger.error(f"❌ خطا در چاپ - تصویر ذخیره شد: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return False
-
-
 def is_payment_completed(order_details: Dict[str, Any], logger: logging.Logger) -> bool:
     try:
         payment_status = str(order_details.get('status', '')).lower()
@@ -160,6 +109,56 @@ def is_payment_completed(order_details: Dict[str, Any], logger: logging.Logger)
         return False
 
 
+# فیلدهایی که تولید لیبل و بررسی پرداخت از سفارش لازم دارند
+REQUIRED_ORDER_FIELDS = ('id', 'status', 'total', 'payment_method', 'line_items')
+REQUIRED_ITEM_FIELDS = ('name', 'quantity', 'product_id')
+
+
+def is_order_payload_complete(order: Dict[str, Any]) -> bool:
+    """آیا داده سفارش از endpoint لیست برای تولید لیبل کافی است (بدون درخواست جزئیات)"""
+    if any(field not in order for field in REQUIRED_ORDER_FIELDS):
+        return False
+    line_items = order.get('line_items')
+    if not isinstance(line_items, list):
+        return False
+    return all(
+        isinstance(item, dict) and all(field in item for field in REQUIRED_ITEM_FIELDS)
+        for item in line_items
+    )
+
+
+def resolve_order_details(api: WooCommerceAPI, candidates: List[Dict[str, Any]],
+                          logger: logging.Logger) -> Dict[int, Dict[str, Any]]:
+    """
+    داده کامل سفارش‌ها: مستقیماً از payload لیست، و فقط برای سفارش‌های ناقص
+    دریافت گروهی با orders?include=... (به جای یک درخواست برای هر سفارش)
+    """
+    details: Dict[int, Dict[str, Any]] = {}
+    incomplete: List[int] = []
+    for order in candidates:
+        oid = int(order['id'])
+        if is_order_payload_complete(order):
+            details[oid] = order
+        else:
+            incomplete.append(oid)
+
+    requests_made = 0
+    if incomplete:
+        fetched, requests_made = api.get_orders_by_ids(incomplete, per_page=CRON_CONFIG.get('per_page', 100))
+        for order in fetched:
+            try:
+                details[int(order.get('id'))] = order
+            except (TypeError, ValueError):
+                continue
+
+    saved = len(candidates) - requests_made
+    logger.info(
+        f"📦 {len(candidates) - len(incomplete)} سفارش از داده لیست، {len(incomplete)} سفارش با "
+        f"{requests_made} درخواست گروهی - {saved} درخواست جزئیات صرفه‌جویی شد"
+    )
+    return details
+
+
 def is_mixed_order(order_details: Dict[str, Any]) -> bool:
     for item in order_details.get('line_items', []):
         name = str(item.get('name', '')).lower()
@@ -169,30 +168,6 @@ def is_mixed_order(order_details: Dict[str, Any]) -> bool:
     return False
 
 
-def load_processed_ids(path: str) -> Set[int]:
-    if not os.path.exists(path):
-        return set()
-    ids: Set[int] = set()
-    with open(path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                ids.add(int(line))
-            except ValueError:
-                continue
-    return ids
-
-
-def save_processed_ids(path: str, ids: Set[int]) -> None:
-    tmp = path + '.tmp'
-    with open(tmp, 'w', encoding='utf-8') as f:
-        for oid in sorted(ids):
-            f.write(f"{oid}\n")
-    os.replace(tmp, path)
-
-
 def validate_config(logger: logging.Logger) -> bool:
     site = WOOCOMMERCE_CONFIG.get('site_url', '')
     ck = WOOCOMMERCE_CONFIG.get('consumer_key', '')
@@ -204,18 +179,136 @@ def validate_config(logger: logging.Logger) -> bool:
     return True
 
 
-def get_paid_orders(api: WooCommerceAPI, logger: logging.Logger, per_page: int = 15) -> List[Dict[str, Any]]:
-    # Fetch multiple statuses considered paid
-    orders_summary: List[Dict[str, Any]] = []
-    for status in ['processing', 'on-hold']:
-        try:
-            part = api.get_orders(status=status, per_page=per_page) or []
-            if part:
-                logger.info(f"📥 {len(part)} سفارش ({status}) دریافت شد")
-            orders_summary.extend(part)
-        except Exception as e:
-            logger.error(f"❌ خطا در دریافت سفارشات ({status}): {e}")
-    return orders_summary
+def load_sync_cursor(path: str) -> Optional[str]:
+    """خواندن نشانگر همگام‌سازی (date_modified_gmt آخرین سفارش دیده‌شده)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('modified_after')
+    except (OSError, ValueError):
+        return None
+
+
+def save_sync_cursor(path: str, cursor: str) -> None:
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'modified_after': cursor, 'updated_at': datetime.now().isoformat()}, f)
+    os.replace(tmp, path)
+
+
+def _shift_timestamp(value: str, seconds: int) -> str:
+    return (datetime.fromisoformat(value) + timedelta(seconds=seconds)).isoformat(timespec='seconds')
+
+
+def get_paid_orders(api: WooCommerceAPI, logger: logging.Logger,
+                    cursor: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    دریافت تمام صفحات سفارشات پرداخت‌شده که بعد از نشانگر تغییر کرده‌اند
+
+    Returns:
+        لیست سفارش‌ها یا None اگر پیمایش به دلیل خطای شبکه ناقص ماند
+    """
+    statuses = CRON_CONFIG.get('statuses', ['processing', 'on-hold'])
+    modified_after = None
+    if cursor:
+        modified_after = _shift_timestamp(cursor, -int(CRON_CONFIG.get('cursor_overlap_seconds', 60)))
+        logger.info(f"🔖 دریافت سفارشات تغییر کرده بعد از {modified_after} (GMT)")
+    else:
+        logger.info("🔖 نشانگر همگام‌سازی وجود ندارد - دریافت کامل سفارشات")
+
+    try:
+        orders = list(api.iter_orders(statuses, modified_after=modified_after,
+                                      per_page=CRON_CONFIG.get('per_page', 100)))
+    except requests.exceptions.RequestException as e:
+        logger.error(f"❌ خطا در دریافت سفارشات ({', '.join(statuses)}): {e}")
+        return None
+
+    logger.info(f"📥 {len(orders)} سفارش ({', '.join(statuses)}) دریافت شد")
+    return orders
+
+
+def next_sync_cursor(orders: List[Dict[str, Any]], failed: List[Dict[str, Any]],
+                     current: Optional[str]) -> Optional[str]:
+    """
+    نشانگر بعدی: آخرین زمان تغییر دیده‌شده، یا اگر سفارشی ناموفق بود
+    یک ثانیه قبل از قدیمی‌ترین سفارش ناموفق (تا اجرای بعد دوباره دریافت شود)
+
+    failed فقط سفارش‌هایی است که باید دوباره امتحان شوند (نه سفارش‌های به سقف
+    تلاش رسیده؛ retryable_failures)
+    """
+    failed_times = [o.get('date_modified_gmt') for o in failed if o.get('date_modified_gmt')]
+    if failed_times:
+        return _shift_timestamp(min(failed_times), -1)
+    seen_times = [o.get('date_modified_gmt') for o in orders if o.get('date_modified_gmt')]
+    if not seen_times:
+        return current
+    latest = max(seen_times)
+    return max(latest, current) if current else latest
+
+
+def retryable_failures(failed: List[Dict[str, Any]], logger: logging.Logger) -> List[Dict[str, Any]]:
+    """
+    سفارش‌های ناموفقی که نشانگر باید برایشان عقب بماند
+
+    خطاهای گذرا (دریافت نشدن جزئیات، BUSY) claim نمی‌شوند و تلاشی ثبت نمی‌کنند؛
+    سفارشی که بعد از LEDGER_CONFIG['max_attempts'] بار پردازش هنوز FAILED است
+    (مثلاً بدون آیتم یا با رندر همیشه ناموفق) کنار گذاشته می‌شود تا نشانگر جلو برود.
+    """
+    if not failed:
+        return failed
+    exhausted = get_ledger().exhausted_ids(int(o.get('id')) for o in failed)
+    if exhausted:
+        logger.warning(f"🚫 {len(exhausted)} سفارش پس از {LEDGER_CONFIG.get('max_attempts', 3)} تلاش "
+                       f"ناموفق کنار گذاشته شد: {', '.join(map(str, sorted(exhausted)))}")
+    return [o for o in failed if int(o.get('id')) not in exhausted]
+
+
+def sync_product_catalog(api: WooCommerceAPI, orders: List[Dict[str, Any]], logger: logging.Logger) -> None:
+    """به‌روزرسانی کاتالوگ محلی محصولات قبل از تولید لیبل‌ها"""
+    try:
+        catalog = get_catalog()
+        updated = catalog.sync_modified(api)
+        product_ids = [pid for order in orders for pid in order_product_ids(order)]
+        fetched = catalog.ensure_products(api, product_ids)
+        if updated or fetched:
+            logger.info(f"🗃️ کاتالوگ محصولات: {fetched} محصول جدید، {updated} محصول به‌روز شد")
+    except Exception as e:
+        logger.warning(f"⚠️ خطا در همگام‌سازی کاتالوگ محصولات: {e}")
+
+
+def log_api_cost(api: WooCommerceAPI, orders_count: int, logger: logging.Logger) -> None:
+    """گزارش زمان صرف‌شده در درخواست‌های ووکامرس"""
+    stats = api.latency_stats()
+    if not stats['requests']:
+        return
+    per_order = stats['total_s'] / orders_count if orders_count else 0.0
+    logger.info(
+        f"🌐 ووکامرس: {stats['requests']} درخواست ({stats['errors']} خطا) در {stats['total_s']:.2f} ثانیه"
+        f" - به ازای هر سفارش: {per_order:.2f} ثانیه"
+    )
+    for name, entry in stats['endpoints'].items():
+        logger.info(f"   {name}: {entry['count']} درخواست، میانگین {entry['avg_s']:.3f}s، بیشینه {entry['max_s']:.3f}s")
+
+
+def log_render_throughput(logger: logging.Logger) -> None:
+    """گزارش تعداد و سرعت رندر لیبل هر پروسه کارگر"""
+    stats = get_render_executor().stats()
+    if not stats['labels']:
+        return
+    logger.info(f"🧵 رندر: {stats['labels']} لیبل با {stats['workers']} کارگر ({stats['mode']})")
+    for pid, entry in stats['per_worker'].items():
+        logger.info(f"   کارگر {pid}: {entry['labels']} لیبل در {entry['render_s']:.2f}s ({entry['labels_per_s']:.1f} لیبل/ثانیه)")
+
+
+def write_metrics_snapshot(logger: logging.Logger, quiet: bool = False) -> None:
+    """نوشتن متریک‌های این اجرا (قالب Prometheus) برای textfile collector"""
+    try:
+        path = get_metrics().write_snapshot()
+        if not quiet:
+            logger.info(f"📈 متریک‌های اجرا: {path}")
+    except Exception as e:
+        logger.warning(f"⚠️ خطا در نوشتن متریک‌ها: {e}")
 
 
 def is_item_mixed(item: Dict[str, Any]) -> bool:
@@ -228,16 +321,32 @@ def is_item_mixed(item: Dict[str, Any]) -> bool:
 
 
 def process_order(order_details: Dict[str, Any], logger: logging.Logger) -> bool:
+    ledger = get_ledger()
+    metrics = get_metrics()
+    order_id = order_details.get('id')
+
+    # اجاره مشترک با webhook: سفارشی که آن طرف پردازش کرده یا در حال پردازش دارد رد می‌شود
+    claim = ledger.claim(order_id, 'cron')
+    if claim != CLAIMED:
+        if claim == BUSY:
+            logger.info(f"⏳ سفارش {order_id} در حال پردازش توسط پروسه دیگر است - اجرای بعد بررسی می‌شود")
+            metrics.inc('orders_total', source='cron', state='busy')
+            return False
+        logger.info(f"⏭️ سفارش {order_id} قبلاً پردازش شده است")
+        metrics.inc('orders_total', source='cron', state='duplicate')
+        return True
+
     try:
-        order_id = order_details.get('id')
         output_dir = LABEL_CONFIG.get('output_dir', 'labels')
         os.makedirs(output_dir, exist_ok=True)
 
-        all_labels = []  # لیست تمام لیبل‌های تولید شده
+        # هر لیبل یکتا یک بار رسم می‌شود و به تعداد quantity چاپ می‌شود
         line_items = order_details.get('line_items', [])
         
         if not line_items:
             logger.info(f"⏭️ سفارش {order_id} آیتمی ندارد")
+            ledger.release(order_id, FAILED, error='no line items')
+            metrics.inc('orders_total', source='cron', state=FAILED)
             return False
 
         # جدا کردن محصولات میکس و عادی
@@ -252,140 +361,150 @@ def process_order(order_details: Dict[str, Any], logger: logging.Logger) -> bool
         
         logger.info(f"📦 سفارش {order_id}: {len(mixed_items)} محصول میکس، {len(regular_items)} محصول عادی")
         
-        generated = 0
+        # برنامه رندر: هر مسیر یک بار رندر می‌شود و ترتیب چاپ در planned حفظ می‌شود
+        planned: List[Tuple[str, int]] = []  # (مسیر لیبل، تعداد نسخه) به ترتیب چاپ
+        jobs: Dict[str, Tuple[str, Dict[str, Any], str]] = {}  # مسیر -> (نوع، سفارش تک‌محصولی، عنوان)
+        back_path = os.path.join(output_dir, f"order_{order_id}_back{label_extension()}")  # لیبل پشت فقط به شماره سفارش وابسته است
+        
+        def plan(kind, item, path, title, copies):
+            if path not in jobs:
+                single = dict(order_details)
+                single['line_items'] = [item]
+                jobs[path] = (kind, single, title)
+            planned.append((path, copies))
         
         # پردازش محصولات میکس
         if mixed_items:
             logger.info(f"🔀 پردازش {len(mixed_items)} محصول میکس...")
             
-            back_counter = 1  # شمارنده جداگانه برای لیبل‌های back
-            mixed_counter = 1  # شمارنده جداگانه برای لیبل‌های mixed
-            
-            # تولید لیبل‌ها برای هر محصول میکس، با توجه به مقدار (quantity)
-            for item in mixed_items:
-                quantity = item.get('quantity', 1)
+            for n, item in enumerate(mixed_items, start=1):
+                quantity = int(item.get('quantity', 1))
                 logger.info(f"   محصول: {item.get('name', 'نامشخص')} - تعداد: {quantity}")
+                if quantity <= 0:
+                    continue
                 
-                # تولید لیبل mixed برای هر عدد از این محصول (به تعداد quantity)
-                for qty in range(int(quantity)):
-                    mixed_path = os.path.join(output_dir, f"order_{order_id}_mixed_{mixed_counter}.jpg")
-                    single_mixed = dict(order_details)
-                    single_mixed['line_items'] = [item]  # فقط این محصول میکس
-                    ok = generate_mixed_label(single_mixed, mixed_path)
-                    if ok:
-                        logger.info(f"✅ لیبل میکس {mixed_counter}: {mixed_path}")
-                        all_labels.append(mixed_path)
-                        generated += 1
-                    else:
-                        logger.warning(f"⚠️ تولید لیبل میکس {mixed_counter} ناموفق")
-                    mixed_counter += 1
-                
-                # تولید لیبل back برای هر عدد از این محصول (به تعداد quantity)
-                for qty in range(int(quantity)):
-                    back_path = os.path.join(output_dir, f"order_{order_id}_back_{back_counter}.jpg")
-                    single = dict(order_details)
-                    single['line_items'] = [item]
-                    ok = generate_main_label(single, back_path)
-                    if ok:
-                        logger.info(f"✅ لیبل پشت {back_counter}: {back_path}")
-                        all_labels.append(back_path)
-                        generated += 1
-                    else:
-                        logger.warning(f"⚠️ تولید لیبل پشت {back_counter} ناموفق")
-                    back_counter += 1
+                mixed_path = os.path.join(output_dir, f"order_{order_id}_mixed_{n}{label_extension()}")
+                plan('mixed', item, mixed_path, f"لیبل میکس {n}", quantity)
+                plan('main', item, back_path, "لیبل پشت", quantity)
         
         # پردازش محصولات عادی
         if regular_items:
             logger.info(f"📋 پردازش {len(regular_items)} محصول عادی...")
             
-            # شمارنده جداگانه برای لیبل‌های back محصولات عادی
-            regular_back_counter = back_counter if mixed_items else 1  # ادامه شمارنده از محصولات میکس یا شروع از 1
-            
-            # تولید لیبل details و back برای هر محصول عادی
             for i, item in enumerate(regular_items):
-                quantity = item.get('quantity', 1)
+                quantity = int(item.get('quantity', 1))
                 logger.info(f"   محصول: {item.get('name', 'نامشخص')} - تعداد: {quantity}")
+                if quantity <= 0:
+                    continue
                 
-                # تولید لیبل details برای هر عدد از این محصول (به تعداد quantity)
-                for qty in range(int(quantity)):
-                    details_path = os.path.join(output_dir, f"order_{order_id}_details_{i+1}.jpg")
-                    single = dict(order_details)
-                    single['line_items'] = [item]
-                    ok = generate_details_label(single, details_path)
-                    if ok:
-                        logger.info(f"✅ لیبل جزئیات {i+1}/{len(regular_items)}: {details_path}")
-                        all_labels.append(details_path)
-                        generated += 1
-                    else:
-                        logger.warning(f"⚠️ تولید لیبل جزئیات {i+1} ناموفق")
-                
-                # تولید لیبل back برای هر عدد از این محصول (به تعداد quantity)
-                for qty in range(int(quantity)):
-                    back_path = os.path.join(output_dir, f"order_{order_id}_back_{regular_back_counter}.jpg")
-                    single = dict(order_details)
-                    single['line_items'] = [item]
-                    ok = generate_main_label(single, back_path)
-                    if ok:
-                        logger.info(f"✅ لیبل پشت {regular_back_counter}: {back_path}")
-                        all_labels.append(back_path)
-                        generated += 1
-                    else:
-                        logger.warning(f"⚠️ تولید لیبل پشت {regular_back_counter} ناموفق")
-                    regular_back_counter += 1
-
-        logger.info(f"🎉 در مجموع {generated} لیبل برای سفارش {order_id} تولید شد")
-
-        # چاپ تمام لیبل‌های تولید شده
-        if all_labels and PRINTING_AVAILABLE:
-            logger.info(f"🖨️ شروع چاپ {len(all_labels)} لیبل برای سفارش {order_id}...")
-            printed_count = 0
-            for i, label_path in enumerate(all_labels):
-                print_success = print_label(label_path, logger)
-                if print_success:
-                    printed_count += 1
-                    logger.info(f"✅ لیبل {i+1}/{len(all_labels)} چاپ شد: {os.path.basename(label_path)}")
-                else:
-                    logger.warning(f"⚠️ لیبل {i+1}/{len(all_labels)} چاپ نشد: {os.path.basename(label_path)}")
-            logger.info(f"📊 {printed_count}/{len(all_labels)} لیبل با موفقیت چاپ شد")
-        elif not PRINTING_AVAILABLE:
+                details_path = os.path.join(output_dir, f"order_{order_id}_details_{i+1}{label_extension()}")
+                plan('details', item, details_path, f"لیبل جزئیات {i+1}/{len(regular_items)}", quantity)
+                plan('main', item, back_path, "لیبل پشت", quantity)
+
+        # رندر موازی لیبل‌های یکتا (تصاویر در حافظه؛ ذخیره فایل در پس‌زمینه)
+        paths = list(jobs)
+        results = get_render_executor().render_many([(jobs[p][0], jobs[p][1], p) for p in paths])
+        images: Dict[str, Any] = {}
+        for path, img in zip(paths, results):
+            title = jobs[path][2]
+            if img is not None:
+                images[path] = img
+                logger.info(f"✅ {title}: {path}")
+            else:
+                logger.warning(f"⚠️ تولید {title} ناموفق")
+        rendered = len(images)
+        all_labels = [(path, copies) for path, copies in planned if path in images]
+
+        # ثبت لیبل‌ها در دفتر سفارش‌ها (تعداد نسخه هر مسیر = مجموع نسخه‌های برنامه‌ریزی‌شده)
+        copies_by_path: Dict[str, int] = {}
+        for path, copies in planned:
+            copies_by_path[path] = copies_by_path.get(path, 0) + copies
+        records = [(path, jobs[path][0], copies_by_path[path], template_version(jobs[path][0])) for path in paths]
+        ledger.record_labels(order_id, [r for r in records if r[0] in images], RENDERED)
+        ledger.record_labels(order_id, [r for r in records if r[0] not in images], FAILED)
+
+        copies_total = sum(copies for _, copies in all_labels)
+        logger.info(f"🎉 سفارش {order_id}: {rendered} لیبل رسم شد، {copies_total} نسخه برای چاپ")
+
+        # چاپ تمام لیبل‌های سفارش در یک کار چندصفحه‌ای
+        printer = get_printer_backend()
+        printed = False
+        if all_labels and printer.ready():
+            logger.info(f"🖨️ شروع چاپ {copies_total} لیبل برای سفارش {order_id}...")
+            pages = [(images[path], copies, jobs[path][0]) for path, copies in all_labels]
+            if printer.print_job(pages, title=f"Offer Coffee - order {order_id}", logger=logger):
+                logger.info(f"📊 {copies_total}/{copies_total} لیبل با موفقیت چاپ شد ({rendered} رسم)")
+                ledger.set_labels_state(order_id, PRINTED, images)
+                printed = True
+            else:
+                logger.warning(f"⚠️ چاپ لیبل‌های سفارش {order_id} ناموفق بود")
+        elif not printer.available:
             logger.info("💾 ماژول چاپ در دسترس نیست - لیبل‌ها فقط ذخیره شدند")
         else:
             logger.info("💾 لیبل‌ها فقط ذخیره شدند (چاپگر فعال نشد)")
 
-        return len(all_labels) > 0
+        if not all_labels:
+            ledger.release(order_id, FAILED, error='no labels rendered')
+            metrics.inc('orders_total', source='cron', state=FAILED)
+            return False
+        ledger.release(order_id, PRINTED if printed else RENDERED)
+        metrics.inc('orders_total', source='cron', state=PRINTED if printed else RENDERED)
+        return True
     except Exception as e:
         logger.error(f"❌ خطا در پردازش سفارش {order_details.get('id', 'نامشخص')}: {e}")
+        metrics.inc('orders_total', source='cron', state=FAILED)
+        metrics.inc('failures_total', stage='order')
+        try:
+            ledger.release(order_id, FAILED, error=str(e))
+        except Exception:
+            pass
         return False
 
 
-def main() -> int:
-    logger = setup_logger()
-
-    if not validate_config(logger):
-        return 1
-
-    # Init API
-    api = WooCommerceAPI(
+def create_api() -> WooCommerceAPI:
+    return WooCommerceAPI(
         WOOCOMMERCE_CONFIG['site_url'],
         WOOCOMMERCE_CONFIG['consumer_key'],
         WOOCOMMERCE_CONFIG['consumer_secret'],
     )
 
-    # Load state
-    state_path = os.path.join('data', 'processed_orders.txt')
-    processed_ids = load_processed_ids(state_path)
-    logger.info(f"🗂️ {len(processed_ids)} سفارش قبلاً پردازش شده‌اند")
 
-    # Fetch candidates
-    summaries = get_paid_orders(api, logger, per_page=100)
+def run_cycle(api: WooCommerceAPI, logger: logging.Logger) -> Optional[int]:
+    """
+    یک دور پردازش: دریافت سفارش‌های تغییرکرده، تولید و چاپ لیبل‌ها و جلو بردن نشانگر
+
+    Returns:
+        تعداد سفارش‌های جدید (پردازش‌نشده) این دور، یا None اگر دریافت سفارش‌ها ناموفق بود
+    """
+    ledger = get_ledger()
+
+    # Fetch candidates (only orders modified since the last run)
+    cursor_path = CRON_CONFIG.get('cursor_path', os.path.join('data', 'order_sync_cursor.json'))
+    cursor = load_sync_cursor(cursor_path)
+    summaries = get_paid_orders(api, logger, cursor)
+    if summaries is None:
+        return None
     if not summaries:
-        logger.info('ℹ️ هیچ سفارشی یافت نشد')
+        logger.info('ℹ️ هیچ سفارش جدیدی یافت نشد')
+        log_api_cost(api, 0, logger)
         return 0
 
-    # Process each unique order (newest first)
-    seen: Set[int] = set()
-    processed_this_run = 0
+    # Indexed lookup of the orders in this batch that were already processed
+    summary_ids: List[int] = []
+    for summary in summaries:
+        try:
+            summary_ids.append(int(summary.get('id')))
+        except Exception:
+            continue
+    processed_ids = ledger.done_ids(summary_ids)
+
+    # Product permalinks for details labels come from the local catalog
+    sync_product_catalog(api, [s for s in summaries if s.get('id') not in processed_ids], logger)
 
+    # Unique, not yet processed orders (oldest change first)
+    seen: Set[int] = set()
+    candidates: List[Dict[str, Any]] = []
+    skipped = 0
     for summary in summaries:
         try:
             oid = int(summary.get('id'))
@@ -396,24 +515,131 @@ def main() -> int:
         seen.add(oid)
 
         if oid in processed_ids:
-            logger.info(f"⏭️ سفارش {oid} قبلاً پردازش شده است")
+            skipped += 1
             continue
+        candidates.append(summary)
+    if skipped:
+        # سفارش‌های همپوشانی نشانگر در هر دور دوباره دریافت می‌شوند؛ یک خط برای همه
+        logger.info(f"⏭️ {skipped} سفارش قبلاً پردازش شده است")
+
+    # Full details come from the list payload; only incomplete ones are batch-fetched
+    details_by_id = resolve_order_details(api, candidates, logger) if candidates else {}
 
-        # Get full details
-        details = api.get_order_details(oid)
+    failed: List[Dict[str, Any]] = []
+    processed_this_run = 0
+
+    for summary in candidates:
+        oid = int(summary.get('id'))
+        details = details_by_id.get(oid)
         if not details:
             logger.warning(f"⚠️ جزئیات سفارش {oid} یافت نشد")
+            failed.append(summary)
             continue
 
-        if not is_payment_completed(details, logger):
+        with get_metrics().timer('payment_check'):
+            paid = is_payment_completed(details, logger)
+        if not paid:
+            get_metrics().inc('orders_total', source='cron', state='unpaid')
             continue
 
         if process_order(details, logger):
-            processed_ids.add(oid)
             processed_this_run += 1
-            save_processed_ids(state_path, processed_ids)
+        else:
+            failed.append(summary)
+
+    new_cursor = next_sync_cursor(summaries, retryable_failures(failed, logger), cursor)
+    if new_cursor and new_cursor != cursor:
+        save_sync_cursor(cursor_path, new_cursor)
+        logger.info(f"🔖 نشانگر همگام‌سازی: {new_cursor}")
 
     logger.info(f"✅ پردازش تکمیل شد - {processed_this_run} سفارش جدید")
+    log_api_cost(api, processed_this_run, logger)
+    return len(candidates)
+
+
+def finish_run(logger: logging.Logger) -> None:
+    """گزارش رندر، بستن پروسه‌های رندر و چاپگر، ذخیره لیبل‌های صف‌شده و متریک‌ها"""
+    log_render_throughput(logger)
+    shutdown_render_executor()
+    close_printer_backend()
+    get_archiver().flush()
+    write_metrics_snapshot(logger)
+
+
+def main() -> int:
+    logger = setup_logger()
+
+    if not validate_config(logger):
+        return 1
+
+    api = create_api()
+
+    # Load state (the old processed_orders.txt is migrated on first use)
+    counts = get_ledger().stats()
+    logger.info(f"🗂️ دفتر سفارش‌ها: {counts[PRINTED]} چاپ‌شده، {counts[RENDERED]} فقط رسم‌شده، {counts[FAILED]} ناموفق")
+
+    found = run_cycle(api, logger)
+    finish_run(logger)
+    return 1 if found is None else 0
+
+
+def run_daemon() -> int:
+    """
+    اجرای دائمی: پروسه، کش‌ها (فونت، قالب، QR، متن)، پروسه‌های رندر و نشست
+    HTTP ووکامرس بین دورها زنده می‌مانند. فاصله دورها از daemon_poll_seconds
+    شروع می‌شود و در هر دور بدون سفارش جدید (یا با خطای شبکه) در daemon_backoff
+    ضرب می‌شود تا daemon_idle_max_seconds؛ با اولین سفارش جدید دوباره کوتاه می‌شود.
+    """
+    logger = setup_logger(rotate=True)
+
+    if not validate_config(logger):
+        return 1
+
+    poll = float(CRON_CONFIG.get('daemon_poll_seconds', 15))
+    idle_max = max(poll, float(CRON_CONFIG.get('daemon_idle_max_seconds', 120)))
+    backoff = max(1.0, float(CRON_CONFIG.get('daemon_backoff', 2.0)))
+
+    api = create_api()
+    counts = get_ledger().stats()
+    logger.info(f"🗂️ دفتر سفارش‌ها: {counts[PRINTED]} چاپ‌شده، {counts[RENDERED]} فقط رسم‌شده، {counts[FAILED]} ناموفق")
+
+    # فونت‌ها، لایه‌های ثابت و پروسه‌های رندر یک بار برای کل عمر پروسه آماده می‌شوند
+    get_render_executor().warm_up()
+
+    # توقف نرم (سرویس/Task Scheduler): دور جاری تمام می‌شود و بعد خروج
+    stop = threading.Event()
+
+    def _request_stop(signum, frame):
+        logger.info(f"⏹️ سیگنال {signum} دریافت شد - توقف بعد از دور جاری")
+        stop.set()
+
+    for name in ('SIGTERM', 'SIGBREAK'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), _request_stop)
+    logger.info(f"♻️ حالت دائمی: بررسی هر {poll:g} ثانیه (تا {idle_max:g} ثانیه در زمان بیکاری)")
+
+    interval = poll
+    try:
+        while not stop.is_set():
+            # آمار ووکامرس هر دور جدا گزارش می‌شود
+            api.reset_latency_stats()
+            try:
+                found = run_cycle(api, logger)
+            except Exception as e:
+                logger.error(f"❌ خطا در دور پردازش: {e}")
+                found = None
+            get_archiver().flush()
+            write_metrics_snapshot(logger, quiet=True)
+
+            interval = poll if found else min(idle_max, interval * backoff)
+            if not found:
+                logger.info(f"💤 دور بعد تا {interval:g} ثانیه دیگر")
+            stop.wait(interval)
+    except KeyboardInterrupt:
+        logger.info('⏹️ توقف حالت دائمی')
+    finally:
+        finish_run(logger)
+        api.close()
     return 0
 
 
@@ -437,7 +663,7 @@ if __name__ == '__main__':
         sys.exit(0)
     
     try:
-        sys.exit(main())
+        sys.exit(run_daemon() if '--daemon' in sys.argv[1:] else main())
     except KeyboardInterrupt:
         print('\n⏹️ عملیات متوقف شد.')
         sys.exit(130)
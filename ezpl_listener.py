@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+شنونده محلی به جای چاپگر EZPL (برای تست خروجی ezpl روی لینوکس بدون چاپگر)
+
+هر اتصال روی پورت داده‌شده پذیرفته می‌شود و بایت‌های دریافتی در پوشه
+خروجی ذخیره و شمارش می‌شوند.
+
+استفاده:
+    python ezpl_listener.py [--port 9100] [--output ezpl_out]
+"""
+
+import argparse
+import os
+import socketserver
+import threading
+from datetime import datetime
+
+_counter = 0
+_counter_lock = threading.Lock()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        global _counter
+        with _counter_lock:
+            _counter += 1
+            number = _counter
+        path = os.path.join(self.server.output_dir, f"ezpl_{datetime.now():%Y%m%d_%H%M%S}_{number}.prn")
+        total = 0
+        with open(path, "wb") as f:
+            while True:
+                chunk = self.request.recv(65536)
+                if not chunk:
+                    break
+                f.write(chunk)
+                total += len(chunk)
+        print(f"🖨️ اتصال {number} از {self.client_address[0]}: {total} بایت -> {path}")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="شنونده محلی EZPL")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--output", default="ezpl_out")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    with _Server((args.host, args.port), _Handler) as server:
+        server.output_dir = args.output
+        print(f"👂 در انتظار دستورات EZPL روی {args.host}:{args.port} (خروجی: {args.output})")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
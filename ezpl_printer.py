@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+خروجی مستقیم EZPL برای چاپگر Godex (بدون درایور GDI ویندوز)
+
+لیبل رندرشده به تصویر ۱ بیتی در رزولوشن چاپگر تبدیل و به صورت دستورات
+گرافیکی EZPL روی سوکت TCP (مثلاً پورت raw 9100) یا فایل دستگاه
+(مثلاً /dev/usb/lp0) ارسال می‌شود.
+
+لایه ثابت هر نوع لیبل فقط یک بار (در هر اتصال) با ~EB در حافظه چاپگر
+ذخیره و در هر لیبل با Y فراخوانی می‌شود؛ برای هر سفارش فقط ناحیه متغیر
+با Q (گرافیک مستقیم) ارسال می‌شود.
+"""
+
+import hashlib
+import io
+import socket
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageOps
+
+from config import PRINTER_CONFIG
+
+CRLF = b"\r\n"
+
+
+def _target_size() -> Tuple[int, int]:
+    dots_per_mm = PRINTER_CONFIG.get('dpi', 203) / 25.4
+    return (round(PRINTER_CONFIG.get('label_width_mm', 80) * dots_per_mm),
+            round(PRINTER_CONFIG.get('label_height_mm', 100) * dots_per_mm))
+
+
+def to_printer_bitmap(img: Image.Image) -> Image.Image:
+    """
+    تبدیل لیبل به تصویر ۱ بیتی هم‌اندازه با لیبل در رزولوشن چاپگر
+
+    تصویر با حفظ نسبت ابعاد در کادر لیبل جا می‌گیرد (وسط‌چین) و با آستانه
+    (بدون dither) سیاه و سفید می‌شود تا متن‌ها لبه تمیز داشته باشند.
+    """
+    width, height = _target_size()
+    gray = img.convert("L")
+    if gray.size != (width, height):
+        scale = min(width / gray.width, height / gray.height)
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        resized = gray.resize(size, Image.LANCZOS)
+        gray = Image.new("L", (width, height), 255)
+        gray.paste(resized, ((width - size[0]) // 2, (height - size[1]) // 2))
+    threshold = PRINTER_CONFIG.get('threshold', 128)
+    return gray.point(lambda v: 255 if v >= threshold else 0).convert("1", dither=Image.Dither.NONE)
+
+
+def _packed_bits(bitmap: Image.Image) -> bytes:
+    """بایت‌های خام گرافیک (هر سطر به بایت کامل پر می‌شود؛ بیت ۱ = نقطه سیاه)"""
+    # در حالت 1 بیتی Pillow بیت ۱ سفید است؛ برای چاپگر معکوس می‌شود
+    return ImageOps.invert(bitmap.convert("L")).convert("1").tobytes()
+
+
+def graphic_name(bitmap: Image.Image) -> str:
+    """نام کوتاه و پایدار گرافیک در حافظه چاپگر (بر اساس محتوای تصویر)"""
+    return "OC" + hashlib.sha1(bitmap.tobytes()).hexdigest()[:8].upper()
+
+
+def download_graphic_command(name: str, bitmap: Image.Image) -> bytes:
+    """~EB: ذخیره گرافیک (BMP تک‌رنگ) در حافظه چاپگر"""
+    buf = io.BytesIO()
+    bitmap.save(buf, format="BMP")
+    data = buf.getvalue()
+    return f"~EB,{name},{len(data)}".encode("ascii") + CRLF + data + CRLF
+
+
+def direct_graphic_command(x: int, y: int, bitmap: Image.Image) -> bytes:
+    """Q: گرافیک مستقیم در موقعیت (x، y)"""
+    width_bytes = (bitmap.width + 7) // 8
+    return f"Q{x},{y},{width_bytes},{bitmap.height}".encode("ascii") + CRLF + _packed_bits(bitmap) + CRLF
+
+
+def label_header(copies: int) -> bytes:
+    lines = [
+        f"^Q{PRINTER_CONFIG.get('label_height_mm', 100)},{PRINTER_CONFIG.get('gap_mm', 3)}",
+        f"^W{PRINTER_CONFIG.get('label_width_mm', 80)}",
+        f"^H{PRINTER_CONFIG.get('darkness', 10)}",
+        f"^S{PRINTER_CONFIG.get('speed', 3)}",
+        f"^P{max(1, copies)}",
+        "^L",
+    ]
+    return CRLF.join(line.encode("ascii") for line in lines) + CRLF
+
+
+class EzplPrinter:
+    """اتصال پایدار به چاپگر EZPL (tcp://host:port یا مسیر فایل دستگاه)"""
+
+    def __init__(self, target: Optional[str] = None, timeout: Optional[float] = None):
+        self.target = target or PRINTER_CONFIG.get('target', 'tcp://127.0.0.1:9100')
+        self.timeout = timeout if timeout is not None else PRINTER_CONFIG.get('timeout', 10)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stored: set = set()  # گرافیک‌های ذخیره‌شده در حافظه چاپگر در این اتصال
+        # نوع لیبل -> (لایه ثابت، نسخه ۱ بیتی)؛ static_layer تا عوض شدن قالب همان تصویر را برمی‌گرداند
+        self._static_bitmaps: Dict[str, Tuple[Image.Image, Image.Image]] = {}
+        self._stats = {'labels': 0, 'copies': 0, 'bytes': 0, 'graphics_stored': 0, 'full_frames': 0}
+
+    # -----------------------
+    # اتصال
+    # -----------------------
+    def _connect(self):
+        if self.target.startswith("tcp://"):
+            host, _, port = self.target[len("tcp://"):].rpartition(":")
+            conn = socket.create_connection((host, int(port)), timeout=self.timeout)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return conn
+        return open(self.target, "ab", buffering=0)
+
+    def _ensure_connected(self) -> None:
+        # اتصال جدید = حافظه چاپگر نامعلوم (ممکن است ری‌استارت شده باشد)
+        if self._conn is None:
+            self._conn = self._connect()
+            self._stored.clear()
+
+    def _write(self, data: bytes) -> None:
+        self._ensure_connected()
+        try:
+            if isinstance(self._conn, socket.socket):
+                self._conn.sendall(data)
+            else:
+                self._conn.write(data)
+        except OSError:
+            self.close_connection()
+            raise
+        self._stats['bytes'] += len(data)
+
+    def close_connection(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+    # -----------------------
+    # چاپ
+    # -----------------------
+    def _static_bitmap(self, static: Image.Image, kind: str) -> Image.Image:
+        with self._lock:
+            cached = self._static_bitmaps.get(kind)
+        if cached is not None and cached[0] is static:
+            return cached[1]
+        bitmap = to_printer_bitmap(static)
+        with self._lock:
+            # لایه قبلی همین نوع (مثلاً تاریخ دیروز) کنار گذاشته می‌شود
+            self._static_bitmaps[kind] = (static, bitmap)
+        return bitmap
+
+    def build_label(self, img: Image.Image, copies: int = 1, static: Optional[Image.Image] = None,
+                    kind: str = '') -> Tuple[bytes, Optional[Tuple[str, Image.Image]]]:
+        """
+        ساخت جریان EZPL یک لیبل
+
+        Returns:
+            (بایت‌های لیبل، (نام، تصویر) گرافیک ثابتی که باید قبلاً در چاپگر ذخیره شود یا None)
+        """
+        bitmap = to_printer_bitmap(img)
+        body = None
+        static_graphic = None
+
+        if static is not None:
+            static_bitmap = self._static_bitmap(static, kind)
+            # نواحی‌ای که در لیبل سیاه شده‌اند؛ اگر جایی از لایه ثابت پاک شده باشد
+            # (سیاه -> سفید) رویهم‌گذاری کافی نیست و کل لیبل ارسال می‌شود
+            erased = ImageChops.logical_and(ImageChops.invert(static_bitmap), bitmap)
+            if erased.getbbox() is None:
+                name = graphic_name(static_bitmap)
+                static_graphic = (name, static_bitmap)
+                body = f"Y0,0,{name}".encode("ascii") + CRLF
+                changed = ImageChops.difference(static_bitmap, bitmap).getbbox()
+                if changed:
+                    # شروع ناحیه روی مرز بایت تا بیت‌ها با لایه ثابت هم‌تراز بمانند
+                    x0 = changed[0] - changed[0] % 8
+                    region = bitmap.crop((x0, changed[1], changed[2], changed[3]))
+                    body += direct_graphic_command(x0, changed[1], region)
+
+        if body is None:
+            self._stats['full_frames'] += 1
+            body = direct_graphic_command(0, 0, bitmap)
+
+        return label_header(copies) + body + b"E" + CRLF, static_graphic
+
+    def print_image(self, img: Image.Image, copies: int = 1, static: Optional[Image.Image] = None,
+                    kind: str = '') -> int:
+        """
+        چاپ یک لیبل (copies نسخه با ^P در همان دستور)
+
+        Returns:
+            تعداد بایت ارسال‌شده برای این لیبل
+        """
+        payload, static_graphic = self.build_label(img, copies, static, kind)
+        with self._lock:
+            # در صورت قطع اتصال یک بار دوباره وصل می‌شود؛ چون _stored با اتصال
+            # جدید خالی می‌شود، گرافیک ثابت قبل از فراخوانی با Y دوباره ارسال می‌شود
+            for attempt in (1, 2):
+                sent = 0
+                try:
+                    self._ensure_connected()
+                    if static_graphic is not None and static_graphic[0] not in self._stored:
+                        command = download_graphic_command(*static_graphic)
+                        self._write(command)
+                        sent += len(command)
+                        self._stored.add(static_graphic[0])
+                        self._stats['graphics_stored'] += 1
+                    self._write(payload)
+                    sent += len(payload)
+                    break
+                except OSError:
+                    if attempt == 2:
+                        raise
+            self._stats['labels'] += 1
+            self._stats['copies'] += max(1, copies)
+        return sent
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, target=self.target, graphics_in_printer=len(self._stored))
+
+
+_printer: Optional[EzplPrinter] = None
+_printer_lock = threading.Lock()
+
+
+def get_ezpl_printer() -> EzplPrinter:
+    """اتصال مشترک EZPL در این پروسه"""
+    global _printer
+    with _printer_lock:
+        if _printer is None:
+            _printer = EzplPrinter()
+        return _printer
+
+
+def print_ezpl(label, copies: int = 1, kind: Optional[str] = None) -> int:
+    """
+    چاپ تصویر لیبل (یا مسیر فایل) با EZPL
+
+    اگر نوع لیبل (main/details/mixed) مشخص باشد، لایه ثابت همان نوع در حافظه
+    چاپگر نگه داشته می‌شود و فقط ناحیه متغیر ارسال می‌شود.
+
+    Returns:
+        تعداد بایت ارسال‌شده
+    """
+    img = Image.open(label) if isinstance(label, str) else label
+    static = None
+    if kind and PRINTER_CONFIG.get('cache_static', True):
+        from render_executor import LABEL_GENERATORS
+        if kind in LABEL_GENERATORS:
+            static = __import__(LABEL_GENERATORS[kind][0]).static_layer()
+    return get_ezpl_printer().print_image(img, copies, static, kind or '')
+
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+سرور محلی به جای REST API ووکامرس (برای تست بار webhook و cron بدون فروشگاه واقعی)
+
+سفارش‌ها و محصولات مصنوعی از /wp-json/wc/v3 سرو می‌شوند، با همان پارامترهایی
+که WooCommerceAPI می‌فرستد (status چندتایی، include، modified_after، orderby،
+order، per_page، page) و سرآیندهای X-WP-Total و X-WP-TotalPages. تأخیر و
+خطای 503 قابل تنظیم است و با --arrival-rate سفارش‌های جدید در طول زمان اضافه
+می‌شوند.
+
+استفاده:
+    python fake_woocommerce.py [--port 8081] [--orders 200] [--latency-ms 80]
+        [--jitter-ms 40] [--error-rate 0.02] [--arrival-rate 6]
+
+سپس در config.py:
+    WOOCOMMERCE_CONFIG['site_url'] = 'http://127.0.0.1:8081'
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = "/wp-json/wc/v3/"
+FIRST_ORDER_ID = 10001
+FIRST_PRODUCT_ID = 100
+
+COFFEES = ['عربیکا برزیل سانتوز', 'روبوستا هند', 'کلمبیا سوپریمو', 'اتیوپی یرگاچف', 'گواتمالا آنتیگوا']
+GRINDS = ['اسپرسو', 'موکاپات', 'فرانسه', 'ترک', 'دانه']
+
+
+def _gmt(moment: datetime) -> str:
+    return moment.isoformat(timespec='seconds')
+
+
+def synthetic_product(product_id: int, modified: datetime) -> Dict[str, Any]:
+    return {
+        'id': product_id,
+        'slug': f'coffee-{product_id}',
+        'permalink': f'https://offercoffee.ir/product/coffee-{product_id}/',
+        'name': f"قهوه {COFFEES[product_id % len(COFFEES)]}",
+        'date_modified_gmt': _gmt(modified),
+    }
+
+
+def synthetic_order(order_id: int, modified: datetime, rng: random.Random, products: int = 50,
+                    status: str = 'processing') -> Dict[str, Any]:
+    """سفارش مصنوعی با ۱ تا ۴ محصول (بعضی میکس) با فیلدهای لازم برای تولید لیبل"""
+    line_items = []
+    for _ in range(rng.randint(1, 4)):
+        product_id = FIRST_PRODUCT_ID + rng.randrange(products)
+        coffee = COFFEES[product_id % len(COFFEES)]
+        meta = [
+            {'key': 'weight', 'value': rng.choice(['250', '500', '1000'])},
+            {'key': 'grinding_grade', 'value': rng.choice(GRINDS)},
+        ]
+        name = f"قهوه {coffee}"
+        if rng.random() < 0.25:
+            second = rng.choice(COFFEES)
+            name = f"قهوه ترکیبی {coffee} و {second}"
+            meta += [{'key': f'قهوه {coffee}', 'value': '70%'}, {'key': f'قهوه {second}', 'value': '30%'}]
+        line_items.append({'name': name, 'quantity': rng.randint(1, 3), 'product_id': product_id, 'meta_data': meta})
+    return {
+        'id': order_id,
+        'status': status,
+        'total': str(rng.randrange(200, 5000) * 1000),
+        'payment_method': 'cod',
+        'payment_method_title': 'پرداخت در محل',
+        'date_created_gmt': _gmt(modified),
+        'date_modified_gmt': _gmt(modified),
+        'line_items': line_items,
+    }
+
+
+class FakeStore:
+    """داده‌های فروشگاه جعلی و پیاده‌سازی endpointها"""
+
+    def __init__(self, orders: int = 200, products: int = 50, seed: int = 1,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0):
+        self.rng = random.Random(seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'errors_injected': 0, 'endpoints': {}}
+
+        start = datetime.utcnow() - timedelta(days=2)
+        self.products = [synthetic_product(FIRST_PRODUCT_ID + i, start) for i in range(products)]
+        self.orders: List[Dict[str, Any]] = []
+        statuses = ['processing'] * 6 + ['on-hold'] * 2 + ['pending', 'completed']
+        for i in range(orders):
+            modified = start + timedelta(seconds=60 * i)
+            self.orders.append(synthetic_order(FIRST_ORDER_ID + i, modified, self.rng, products,
+                                               self.rng.choice(statuses)))
+
+    def add_order(self) -> Dict[str, Any]:
+        """سفارش پرداخت‌شده جدید با زمان تغییر فعلی"""
+        with self._lock:
+            order_id = self.orders[-1]['id'] + 1 if self.orders else FIRST_ORDER_ID
+            order = synthetic_order(order_id, datetime.utcnow(), self.rng, len(self.products))
+            self.orders.append(order)
+            return order
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    # -----------------------
+    # endpointها
+    # -----------------------
+    def handle(self, path: str, query: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        """(کد وضعیت، بدنه JSON، سرآیندها)"""
+        if not path.startswith(API_PREFIX):
+            return 404, {'code': 'rest_no_route'}, {}
+        if not query.get('consumer_key') or not query.get('consumer_secret'):
+            return 401, {'code': 'woocommerce_rest_cannot_view'}, {}
+
+        parts = path[len(API_PREFIX):].strip('/').split('/')
+        name = '/'.join('{id}' if p.isdigit() else p for p in parts)
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['endpoints'][name] = self._stats['endpoints'].get(name, 0) + 1
+            inject = self.rng.random() < self.error_rate
+            if inject:
+                self._stats['errors_injected'] += 1
+        if inject:
+            return 503, {'code': 'fake_unavailable', 'message': 'injected error'}, {'Retry-After': '0'}
+
+        collection = {'orders': self.orders, 'products': self.products}.get(parts[0])
+        if collection is None or len(parts) > 2:
+            return 404, {'code': 'rest_no_route'}, {}
+        if len(parts) == 2:
+            with self._lock:
+                item = next((x for x in collection if str(x['id']) == parts[1]), None)
+            return (200, item, {}) if item else (404, {'code': 'woocommerce_rest_invalid_id'}, {})
+        return self._list(collection, query)
+
+    def _list(self, collection: List[Dict[str, Any]], query: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+        with self._lock:
+            items = list(collection)
+        status = query.get('status')
+        if status and status != 'any':
+            wanted = set(status.split(','))
+            items = [x for x in items if x.get('status') in wanted]
+        if query.get('include'):
+            ids = {int(v) for v in query['include'].split(',') if v.strip().isdigit()}
+            items = [x for x in items if x['id'] in ids]
+        if query.get('modified_after'):
+            items = [x for x in items if x['date_modified_gmt'] > query['modified_after']]
+
+        key = 'date_modified_gmt' if query.get('orderby') == 'modified' else 'id'
+        items.sort(key=lambda x: x[key], reverse=query.get('order', 'desc') == 'desc')
+
+        per_page = max(1, min(100, int(query.get('per_page', 10))))
+        page = max(1, int(query.get('page', 1)))
+        total = len(items)
+        headers = {'X-WP-Total': str(total), 'X-WP-TotalPages': str((total + per_page - 1) // per_page)}
+        return 200, items[(page - 1) * per_page:page * per_page], headers
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive مثل سرور واقعی
+
+    def do_GET(self):
+        store: FakeStore = self.server.store
+        delay = store.latency_ms + random.uniform(0, store.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            status, body, headers = store.handle(url.path, query)
+        except ValueError as e:
+            status, body, headers = 400, {'code': 'rest_invalid_param', 'message': str(e)}, {}
+
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def start_fake_store(store: FakeStore, host: str = "127.0.0.1", port: int = 0,
+                     verbose: bool = False) -> _Server:
+    """اجرای سرور در ترد پس‌زمینه (port=0: پورت آزاد)؛ آدرس در server.server_address"""
+    server = _Server((host, port), _Handler)
+    server.store = store
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, name="fake-woocommerce", daemon=True).start()
+    return server
+
+
+def _arrivals(store: FakeStore, per_minute: float, stop: threading.Event) -> None:
+    interval = 60.0 / per_minute
+    while not stop.wait(random.expovariate(1.0 / interval)):
+        order = store.add_order()
+        print(f"🆕 سفارش جدید {order['id']} ({len(order['line_items'])} محصول)")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="سرور محلی به جای ووکامرس")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--orders", type=int, default=200, help="تعداد سفارش‌های اولیه")
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="تأخیر ثابت هر پاسخ")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="تأخیر تصادفی اضافه (۰ تا این مقدار)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="احتمال پاسخ 503")
+    parser.add_argument("--arrival-rate", type=float, default=0.0, help="سفارش جدید در دقیقه (میانگین)")
+    parser.add_argument("--verbose", action="store_true", help="لاگ هر درخواست")
+    args = parser.parse_args(argv)
+
+    store = FakeStore(args.orders, args.products, args.seed, args.latency_ms, args.jitter_ms, args.error_rate)
+    server = start_fake_store(store, args.host, args.port, args.verbose)
+    stop = threading.Event()
+    if args.arrival_rate > 0:
+        threading.Thread(target=_arrivals, args=(store, args.arrival_rate, stop), daemon=True).start()
+
+    print(f"🛒 ووکامرس جعلی روی http://{args.host}:{args.port} ({len(store.orders)} سفارش، "
+          f"{len(store.products)} محصول، تأخیر {args.latency_ms}+{args.jitter_ms}ms، خطا {args.error_rate:.0%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop.set()
+        server.shutdown()
+        print(f"\n📊 {json.dumps(store.stats(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
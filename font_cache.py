@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+کش سراسری فونت‌ها برای تمام تولیدکننده‌های لیبل
+
+هر فونت بر اساس (مسیر، اندازه) فقط یک بار در هر پروسه بارگذاری می‌شود
+و بین label_main، label_details و label_mixed (نسخه‌های ویندوز و لینوکس)
+به اشتراک گذاشته می‌شود.
+"""
+
+import os
+import platform
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import ImageFont
+
+# فونت وبسایت و فالبک‌های سیستمی آن
+WEBSITE_FONT = "OpenSans-Regular.ttf"
+
+if platform.system() == "Windows":
+    WEBSITE_FONT_FALLBACKS = ["C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/calibri.ttf"]
+    REGULAR_FA_FONT_CANDIDATES = [
+        # Windows system fonts
+        "C:/Windows/Fonts/NotoSansArabic-Regular.ttf",
+        "C:/Windows/Fonts/NotoNaskhArabic-Regular.ttf",
+        "C:/Windows/Fonts/arial.ttf",
+        "C:/Windows/Fonts/calibri.ttf",
+        "C:/Windows/Fonts/tahoma.ttf",
+        # Project/local fallbacks
+        "NotoSansArabic-Regular.ttf",
+        "NotoNaskhArabic-Regular.ttf",
+        "Vazirmatn-Regular.ttf",
+        "IRANSans.ttf",
+        "Sahel.ttf",
+        "DejaVuSans.ttf",
+    ]
+else:  # Linux/Unix
+    WEBSITE_FONT_FALLBACKS = [
+        "/usr/share/fonts/open-sans/OpenSans-Regular.ttf",
+        "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    ]
+    REGULAR_FA_FONT_CANDIDATES = [
+        # Light/Thin variants (preferred for thinner look)
+        "/usr/share/fonts/noto/NotoSansArabic-ExtraLight.ttf",
+        "/usr/share/fonts/noto/NotoSansArabic-Light.ttf",
+        "/usr/share/fonts/noto/NotoNaskhArabic-Light.ttf",
+        # Variable font (weight selection not supported directly, but can still look thinner)
+        "/usr/share/fonts/google-noto-vf/NotoSansArabic[wght].ttf",
+        # Regular Noto (widely available on Fedora)
+        "/usr/share/fonts/noto/NotoSansArabic-Regular.ttf",
+        "/usr/share/fonts/noto/NotoNaskhArabic-Regular.ttf",
+        # DejaVu (fallback, decent Arabic glyphs)
+        "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        # Project/local fallbacks
+        "NotoSansArabic-ExtraLight.ttf",
+        "NotoSansArabic-Light.ttf",
+        "NotoNaskhArabic-Light.ttf",
+        "NotoSansArabic-Regular.ttf",
+        "NotoNaskhArabic-Regular.ttf",
+        "Vazirmatn-Regular.ttf",
+        "IRANSans.ttf",
+        "Sahel.ttf",
+        "DejaVuSans.ttf",
+    ]
+
+# نشانگر فونت‌هایی که بارگذاری آن‌ها شکست خورده (تا دوباره تلاش نشود)
+_MISSING = object()
+
+_lock = threading.Lock()
+_fonts: Dict[Tuple[str, int], object] = {}
+_stats = {"hits": 0, "misses": 0, "fit_hits": 0, "fit_misses": 0}
+_regular_fa_path: Optional[str] = None
+_regular_fa_path_resolved = False
+_fitted: Dict[Tuple[str, int, Tuple[str, ...], int, int, int], object] = {}
+
+
+def get_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    """دریافت فونت از کش؛ در صورت نبود فایل مانند ImageFont.truetype خطای OSError می‌دهد"""
+    key = (path, size)
+    with _lock:
+        font = _fonts.get(key)
+        if font is not None:
+            _stats["hits"] += 1
+            if font is _MISSING:
+                raise OSError(f"cannot open resource: {path}")
+            return font
+        _stats["misses"] += 1
+
+    try:
+        font = ImageFont.truetype(path, size)
+    except OSError:
+        with _lock:
+            _fonts[key] = _MISSING
+        raise
+
+    with _lock:
+        # اگر ترد دیگری همزمان همین فونت را ساخته باشد، همان را برمی‌گردانیم
+        return _fonts.setdefault(key, font)
+
+
+def get_font_with_fallback(paths: Iterable[str], size: int):
+    """اولین فونت قابل بارگذاری از لیست مسیرها؛ در نهایت فونت پیش‌فرض Pillow"""
+    for path in paths:
+        try:
+            return get_font(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def get_website_font(size: int):
+    """فونت OpenSans برای آدرس وبسایت با فالبک‌های سیستمی"""
+    return get_font_with_fallback([WEBSITE_FONT] + WEBSITE_FONT_FALLBACKS, size)
+
+
+def find_regular_fa_font_path() -> Optional[str]:
+    """مسیر یک فونت فارسی معمولی (غیر بولد)؛ جستجو فقط یک بار در هر پروسه انجام می‌شود"""
+    global _regular_fa_path, _regular_fa_path_resolved
+    with _lock:
+        if _regular_fa_path_resolved:
+            return _regular_fa_path
+
+    found = None
+    for path in REGULAR_FA_FONT_CANDIDATES:
+        if os.path.exists(path):
+            found = path
+            break
+
+    with _lock:
+        _regular_fa_path = found
+        _regular_fa_path_resolved = True
+    return found
+
+
+def get_regular_fa_font(size: int, fallback):
+    """فونت فارسی معمولی در اندازه داده شده یا فونت جایگزین در صورت نبود آن"""
+    path = find_regular_fa_font_path()
+    if not path:
+        return fallback
+    try:
+        return get_font(path, size)
+    except OSError:
+        return fallback
+
+
+def fit_font_to_width(text: str, max_width: int, paths: Iterable[str],
+                      max_size: int, min_size: int, step: int = 1):
+    """
+    بزرگترین فونتی که متن با آن در عرض داده شده جا شود
+
+    اندازه‌های max_size، max_size - step، ... تا min_size با جستجوی دودویی
+    بررسی می‌شوند و نتیجه برای هر (متن، عرض، فونت، بازه) تا پایان پروسه کش می‌شود.
+
+    Returns:
+        فونت مناسب یا None اگر هیچ اندازه‌ای جا نشود
+    """
+    paths = tuple(paths)
+    key = (text, max_width, paths, max_size, min_size, step)
+    with _lock:
+        if key in _fitted:
+            _stats["fit_hits"] += 1
+            return _fitted[key]
+        _stats["fit_misses"] += 1
+
+    sizes = list(range(max_size, min_size - 1, -step))
+
+    def fits(size):
+        font = get_font_with_fallback(paths, size)
+        left, _, right, _ = font.getbbox(text)
+        return right - left <= max_width
+
+    # sizes نزولی است؛ اولین اندازه‌ای که جا شود را پیدا می‌کنیم
+    lo, hi = 0, len(sizes)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if fits(sizes[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    font = get_font_with_fallback(paths, sizes[lo]) if lo < len(sizes) else None
+
+    with _lock:
+        _fitted[key] = font
+    return font
+
+
+def font_cache_stats() -> Dict[str, int]:
+    """آمار کش فونت (hit و miss فونت‌ها، hit و miss اندازه‌های جاشده و فونت‌های بارگذاری شده)"""
+    with _lock:
+        loaded = sum(1 for f in _fonts.values() if f is not _MISSING)
+        return {"hits": _stats["hits"], "misses": _stats["misses"],
+                "fit_hits": _stats["fit_hits"], "fit_misses": _stats["fit_misses"],
+                "fonts": loaded, "fitted": len(_fitted)}
+
+
+def clear_font_cache() -> None:
+    """پاک کردن کش (مثلاً بعد از تغییر فایل‌های فونت)"""
+    global _regular_fa_path, _regular_fa_path_resolved
+    with _lock:
+        _fonts.clear()
+        _fitted.clear()
+        _stats["hits"] = 0
+        _stats["misses"] = 0
+        _stats["fit_hits"] = 0
+        _stats["fit_misses"] = 0
+        _regular_fa_path = None
+        _regular_fa_path_resolved = False
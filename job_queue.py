@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+صف پایدار کارها در SQLite برای پردازش سفارش‌های webhook در پس‌زمینه
+
+درخواست webhook فقط payload تأییدشده را در صف ذخیره می‌کند و بلافاصله پاسخ
+می‌دهد؛ تولید و چاپ لیبل‌ها توسط چند ترد پس‌زمینه انجام می‌شود. کارها روی
+دیسک هستند، پس بعد از ری‌استارت پروسه (حتی کارهای نیمه‌کاره) دوباره اجرا می‌شوند.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import QUEUE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# وضعیت‌های کار
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER,
+    dedupe_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    available_at REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class JobQueue:
+    """صف کار ذخیره‌شده در SQLite (ایمن برای چند ترد)"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or QUEUE_CONFIG.get('db_path', 'data/jobs.db')
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # هر ترد اتصال مخصوص خودش را دارد
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> Optional[int]:
+        """
+        افزودن کار به صف
+
+        Returns:
+            شناسه کار، یا None اگر کاری با همین dedupe_key (مثلاً ارسال مجدد
+            همان webhook) قبلاً ثبت شده باشد
+        """
+        now = _now()
+        conn = self._conn()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO jobs (order_id, dedupe_key, payload, status, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (payload.get('id'), dedupe_key, json.dumps(payload, ensure_ascii=False), PENDING, time.time(), now, now)
+        )
+        return cur.lastrowid if cur.rowcount else None
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """برداشتن قدیمی‌ترین کار آماده (به صورت اتمیک)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, order_id, payload, attempts FROM jobs "
+                "WHERE status = ? AND available_at <= ? ORDER BY id LIMIT 1",
+                (PENDING, time.time())
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, _now(), row['id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return {
+            'id': row['id'],
+            'order_id': row['order_id'],
+            'payload': json.loads(row['payload']),
+            'attempts': row['attempts'] + 1,
+        }
+
+    def complete(self, job_id: int) -> None:
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+            (DONE, _now(), job_id)
+        )
+
+    def fail(self, job_id: int, error: str, attempts: int) -> bool:
+        """
+        ثبت شکست کار؛ تا سقف تلاش‌ها با تأخیر دوباره در صف قرار می‌گیرد
+
+        Returns:
+            True اگر کار دوباره تلاش خواهد شد
+        """
+        max_attempts = int(QUEUE_CONFIG.get('max_attempts', 3))
+        retry = attempts < max_attempts
+        delay = float(QUEUE_CONFIG.get('retry_delay_seconds', 30)) * attempts
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, last_error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+            (PENDING if retry else FAILED, error, time.time() + delay, _now(), job_id)
+        )
+        return retry
+
+    def recover(self) -> int:
+        """بازگرداندن کارهای نیمه‌کاره (پروسه قبلی وسط اجرا متوقف شده) به صف"""
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+            (PENDING, _now(), RUNNING)
+        )
+        return cur.rowcount
+
+    def statuses(self, job_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """وضعیت چند کار (برای پیگیری پایان پردازش، مثلاً در تست بار)"""
+        ids = [int(job_id) for job_id in job_ids][:500]
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        rows = self._conn().execute(
+            f"SELECT id, order_id, status, attempts, updated_at FROM jobs WHERE id IN ({placeholders})", ids
+        ).fetchall()
+        return {row['id']: {k: row[k] for k in ('order_id', 'status', 'attempts', 'updated_at')} for row in rows}
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+
+class JobWorkerPool:
+    """تردهای پس‌زمینه که کارهای صف را با handler اجرا می‌کنند"""
+
+    def __init__(self, queue: JobQueue, handler: Callable[[Dict[str, Any]], bool],
+                 workers: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = max(1, int(workers or QUEUE_CONFIG.get('workers', 2)))
+        self.poll_interval = float(poll_interval or QUEUE_CONFIG.get('poll_interval', 1.0))
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info(f"♻️ {recovered} کار نیمه‌کاره دوباره در صف قرار گرفت")
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"label-worker-{i + 1}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"👷 {self.workers} ترد پردازش صف شروع به کار کرد")
+
+    def notify(self) -> None:
+        """بیدار کردن تردها بعد از افزودن کار جدید"""
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+            except sqlite3.Error as e:
+                logger.error(f"❌ خطا در خواندن صف: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._execute(job)
+
+    def _execute(self, job: Dict[str, Any]) -> None:
+        job_id, order_id = job['id'], job['order_id']
+        try:
+            ok = self.handler(job['payload'])
+            error = None if ok else 'handler returned False'
+        except Exception as e:
+            ok, error = False, str(e)
+
+        if ok:
+            self.queue.complete(job_id)
+            logger.info(f"✅ کار {job_id} (سفارش {order_id}) انجام شد")
+        elif self.queue.fail(job_id, error, job['attempts']):
+            logger.warning(f"⚠️ کار {job_id} (سفارش {order_id}) ناموفق بود - تلاش مجدد بعداً ({error})")
+        else:
+            logger.error(f"❌ کار {job_id} (سفارش {order_id}) پس از {job['attempts']} تلاش کنار گذاشته شد ({error})")
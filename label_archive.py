@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+بایگانی غیرهمزمان تصاویر لیبل روی دیسک
+
+لیبل‌ها مستقیماً از حافظه چاپ می‌شوند؛ ذخیره فایل (JPEG در پوشه labels)
+فقط برای بایگانی است و در یک ترد پس‌زمینه انجام می‌شود تا چاپ منتظر
+فشرده‌سازی و نوشتن روی دیسک نماند. فشرده‌سازی (در حافظه) و نوشتن فایل جدا
+زمان‌گیری می‌شوند (مراحل encoding و disk_write در metrics.py).
+"""
+
+import atexit
+import io
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+from config import LABEL_CONFIG
+from metrics import get_metrics
+
+
+class LabelArchiver:
+    """صف ذخیره تصاویر لیبل با یک ترد نویسنده"""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = LABEL_CONFIG.get('archive_labels', True) if enabled is None else enabled
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {'saved': 0, 'failed': 0, 'skipped': 0}
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="label-archiver", daemon=True)
+                self._thread.start()
+
+    def archive(self, img, path: str, save_options: Optional[Dict[str, Any]] = None, label: str = '') -> bool:
+        """
+        افزودن تصویر به صف ذخیره (label: نوع لیبل برای متریک‌ها)
+
+        Returns:
+            False اگر بایگانی غیرفعال باشد
+        """
+        if not self.enabled or not path:
+            with self._lock:
+                self._stats['skipped'] += 1
+            return False
+        self._ensure_thread()
+        self._queue.put((img, path, save_options or {}, label))
+        return True
+
+    def _run(self) -> None:
+        metrics = get_metrics()
+        while True:
+            img, path, save_options, label = self._queue.get()
+            try:
+                started = time.perf_counter()
+                buffer = io.BytesIO()
+                ext = os.path.splitext(path)[1].lower()
+                img.save(buffer, format=Image.registered_extensions().get(ext, 'PNG'), **save_options)
+                encoded = time.perf_counter()
+                metrics.observe('encoding', encoded - started, label)
+
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(buffer.getbuffer())
+                metrics.observe('disk_write', time.perf_counter() - encoded, label)
+                with self._lock:
+                    self._stats['saved'] += 1
+            except Exception as e:
+                print(f"❌ خطا در ذخیره لیبل {path}: {e}")
+                metrics.inc('failures_total', stage='archive', label=label)
+                with self._lock:
+                    self._stats['failed'] += 1
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """صبر تا ذخیره همه تصاویر صف‌شده"""
+        self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, enabled=self.enabled, pending=self._queue.qsize())
+
+
+_archiver: Optional[LabelArchiver] = None
+_archiver_lock = threading.Lock()
+
+
+def get_archiver() -> LabelArchiver:
+    """نمونه مشترک بایگانی لیبل در این پروسه"""
+    global _archiver
+    with _archiver_lock:
+        if _archiver is None:
+            _archiver = LabelArchiver()
+            # تصاویر صف‌شده قبل از خروج پروسه نوشته شوند
+            atexit.register(_archiver.flush)
+        return _archiver
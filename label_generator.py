@@ -13,37 +13,20 @@ from datetime import datetime
 from woocommerce_api import WooCommerceAPI
 from config import WOOCOMMERCE_CONFIG, LABEL_CONFIG
 import platform
+from product_catalog import get_catalog, order_product_ids
 
-# Import label generation functions with platform detection
+# Check label generation modules (rendering itself runs in the render executor processes)
 try:
-    from label_main import generate_main_label
-    from label_details import generate_details_label
-    from label_mixed import generate_mixed_label
+    import label_main, label_details, label_mixed
+    LABELS_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️ Warning: Could not import label generation modules: {e}")
     print("This might be due to missing dependencies. The script will continue with limited functionality.")
-    # Create dummy functions to prevent crashes
-    def generate_main_label(*args, **kwargs):
-        print("❌ Label generation not available due to import errors")
-        return False
-    def generate_details_label(*args, **kwargs):
-        print("❌ Label generation not available due to import errors")
-        return False
-    def generate_mixed_label(*args, **kwargs):
-        print("❌ Label generation not available due to import errors")
-        return False
+    LABELS_AVAILABLE = False
 
-# Import printing functionality
-try:
-    import win32print, win32ui
-    from PIL import ImageWin
-    PRINTING_AVAILABLE = True
-except ImportError:
-    PRINTING_AVAILABLE = False
-    print("⚠️ ماژول‌های چاپ در دسترس نیستند - فقط ذخیره تصاویر انجام می‌شود")
-
-# تنظیمات چاپگر
-PRINTER_NAME = "Godex G500"  # نام چاپگر
+from render_executor import get_render_executor, shutdown_render_executor
+from printer_backend import get_printer_backend, close_printer_backend
+from render_mode import label_extension
 
 # تنظیمات لاگ
 def setup_logging():
@@ -69,52 +52,28 @@ def setup_logging():
 # راه‌اندازی لاگ
 logger = setup_logging()
 
-def print_label(image_path, save_when_print_fails=True):
-    """چاپ لیبل یا ذخیره به عنوان فالبک"""
+def save_unprinted(label, save_path):
+    """ذخیره لیبلی که چاپ نشد (تصویر در حافظه) تا بعداً دستی چاپ شود"""
+    if not save_path or isinstance(label, str):
+        return
     try:
-        if not PRINTING_AVAILABLE:
-            logger.info(f"💾 چاپگر در دسترس نیست - تصویر ذخیره شد: {image_path}")
-            return True
-            
-        # بررسی وجود چاپگر
-        printers = [printer[2] for printer in win32print.EnumPrinters(2)]
-        if PRINTER_NAME not in printers:
-            logger.warning(f"⚠️ چاپگر '{PRINTER_NAME}' یافت نشد - تصویر ذخیره شد: {image_path}")
-            return True
-        
-        # بارگذاری تصویر
-        from PIL import Image
-        img = Image.open(image_path)
-        
-        # چاپ
-        hprinter = win32print.OpenPrinter(PRINTER_NAME)
-        pdc = win32ui.CreateDC()
-        pdc.CreatePrinterDC(PRINTER_NAME)
-        pdc.StartDoc("Offer Coffee Label")
-        pdc.StartPage()
-        
-        dib = ImageWin.Dib(img)
-        dib.draw(pdc.GetHandleOutput(), (0, 0, img.width, img.height))
-        
-        pdc.EndPage()
-        pdc.EndDoc()
-        pdc.DeleteDC()
-        
-        logger.info(f"✅ لیبل با موفقیت چاپ شد: {image_path}")
-        
-        # اگر چاپ موفق بود و نیازی به ذخیره نیست، فایل را حذف کن
-        if not save_when_print_fails:
-            try:
-                os.remove(image_path)
-                logger.info(f"🗑️ فایل تصویر حذف شد: {image_path}")
-            except Exception as e:
-                logger.warning(f"⚠️ خطا در حذف فایل: {e}")
-        
-        return True
-        
+        label.save(save_path)
     except Exception as e:
-        logger.error(f"❌ خطا در چاپ - تصویر ذخیره شد: {e}")
-        return False
+        logger.warning(f"⚠️ خطا در ذخیره فایل: {e}")
+
+def print_order_labels(order_id, labels):
+    """چاپ لیبل‌های یک سفارش در یک کار چندصفحه‌ای؛ اگر چاپ انجام نشود تصاویر ذخیره می‌شوند
+
+    labels: لیست (مسیر ذخیره، تصویر، نوع لیبل)
+    """
+    printer = get_printer_backend()
+    pages = [(img, 1, kind) for _, img, kind in labels]
+    if printer.ready() and printer.print_job(pages, title=f"Offer Coffee - order {order_id}"):
+        return True
+    for save_path, img, _ in labels:
+        save_unprinted(img, save_path)
+    logger.warning(f"💾 لیبل‌های سفارش {order_id} چاپ نشدند - تصاویر ذخیره شدند")
+    return False
 
 def is_mixed_order(order_details):
     """تشخیص سفارش‌های میکس بر اساس نام محصولات"""
@@ -156,6 +115,19 @@ def process_orders():
     # ایجاد پوشه خروجی
     os.makedirs(LABEL_CONFIG['output_dir'], exist_ok=True)
     
+    if not LABELS_AVAILABLE:
+        logger.error("❌ ماژول‌های تولید لیبل در دسترس نیستند")
+        return
+    executor = get_render_executor()
+    
+    # به‌روزرسانی کاتالوگ محلی محصولات (لینک QR لیبل جزئیات)
+    try:
+        catalog = get_catalog()
+        catalog.sync_modified(wc_api)
+        catalog.ensure_products(wc_api, [pid for order in orders for pid in order_product_ids(order)])
+    except Exception as e:
+        logger.warning(f"⚠️ خطا در همگام‌سازی کاتالوگ محصولات: {e}")
+    
     # پردازش هر سفارش
     for order in orders:
         order_id = order['id']
@@ -176,7 +148,7 @@ def process_orders():
                 all_labels = []
                 
                 # تولید لیبل main (back) برای سفارش میکس
-                main_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_back_1.jpg"
+                main_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_back_1{label_extension()}"
                 logger.info(f"🏷️ تولید لیبل main برای سفارش میکس {order_id}")
                 
                 # ایجاد کپی از order_details برای لیبل main
@@ -184,24 +156,27 @@ def process_orders():
                 # برای لیبل main، فقط یک محصول میکس در نظر بگیریم
                 main_order['line_items'] = [order_details['line_items'][0]] if order_details['line_items'] else []
                 
-                generate_main_label(main_order, main_label_path)
                 all_labels.append(main_label_path)
                 
                 # تولید لیبل میکس
-                mixed_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_mixed.jpg"
-                generate_mixed_label(order_details, mixed_label_path)
+                mixed_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_mixed{label_extension()}"
                 all_labels.append(mixed_label_path)
                 
+                # رندر موازی هر دو لیبل (در حافظه؛ فایل فقط برای لیبل‌های چاپ‌نشده)
+                images = executor.render_many([
+                    ('main', main_order, None),
+                    ('mixed', order_details, None),
+                ])
+                all_labels = list(zip(all_labels, images, ('main', 'mixed')))
+                
                 logger.info(f"✅ لیبل‌های سفارش میکس {order_id} با موفقیت تولید شدند")
                 
-                # چاپ تمام لیبل‌های این سفارش میکس به ترتیب
+                # چاپ تمام لیبل‌های این سفارش میکس در یک کار
                 logger.info(f"🖨️ شروع چاپ {len(all_labels)} لیبل برای سفارش میکس {order_id}...")
-                for i, label_path in enumerate(all_labels):
-                    print_success = print_label(label_path, save_when_print_fails=False)
-                    if print_success:
-                        logger.info(f"✅ لیبل {i+1}/{len(all_labels)} چاپ شد: {os.path.basename(label_path)}")
-                    else:
-                        logger.warning(f"⚠️ لیبل {i+1}/{len(all_labels)} ذخیره شد: {os.path.basename(label_path)}")
+                for i, (label_path, img, kind) in enumerate(all_labels):
+                    if img is None:
+                        logger.warning(f"⚠️ لیبل {i+1}/{len(all_labels)} تولید نشد: {os.path.basename(label_path)}")
+                print_order_labels(order_id, [label for label in all_labels if label[1] is not None])
                 
                 logger.info(f"✅ تمام لیبل‌های سفارش میکس {order_id} پردازش شدند")
                 
@@ -214,41 +189,43 @@ def process_orders():
                 
                 # لیست تمام لیبل‌های تولید شده برای این سفارش
                 all_labels = []
+                render_jobs = []
                 
                 # تولید تمام لیبل‌های پشت (back) برای این سفارش
                 for i, item in enumerate(line_items):
                     # ایجاد لیبل پشت برای هر محصول
-                    back_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_back_{i+1}.jpg"
+                    back_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_back_{i+1}{label_extension()}"
                     logger.info(f"🏷️ تولید لیبل پشت برای محصول {i+1}: {item.get('name', 'نامشخص')}")
                     
                     # ایجاد کپی از order_details با فقط این محصول
                     single_product_order = order_details.copy()
                     single_product_order['line_items'] = [item]
                     
-                    generate_main_label(single_product_order, back_label_path)
+                    render_jobs.append(('main', single_product_order, None))
                     all_labels.append(back_label_path)
                 
                 # تولید تمام لیبل‌های جزئیات برای این سفارش
                 for i, item in enumerate(line_items):
                     # ایجاد لیبل جزئیات برای هر محصول
-                    details_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_details_{i+1}.jpg"
+                    details_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_details_{i+1}{label_extension()}"
                     logger.info(f"📋 تولید لیبل جزئیات برای محصول {i+1}: {item.get('name', 'نامشخص')}")
                     
                     # ایجاد کپی از order_details با فقط این محصول
                     single_product_order = order_details.copy()
                     single_product_order['line_items'] = [item]
                     
-                    generate_details_label(single_product_order, details_label_path)
+                    render_jobs.append(('details', single_product_order, None))
                     all_labels.append(details_label_path)
                 
-                # چاپ تمام لیبل‌های این سفارش به ترتیب
+                # رندر موازی تمام لیبل‌های این سفارش (در حافظه)
+                all_labels = list(zip(all_labels, executor.render_many(render_jobs), [kind for kind, _, _ in render_jobs]))
+                
+                # چاپ تمام لیبل‌های این سفارش در یک کار
                 logger.info(f"🖨️ شروع چاپ {len(all_labels)} لیبل برای سفارش {order_id}...")
-                for i, label_path in enumerate(all_labels):
-                    print_success = print_label(label_path, save_when_print_fails=False)
-                    if print_success:
-                        logger.info(f"✅ لیبل {i+1}/{len(all_labels)} چاپ شد: {os.path.basename(label_path)}")
-                    else:
-                        logger.warning(f"⚠️ لیبل {i+1}/{len(all_labels)} ذخیره شد: {os.path.basename(label_path)}")
+                for i, (label_path, img, kind) in enumerate(all_labels):
+                    if img is None:
+                        logger.warning(f"⚠️ لیبل {i+1}/{len(all_labels)} تولید نشد: {os.path.basename(label_path)}")
+                print_order_labels(order_id, [label for label in all_labels if label[1] is not None])
                 
                 logger.info(f"✅ تمام لیبل‌های سفارش {order_id} پردازش شدند")
             
@@ -256,6 +233,13 @@ def process_orders():
             logger.error(f"❌ خطا در تولید لیبل‌های سفارش {order_id}: {e}")
             continue
     
+    stats = executor.stats()
+    logger.info(f"🧵 رندر: {stats['labels']} لیبل با {stats['workers']} کارگر ({stats['mode']})")
+    for pid, entry in stats['per_worker'].items():
+        logger.info(f"   کارگر {pid}: {entry['labels']} لیبل در {entry['render_s']:.2f}s ({entry['labels_per_s']:.1f} لیبل/ثانیه)")
+    shutdown_render_executor()
+    close_printer_backend()
+    
     logger.info(f"🎉 پردازش کامل شد! لاگ‌ها در پوشه 'logs' ذخیره شدند.")
 
 def main():
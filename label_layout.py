@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+چیدمان اعلانی لیبل‌ها و کامپایل آن به برنامه رسم
+
+هر لیبل به صورت لیستی از اجزا (متن، بلوک چندخطی، خط‌چین، QR و جای‌خالی‌های
+اطلاعات سفارش) تعریف می‌شود. این لیست برای هر اندازه بوم یک بار کامپایل
+می‌شود: متن‌های ثابت شکل‌دهی و اندازه‌گیری و مختصات همه اجزا محاسبه
+می‌شوند. رسم لیبل فقط اجرای پشت سر هم دستورات آماده است؛ برای جای‌خالی‌ها
+فقط متن سفارش اندازه‌گیری می‌شود.
+
+مختصات افقی (x):
+    عدد                  لبه چپ
+    'center'             وسط بوم (W - w) / 2
+    'center_floor'       وسط بوم (W - w) // 2
+    ('right', m)         راست‌چین با فاصله m از لبه راست
+    ('center_in', x, w)  وسط کادر افقی [x، x + w]
+    ('align', id, m)     هم‌تراز با شروع متن id (بلوک تا فاصله m از لبه راست جابه‌جا می‌شود)
+
+مختصات عمودی (y):
+    عدد                  لبه بالا
+    ('bottom', m)        فاصله m از پایین بوم تا پایین متن
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from qr_cache import get_qr
+from render_mode import new_canvas
+from text_cache import RTL_KWARGS, fa_shape, measure_text
+
+Size = Tuple[int, int]
+
+
+# ==============================
+# 🧱 اجزای چیدمان
+# ==============================
+def text(value: str, font: str, x, y, fa: bool = True, id: Optional[str] = None) -> Dict[str, Any]:
+    return {"kind": "text", "text": value, "font": font, "x": x, "y": y, "fa": fa, "id": id}
+
+
+def lines(values: List[str], font: str, x, y: int, step: int, fa: bool = True) -> Dict[str, Any]:
+    return {"kind": "lines", "lines": list(values), "font": font, "x": x, "y": y, "step": step, "fa": fa}
+
+
+def dashed_line(y: int, margin: int = 60, dash: int = 8, gap: int = 4, width: int = 2) -> Dict[str, Any]:
+    return {"kind": "dashed", "y": y, "margin": margin, "dash": dash, "gap": gap, "width": width}
+
+
+def qr(data: str, x: int, y: int, size: int) -> Dict[str, Any]:
+    return {"kind": "qr", "data": data, "x": x, "y": y, "size": size}
+
+
+def text_slot(name: str, font: str, x, y, fa: bool = True) -> Dict[str, Any]:
+    """جای‌خالی یک خط متن سفارش"""
+    return {"kind": "text_slot", "name": name, "font": font, "x": x, "y": y, "fa": fa}
+
+
+def lines_slot(name: str, font: str, x, y: int, step: int, blank_step: Optional[int] = None,
+               fa: bool = True) -> Dict[str, Any]:
+    """جای‌خالی چند خط متن سفارش (خط خالی = فاصله blank_step)"""
+    return {"kind": "lines_slot", "name": name, "font": font, "x": x, "y": y, "step": step,
+            "blank_step": step if blank_step is None else blank_step, "fa": fa}
+
+
+def qr_slot(name: str, x: int, y: int, size: int) -> Dict[str, Any]:
+    """جای‌خالی QR (مقدار: متن یا لینک)"""
+    return {"kind": "qr_slot", "name": name, "x": x, "y": y, "size": size}
+
+
+# ==============================
+# 📐 محاسبه مختصات
+# ==============================
+def _resolve_x(spec, width: int, canvas_w: int, anchors: Dict[str, int]):
+    if isinstance(spec, (int, float)):
+        return spec
+    if spec == "center":
+        return (canvas_w - width) / 2
+    if spec == "center_floor":
+        return (canvas_w - width) // 2
+    kind = spec[0]
+    if kind == "right":
+        return canvas_w - width - spec[1]
+    if kind == "center_in":
+        return spec[1] + (spec[2] - width) // 2
+    if kind == "align":
+        x = anchors[spec[1]]
+        if x + width > canvas_w - spec[2]:
+            x = canvas_w - width - spec[2]
+        return x
+    raise ValueError(f"مختصات افقی نامعتبر: {spec}")
+
+
+def _resolve_y(spec, height: int, canvas_h: int):
+    if isinstance(spec, (int, float)):
+        return spec
+    if spec[0] == "bottom":
+        return canvas_h - height - spec[1]
+    raise ValueError(f"مختصات عمودی نامعتبر: {spec}")
+
+
+def _draw_text(draw, xy, shaped: str, font, rtl: bool, stroke: bool) -> None:
+    kwargs = RTL_KWARGS if rtl else {}
+    if stroke:
+        # حاشیه سفید ۱ پیکسلی (مثل draw_stroked_text)
+        draw.text(xy, shaped, font=font, fill="black", stroke_width=1, stroke_fill="white", **kwargs)
+    else:
+        draw.text(xy, shaped, font=font, fill="black", **kwargs)
+
+
+# ==============================
+# 🗺️ برنامه رسم
+# ==============================
+class RenderPlan:
+    """چیدمان کامپایل‌شده برای یک اندازه بوم"""
+
+    def __init__(self, size: Size, ops: List[Tuple], slots: Dict[str, Dict[str, Any]],
+                 anchors: Dict[str, int], stroke: bool):
+        self.size = size
+        self.ops = ops
+        self.slots = slots
+        self.anchors = anchors
+        self.stroke = stroke
+
+    def render_static(self) -> Image.Image:
+        """رسم بخش‌های ثابت روی بوم جدید"""
+        img = new_canvas(self.size)
+        draw = ImageDraw.Draw(img)
+        stroke = self.stroke
+        for op in self.ops:
+            if op[0] == "text":
+                _, xy, shaped, font, rtl = op
+                _draw_text(draw, xy, shaped, font, rtl, stroke)
+            elif op[0] == "line":
+                draw.line(op[1], fill="black", width=op[2])
+            else:
+                _, data, size, xy = op
+                img.paste(get_qr(data, size), xy)
+        return img
+
+    def fill(self, img: Image.Image, values: Dict[str, Any]) -> None:
+        """رسم اطلاعات سفارش در جای‌خالی‌ها (به ترتیب values)"""
+        draw = ImageDraw.Draw(img)
+        canvas_w, canvas_h = self.size
+        for name, value in values.items():
+            slot = self.slots[name]
+            kind = slot["kind"]
+            if kind == "qr_slot":
+                img.paste(get_qr(value, slot["size"]), (slot["x"], slot["y"]))
+                continue
+
+            font, fa = slot["font"], slot["fa"]
+            if kind == "text_slot":
+                w, h = measure_text(value, font, fa)
+                xy = (_resolve_x(slot["x"], w, canvas_w, self.anchors), _resolve_y(slot["y"], h, canvas_h))
+                _draw_text(draw, xy, fa_shape(value) if fa else value, font, fa, self.stroke)
+                continue
+
+            # lines_slot: با 'align' همه خطوط بلوک با عرض بلندترین خط تراز می‌شوند؛
+            # در بقیه حالت‌ها هر خط جداگانه تراز می‌شود
+            spec = slot["x"]
+            shared_x = None
+            if isinstance(spec, tuple) and spec[0] == "align":
+                widest = max((measure_text(line, font, fa)[0] for line in value), default=0)
+                shared_x = _resolve_x(spec, widest, canvas_w, self.anchors)
+            y = slot["y"]
+            for line in value:
+                if not line.strip():
+                    y += slot["blank_step"]
+                    continue
+                if shared_x is not None:
+                    x = shared_x
+                elif isinstance(spec, (int, float)):
+                    x = spec
+                else:
+                    x = _resolve_x(spec, measure_text(line, font, fa)[0], canvas_w, self.anchors)
+                _draw_text(draw, (x, y), fa_shape(line) if fa else line, font, fa, self.stroke)
+                y += slot["step"]
+
+
+def _compile(layout: Dict[str, Any], size: Size, fonts: Dict[str, Any]) -> RenderPlan:
+    canvas_w, canvas_h = size
+    ops: List[Tuple] = []
+    slots: Dict[str, Dict[str, Any]] = {}
+    anchors: Dict[str, int] = {}
+
+    def add_text(value, font, x_spec, y_spec, fa, element_id=None):
+        w, h = measure_text(value, font, fa)
+        x = _resolve_x(x_spec, w, canvas_w, anchors)
+        if element_id:
+            anchors[element_id] = x
+        ops.append(("text", (x, _resolve_y(y_spec, h, canvas_h)), fa_shape(value) if fa else value, font, fa))
+
+    for element in layout["elements"]:
+        kind = element["kind"]
+        if kind == "text":
+            add_text(element["text"], fonts[element["font"]], element["x"], element["y"], element["fa"], element["id"])
+        elif kind == "lines":
+            y = element["y"]
+            for line in element["lines"]:
+                add_text(line, fonts[element["font"]], element["x"], y, element["fa"])
+                y += element["step"]
+        elif kind == "dashed":
+            x, x_end = element["margin"], canvas_w - element["margin"]
+            while x < x_end:
+                ops.append(("line", [(x, element["y"]), (min(x + element["dash"], x_end), element["y"])], element["width"]))
+                x += element["dash"] + element["gap"]
+        elif kind == "qr":
+            ops.append(("qr", element["data"], element["size"], (element["x"], element["y"])))
+        elif kind in ("text_slot", "lines_slot", "qr_slot"):
+            slot = dict(element)
+            if "font" in slot:
+                slot["font"] = fonts[slot["font"]]
+            slots[element["name"]] = slot
+        else:
+            raise ValueError(f"جزء چیدمان نامعتبر: {kind}")
+
+    return RenderPlan(size, ops, slots, anchors, layout.get("stroke", False))
+
+
+_lock = threading.Lock()
+_plans: Dict[Tuple[Any, ...], RenderPlan] = {}
+_stats = {"hits": 0, "compiles": 0}
+
+
+def compile_layout(layout: Dict[str, Any], size: Size, fonts: Callable[[], Dict[str, Any]]) -> RenderPlan:
+    """
+    برنامه رسم چیدمان برای اندازه بوم (یک بار برای هر چیدمان، نسخه و اندازه)
+
+    Args:
+        layout: {'name', 'version', 'stroke', 'elements'}
+        size: اندازه بوم
+        fonts: تابعی که دیکشنری فونت‌های چیدمان را برمی‌گرداند (فقط هنگام کامپایل صدا زده می‌شود)
+    """
+    key = (layout["name"], layout.get("version", 1), tuple(size))
+    with _lock:
+        plan = _plans.get(key)
+        if plan is not None:
+            _stats["hits"] += 1
+            return plan
+
+    plan = _compile(layout, tuple(size), fonts())
+
+    with _lock:
+        _plans.setdefault(key, plan)
+        _stats["compiles"] += 1
+        return _plans[key]
+
+
+def layout_stats() -> Dict[str, Any]:
+    """آمار برنامه‌های رسم کامپایل‌شده"""
+    with _lock:
+        return {"plans": len(_plans), "hits": _stats["hits"], "compiles": _stats["compiles"]}
@@ -1,20 +1,8 @@
-from PIL import Image, ImageDraw, ImageFont, features
-import qrcode
-from arabic_reshaper import reshape
 import jdatetime
-import os
-
-# Handle bidi import with fallback for Windows DLL issues
-try:
-    from bidi.algorithm import get_display
-    BIDI_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Warning: bidi package not available ({e}). Using fallback for text shaping.")
-    BIDI_AVAILABLE = False
-    
-    # Fallback function that just returns the text as-is
-    def get_display(text):
-        return text
+from font_cache import get_font, get_regular_fa_font, get_website_font
+from label_layout import compile_layout, lines, qr, text, text_slot
+from render_mode import canvas_mode, finalize, finalize_static, save_options
+from template_cache import get_static_base
 
 # ==============================
 # ⚙️ تنظیمات کلی
@@ -25,221 +13,133 @@ FONT_FA = "BTitrBd.ttf"
 # اندازه لیبل (بر اساس لیبل واقعی تصویر)
 LABEL_W, LABEL_H = 617, 800  # حدود 8×10 سانتی‌متر
 
-def generate_main_label(order_data, output_path):
-    """تولید لیبل اصلی - ثابت برای همه سفارشات"""
-    
-    # استخراج اطلاعات از سفارش (فقط شماره سفارش)
-    order_no = str(order_data['id'])
-    today = jdatetime.date.today()
-    date = today.strftime("%Y/%m/%d")
-    
-    # آدرس‌های ثابت شرکت
-    address_lines = [
-        "شعبه مرکزی: خ شریعتی، خ پلیس، خ اجاره دار پ۵۵۵",
-        "شعبه ۲: خ بنی هاشم، خ رسول رحیمی، نبش خیابان اتحاد پلاک ۱۷",
-        "امور بازرگانی: خ شریعتی، خ پلیس، خ اجاره دار",
-        "کوچه چهل و پنجم، پلاک ۳۸",
-        "پشتیبانی: ۹۰۰۰۴۵۰۵"
-    ]
-
-    # ساخت تصویر سفید
-    img = Image.new("RGB", (LABEL_W, LABEL_H), "white")
-    draw = ImageDraw.Draw(img)
+# نسخه قالب؛ با هر تغییر در بخش‌های ثابت لیبل افزایش دهید تا پایه کش‌شده دوباره ساخته شود
+TEMPLATE_VERSION = 2
 
-    # ==============================
-    # 🎨 تنظیم فونت‌ها
-    # ==============================
-    HAS_RAQM = features.check("raqm")
-
-    font_title = ImageFont.truetype(FONT_EN, 82)
-    font_brand = ImageFont.truetype(FONT_FA, 48)
-    font_bold = ImageFont.truetype(FONT_FA, 28)
-    font_medium = ImageFont.truetype(FONT_FA, 26)
-    font_small = ImageFont.truetype(FONT_FA, 24)
-    # Use OpenSans font from project root for website address (15% smaller)
-    try:
-        font_website = ImageFont.truetype("OpenSans-Regular.ttf", 61)
-    except OSError:
-        try:
-            # Platform-specific fallback paths
-            import platform
-            if platform.system() == "Windows":
-                # Windows system fonts
-                font_website = ImageFont.truetype("C:/Windows/Fonts/arial.ttf", 61)
-            else:
-                # Linux system fonts
-                font_website = ImageFont.truetype("/usr/share/fonts/open-sans/OpenSans-Regular.ttf", 61)
-        except OSError:
-            # Final fallback to default font
-            font_website = ImageFont.load_default()
-
-    # Try to use a regular (non-bold) Persian/Arabic-capable font for non-bold sections
-    def _find_regular_fa_font_path() -> str | None:
-        import platform
-        
-        # Platform-specific font paths
-        if platform.system() == "Windows":
-            candidates = [
-                # Windows system fonts
-                "C:/Windows/Fonts/NotoSansArabic-Regular.ttf",
-                "C:/Windows/Fonts/NotoNaskhArabic-Regular.ttf",
-                "C:/Windows/Fonts/arial.ttf",
-                "C:/Windows/Fonts/calibri.ttf",
-                "C:/Windows/Fonts/tahoma.ttf",
-                # Project/local fallbacks
-                "NotoSansArabic-Regular.ttf",
-                "NotoNaskhArabic-Regular.ttf",
-                "Vazirmatn-Regular.ttf",
-                "IRANSans.ttf",
-                "Sahel.ttf",
-                "DejaVuSans.ttf",
-            ]
-        else:  # Linux/Unix
-            candidates = [
-                # Light/Thin variants (preferred for thinner look)
-                "/usr/share/fonts/noto/NotoSansArabic-ExtraLight.ttf",
-                "/usr/share/fonts/noto/NotoSansArabic-Light.ttf",
-                "/usr/share/fonts/noto/NotoNaskhArabic-Light.ttf",
-                # Variable font (weight selection not supported directly, but can still look thinner)
-                "/usr/share/fonts/google-noto-vf/NotoSansArabic[wght].ttf",
-                # Regular Noto (widely available on Fedora)
-                "/usr/share/fonts/noto/NotoSansArabic-Regular.ttf",
-                "/usr/share/fonts/noto/NotoNaskhArabic-Regular.ttf",
-                # DejaVu (fallback, decent Arabic glyphs)
-                "/usr/share/fonts/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                # Project/local fallbacks
-                "NotoSansArabic-ExtraLight.ttf",
-                "NotoSansArabic-Light.ttf",
-                "NotoNaskhArabic-Light.ttf",
-                "NotoSansArabic-Regular.ttf",
-                "NotoNaskhArabic-Regular.ttf",
-                "Vazirmatn-Regular.ttf",
-                "IRANSans.ttf",
-                "Sahel.ttf",
-                "DejaVuSans.ttf",
-            ]
-        
-        for path in candidates:
-            if os.path.exists(path):
-                return path
-        return None
-
-    _regular_fa_font_path = _find_regular_fa_font_path()
-    font_fa_regular_small = (
-        ImageFont.truetype(_regular_fa_font_path, 24)
-        if _regular_fa_font_path
-        else font_small
+# پارامترهای ذخیره فایل لیبل (بایگانی)
+SAVE_OPTIONS = {}
+
+# آدرس‌های ثابت شرکت
+ADDRESS_LINES = [
+    "شعبه مرکزی: خ شریعتی، خ پلیس، خ اجاره دار پ۵۵۵",
+    "شعبه ۲: خ بنی هاشم، خ رسول رحیمی، نبش خیابان اتحاد پلاک ۱۷",
+    "امور بازرگانی: خ شریعتی، خ پلیس، خ اجاره دار",
+    "کوچه چهل و پنجم، پلاک ۳۸",
+    "پشتیبانی: ۹۰۰۰۴۵۰۵"
+]
+
+DESC_LINES = [
+    "قهوه آفر بزرگترین فروشگاه اینترنتی کشور",
+    "عرضه کننده مرغوب ترین دانه قهوه",
+    "قهوه فوری و تجهیزات",
+]
+
+BOTTOM_Y = 515
+INFO_Y = BOTTOM_Y + 10
+INFO_LINE_H = 42
+RIGHT_MARGIN = 25
+
+
+# ==============================
+# 🎨 تنظیم فونت‌ها
+# ==============================
+def _load_fonts():
+    font_small = get_font(FONT_FA, 24)
+    return {
+        "title": get_font(FONT_EN, 82),
+        "brand": get_font(FONT_FA, 48),
+        "bold": get_font(FONT_FA, 28),
+        "medium": get_font(FONT_FA, 26),
+        "small": font_small,
+        # Use OpenSans font from project root for website address (15% smaller)
+        "website": get_website_font(61),
+        # Try to use a regular (non-bold) Persian/Arabic-capable font for non-bold sections
+        "fa_regular_small": get_regular_fa_font(24, font_small),
+    }
+
+
+# ==============================
+# 🧱 چیدمان لیبل
+# ==============================
+LAYOUT = {
+    "name": "main",
+    "version": TEMPLATE_VERSION,
+    "elements": [
+        # 🔹 OFFER COFFEE و قهوه آفر
+        text("OFFER COFFEE", "title", "center", 25, fa=False),
+        text("قهوه آفر", "brand", "center", 120),
+
+        # 🔹 آدرس‌ها و توضیحات (راست‌چین)
+        lines(ADDRESS_LINES, "small", ("right", RIGHT_MARGIN), 195, 33),
+        lines(DESC_LINES, "fa_regular_small", ("right", RIGHT_MARGIN), 370, 37),
+
+        # 🔳 QR آدرس سایت؛ پروانه بهداشت بالا و شماره پروانه زیر آن (وسط QR)
+        qr("https://offercoffee.ir", 45, BOTTOM_Y, 150),
+        text("پروانه بهداشت", "fa_regular_small", ("center_in", 45, 150), BOTTOM_Y - 30),
+        text("14046488", "fa_regular_small", ("center_in", 45, 150), BOTTOM_Y + 150 - 10),
+
+        # 🔸 خطوط اطلاعات (تاریخ تولید روزانه، شماره سفارش برای هر لیبل)
+        text_slot("production_date", "bold", ("right", RIGHT_MARGIN), INFO_Y),
+        text("انقضا ۲ سال پس از تولید", "bold", ("right", RIGHT_MARGIN), INFO_Y + INFO_LINE_H),
+        text_slot("order_no", "bold", ("right", RIGHT_MARGIN), INFO_Y + 2 * INFO_LINE_H),
+
+        # 🔸 آدرس سایت در پایین صفحه (50 پیکسل از پایین)
+        text("www.offercoffee.ir", "website", "center_floor", ("bottom", 50), fa=False),
+    ],
+}
+
+
+def _plan():
+    return compile_layout(LAYOUT, (LABEL_W, LABEL_H), _load_fonts)
+
+
+def _render_static_layer(date):
+    """رسم بخش‌های ثابت لیبل (به همراه خط تاریخ روز)"""
+    plan = _plan()
+    img = plan.render_static()
+    plan.fill(img, {"production_date": f"تاریخ تولید: {date}"})
+    return img
+
+
+def _static_base(date):
+    return get_static_base(
+        "main",
+        (TEMPLATE_VERSION, LABEL_W, LABEL_H, canvas_mode(), date),
+        lambda: _render_static_layer(date),
     )
 
-    # ==============================
-    # 📏 توابع کمکی
-    # ==============================
-    def fa_shape(text):
-        if HAS_RAQM:
-            return text
-        elif BIDI_AVAILABLE:
-            return get_display(reshape(text))
-        else:
-            # Fallback: just reshape without bidi processing
-            try:
-                return reshape(text)
-            except:
-                return text
-
-    def draw_fa(draw, xy, text, font, fill="black"):
-        kwargs = {"direction": "rtl", "language": "fa"} if HAS_RAQM else {}
-        draw.text(xy, fa_shape(text), font=font, fill=fill, **kwargs)
-
-    def text_size(draw, text, font, fa=False):
-        shaped = fa_shape(text) if fa else text
-        kwargs = {"direction": "rtl", "language": "fa"} if fa and HAS_RAQM else {}
-        bbox = draw.textbbox((0, 0), shaped, font=font, **kwargs)
-        return bbox[2]-bbox[0], bbox[3]-bbox[1]
 
-    # ==============================
-    # 🧱 چیدمان متون
-    # ==============================
+def static_layer():
+    """لایه ثابت فعلی لیبل (برای ذخیره در حافظه چاپگر EZPL)"""
+    return finalize_static("main", _static_base(jdatetime.date.today().strftime("%Y/%m/%d")))
 
-    # 🔹 OFFER COFFEE
-    t = "OFFER COFFEE"
-    tw, th = text_size(draw, t, font_title)
-    draw.text(((LABEL_W - tw) / 2, 25), t, font=font_title, fill="black")
-
-    # 🔹 قهوه آفر
-    brand = "قهوه آفر"
-    bw, bh = text_size(draw, brand, font_brand, fa=True)
-    draw_fa(draw, ((LABEL_W - bw) / 2, 120), brand, font_brand)
-
-    # 🔹 آدرس‌ها - استفاده از اطلاعات مشتری
-    y = 195
-    for line in address_lines:
-        lw, lh = text_size(draw, line, font_small, fa=True)
-        draw_fa(draw, (LABEL_W - lw - 25, y), line, font_small)
-        y += 33
-
-    # 🔹 توضیحات
-    desc = [
-        "قهوه آفر بزرگترین فروشگاه اینترنتی کشور",
-        "عرضه کننده مرغوب ترین دانه قهوه",
-        "قهوه فوری و تجهیزات",
-    ]
-    # Add a little extra space before this section and render with a regular (non-bold) font if available
-    y = 370
-    for line in desc:
-        lw, lh = text_size(draw, line, font_fa_regular_small, fa=True)
-        draw_fa(draw, (LABEL_W - lw - 25, y), line, font_fa_regular_small)
-        y += 37
 
-    # ==============================
-    # 📊 بخش پایین
-    # ==============================
+def prewarm():
+    """بارگذاری فونت‌ها و ساخت لایه ثابت امروز (برای پروسه‌های رندر)"""
+    _load_fonts()
+    static_layer()
+
+
+def generate_main_label(order_data, output_path=None):
+    """تولید لیبل اصلی - ثابت برای همه سفارشات (تصویر لیبل برگردانده می‌شود)"""
+
+    # استخراج اطلاعات از سفارش (فقط شماره سفارش)
+    order_no = str(order_data['id'])
+    today = jdatetime.date.today()
+    date = today.strftime("%Y/%m/%d")
+
+    # کپی از لایه ثابت (برای هر روز یک بار ساخته می‌شود)
+    img = _static_base(date).copy()
 
-    bottom_y = 515
-
-    # 🔳 QR - آدرس سایت
-    qr = qrcode.make("https://offercoffee.ir").resize((150, 150))
-    img.paste(qr, (45, bottom_y))
-
-    # پروانه بهداشت بالای QR
-    health_text = "پروانه بهداشت"
-    hw, hh = text_size(draw, health_text, font_fa_regular_small, fa=True)
-    health_x = 45 + (150 - hw) // 2  # وسط QR
-    health_y = bottom_y - 30
-    draw_fa(draw, (health_x, health_y), health_text, font_fa_regular_small)
-
-    # شماره پروانه زیر QR
-    permit_no = "14046488"
-    pnw, pnh = text_size(draw, permit_no, font_fa_regular_small, fa=True)
-    permit_x = 45 + (150 - pnw) // 2  # وسط QR
-    permit_y = bottom_y + 150 - 10  # نزدیک‌تر به QR (10 پیکسل بالاتر)
-    draw_fa(draw, (permit_x, permit_y), permit_no, font_fa_regular_small)
-
-    # 🔸 متن‌ها - راست‌چین کردن همه متن‌ها
-    info_y = bottom_y + 10
-    infos = [
-        f"تاریخ تولید: {date}",
-        "انقضا ۲ سال پس از تولید",
-        f"شماره سفارش: {order_no}"
-    ]
-
-    # راست‌چین کردن هر خط جداگانه
-    right_margin = 25
-    for i, line in enumerate(infos):
-        lw, lh = text_size(draw, line, font_bold, fa=True)
-        right_x = LABEL_W - right_margin - lw
-        draw_fa(draw, (right_x, info_y + i * 42), line, font_bold)
-
-    # 🔸 آدرس سایت در پایین صفحه
-    website_text = "www.offercoffee.ir"
-    website_w, website_h = text_size(draw, website_text, font_website)
-    website_x = (LABEL_W - website_w) // 2  # وسط صفحه
-    website_y = LABEL_H - website_h - 50  # 50 پیکسل از پایین (30 پیکسل بالاتر)
-    draw.text((website_x, website_y), website_text, font=font_website, fill="black")
+    # 🔸 شماره سفارش
+    _plan().fill(img, {"order_no": f"شماره سفارش: {order_no}"})
 
     # ==============================
     # 🖼 خروجی
     # ==============================
-    img.save(output_path)
-    print(f"✅ لیبل اصلی در {output_path} ذخیره شد")
-    return True
+    # ذخیره فایل اختیاری است؛ مسیر چاپ مستقیماً از تصویر در حافظه استفاده می‌کند
+    img = finalize(img)
+    if output_path:
+        img.save(output_path, **save_options(SAVE_OPTIONS))
+        print(f"✅ لیبل اصلی در {output_path} ذخیره شد")
+    return img
@@ -1,20 +1,8 @@
-from PIL import Image, ImageDraw, ImageFont, features
-import qrcode
-from arabic_reshaper import reshape
-import jdatetime
-import os
-
-# Handle bidi import with fallback for Windows DLL issues
-try:
-    from bidi.algorithm import get_display
-    BIDI_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ Warning: bidi package not available ({e}). Using fallback for text shaping.")
-    BIDI_AVAILABLE = False
-    
-    # Fallback function that just returns the text as-is
-    def get_display(text):
-        return text
+from PIL import ImageFont
+from font_cache import get_font, get_regular_fa_font, get_website_font
+from label_layout import compile_layout, dashed_line, lines, lines_slot, text
+from render_mode import canvas_mode, finalize, save_options
+from template_cache import get_static_base
 
 # 🎯 تنظیمات اصلی
 FONT_EN = "Galatican.ttf"
@@ -22,12 +10,117 @@ FONT_FA = "BTitrBd.ttf"
 
 LABEL_W, LABEL_H = int(80 * 9.6), int(100 * 9.6)  # 80x100mm در 243 DPI (20% افزایش برای کیفیت بهتر)
 
-def generate_mixed_label(order_details, output_path):
-    """تولید برچسب میکس برای سفارش"""
-    
+# نسخه قالب؛ با هر تغییر در بخش‌های ثابت لیبل افزایش دهید تا پایه کش‌شده دوباره ساخته شود
+TEMPLATE_VERSION = 1
+
+# پارامترهای ذخیره فایل لیبل (بایگانی)
+SAVE_OPTIONS = {"dpi": (300, 300), "quality": 95}
+
+# 🏢 آدرس‌ها
+ADDRESSES = [
+    "شعبه مرکزی: خ پلیس، خ اجاره داری، پ ۵۵۵",
+    "شعبه ۲: خ بنی‌هاشم، خ رسول‌رحیمی، اتحاد، پ ۱۷",
+    "امور بازرگانی: خیابان شریعتی، خ پلیس، اجاره داری، ۳۸",
+    "مرکز تماس: ۹۰۰۰۴۵۰۵ (خط ویژه بدون کد تماس) (رایگان)"
+]
+
+# ☕ توضیح پایانی
+DESC_LINES = [
+    "قهوه آفر عرضه کننده مرغوب ترین دانه قهوه",
+    "قهوه فوری و تجهیزات"
+]
+
+# 🧾 بخش ترکیبات و جزئیات محصول - با تراز عمودی بهبود یافته
+Y_CENTER_SECTION = 400  # موقعیت مرکزی برای بخش ترکیبات - moved down from 380 to 400
+COMP_TITLE = "ترکیبات:"
+
+
+# 📚 بارگذاری فونت‌ها
+def _load_fonts():
+    try:
+        font_title = get_font(FONT_EN, 94)  # Increased from 88
+        font_brand = get_font(FONT_FA, 62)  # Increased from 58
+        font_normal = get_font(FONT_FA, 28) # Increased from 26
+        font_small = get_font(FONT_FA, 24)  # Increased from 22
+        font_bold = get_font(FONT_FA, 34)   # Increased from 32
+        # Use OpenSans font from project root for website address (same as main/details)
+        font_website = get_website_font(61)
+    except OSError:
+        print("⚠️ فونت‌ها یافت نشدند، از پیش‌فرض استفاده می‌شود.")
+        font_title = font_brand = font_normal = font_small = font_bold = font_website = ImageFont.load_default()
+
+    # Try to use a regular (non-bold) Persian/Arabic-capable font for non-bold sections
+    return {
+        "title": font_title,
+        "brand": font_brand,
+        "normal": font_normal,
+        "small": font_small,
+        "bold": font_bold,
+        "website": font_website,
+        "fa_regular_small": get_regular_fa_font(24, font_small),  # Increased from 22
+        "fa_regular_normal": get_regular_fa_font(28, font_normal),  # Increased from 26
+    }
+
+
+# 🧱 چیدمان برچسب (همه متن‌ها با حاشیه سفید برای وضوح بیشتر)
+LAYOUT = {
+    "name": "mixed_linux",
+    "version": TEMPLATE_VERSION,
+    "stroke": True,
+    "elements": [
+        # 🏷 عنوان انگلیسی و فارسی
+        text("OFFER COFFEE", "title", "center", 25, fa=False),
+        text("قهوه آفر", "brand", "center", 140),
+
+        # 🏢 آدرس‌ها
+        lines(ADDRESSES, "small", ("right", 30), 210, 40),
+
+        # رسم عنوان ترکیبات (سمت راست، 30px از لبه راست)
+        text(COMP_TITLE, "bold", ("right", 30), Y_CENTER_SECTION, id="comp_title"),
+
+        # ➖ خطوط جداکننده بالا و پایین
+        dashed_line(380),
+        dashed_line(640),
+
+        # ☕ توضیح پایانی
+        lines(DESC_LINES, "fa_regular_small", "center", 650, 32),
+
+        # 🌐 وب‌سایت
+        text("www.offercoffee.ir", "website", "center", ("bottom", 45), fa=False),
+
+        # جزئیات محصول (سمت چپ، کمی پایین‌تر از عنوان ترکیبات برای تراز بهتر)
+        lines_slot("details", "fa_regular_normal", 60, Y_CENTER_SECTION + 35, 40),
+        # خطوط ترکیبات: هم‌تراز با عنوان، در صورت نیاز به چپ جابه‌جا می‌شوند
+        lines_slot("composition", "fa_regular_normal", ("align", "comp_title", 30), Y_CENTER_SECTION + 40, 40),
+    ],
+}
+
+
+def _plan():
+    return compile_layout(LAYOUT, (LABEL_W, LABEL_H), _load_fonts)
+
+
+def _render_static_layer():
+    """رسم بخش‌های ثابت برچسب میکس"""
+    return _plan().render_static()
+
+
+def _static_base():
+    return get_static_base("mixed_linux", (TEMPLATE_VERSION, LABEL_W, LABEL_H, canvas_mode()), _render_static_layer)
+
+
+def prewarm():
+    """بارگذاری فونت‌ها و ساخت لایه ثابت (برای پروسه‌های رندر)"""
+    _load_fonts()
+    _static_base()
+
+
+def generate_mixed_label(order_details, output_path=None):
+    """تولید برچسب میکس برای سفارش (تصویر لیبل برگردانده می‌شود)"""
+
     # استخراج اطلاعات از سفارش
     order_no = str(order_details.get('id', '0000'))
-    
+
     # استخراج اطلاعات محصول میکس
     line_items = order_details.get('line_items', [])
     mixed_item = None
@@ -35,306 +128,72 @@ def generate_mixed_label(order_details, output_path):
         if 'ترکیبی' in item.get('name', '') or 'میکس' in item.get('name', ''):
             mixed_item = item
             break
-    
+
     if not mixed_item:
         print("❌ هیچ محصول میکسی در سفارش یافت نشد")
-        return False
-    
+        return None
+
     # استخراج ترکیبات از metadata
     composition_lines = []
     meta_data = mixed_item.get('meta_data', [])
-    
+
     # استخراج ترکیبات از metadata (جستجو برای کلیدهایی که درصد دارند)
     for meta in meta_data:
         key = meta.get('key', '')
         value = meta.get('value', '')
-        
+
         # اگر کلید شامل نام قهوه است و مقدار شامل درصد است
         if '%' in value and any(keyword in key.lower() for keyword in ['عربیکا', 'روبوستا', 'قهوه', 'arabica', 'robusta', 'coffee']):
             # اطمینان از نمایش صحیح علامت درصد
             if not value.endswith('٪'):
                 value = value.replace('%', '٪')
             composition_lines.append(f"{key}: {value}")
-    
+
     # اگر ترکیبات یافت نشد، از پیش‌فرض استفاده کن
     if not composition_lines:
         composition_lines = ["قهوه اسپرسو: ۵۰٪", "عربیکا برزیل سانتوز: ۵۰٪"]
-    
+
     composition = '\n'.join(composition_lines)
-    
+
     # استخراج وزن
     weight = "1000"  # پیش‌فرض
     for meta in meta_data:
         if meta.get('key') == 'weight':
             weight = meta.get('value', weight)
             break
-    
+
     # استخراج آسیاب
     grind = "خیر"  # پیش‌فرض
     for meta in meta_data:
         if meta.get('key') == 'blend_coffee':
             grind = meta.get('value', grind)
             break
-    
-    # 📅 تاریخ امروز
-    today = jdatetime.date.today()
-    date = today.strftime("%Y/%m/%d")
 
-    # 🖼 ساخت تصویر
-    img = Image.new("RGB", (LABEL_W, LABEL_H), "white")
-    draw = ImageDraw.Draw(img)
-
-    # 📚 بارگذاری فونت‌ها
-    try:
-        HAS_RAQM = features.check("raqm")
-        font_title = ImageFont.truetype(FONT_EN, 94)  # Increased from 88
-        font_brand = ImageFont.truetype(FONT_FA, 62)  # Increased from 58
-        font_normal = ImageFont.truetype(FONT_FA, 28) # Increased from 26
-        font_small = ImageFont.truetype(FONT_FA, 24)  # Increased from 22
-        font_bold = ImageFont.truetype(FONT_FA, 34)   # Increased from 32
-        # Use OpenSans font from project root for website address (same as main/details)
-        try:
-            font_website = ImageFont.truetype("OpenSans-Regular.ttf", 61)
-        except OSError:
-            try:
-                # Platform-specific fallback paths
-                import platform
-                if platform.system() == "Windows":
-                    # Windows system fonts
-                    font_website = ImageFont.truetype("C:/Windows/Fonts/arial.ttf", 61)
-                else:
-                    # Linux system fonts
-                    font_website = ImageFont.truetype("/usr/share/fonts/open-sans/OpenSans-Regular.ttf", 61)
-            except OSError:
-                # Final fallback to default font
-                font_website = ImageFont.load_default()
-    except OSError:
-        print("⚠️ فونت‌ها یافت نشدند، از پیش‌فرض استفاده می‌شود.")
-        font_title = font_brand = font_normal = font_small = font_bold = font_website = ImageFont.load_default()
-        HAS_RAQM = features.check("raqm")
-
-    # Try to use a regular (non-bold) Persian/Arabic-capable font for non-bold sections
-    def _find_regular_fa_font_path() -> str | None:
-        import platform
-        
-        # Platform-specific font paths
-        if platform.system() == "Windows":
-            candidates = [
-                # Windows system fonts
-                "C:/Windows/Fonts/NotoSansArabic-Regular.ttf",
-                "C:/Windows/Fonts/NotoNaskhArabic-Regular.ttf",
-                "C:/Windows/Fonts/arial.ttf",
-                "C:/Windows/Fonts/calibri.ttf",
-                "C:/Windows/Fonts/tahoma.ttf",
-                # Project/local fallbacks
-                "NotoSansArabic-Regular.ttf",
-                "NotoNaskhArabic-Regular.ttf",
-                "Vazirmatn-Regular.ttf",
-                "IRANSans.ttf",
-                "Sahel.ttf",
-                "DejaVuSans.ttf",
-            ]
-        else:  # Linux/Unix
-            candidates = [
-                # Light/Thin variants (preferred for thinner look)
-                "/usr/share/fonts/noto/NotoSansArabic-ExtraLight.ttf",
-                "/usr/share/fonts/noto/NotoSansArabic-Light.ttf",
-                "/usr/share/fonts/noto/NotoNaskhArabic-Light.ttf",
-                # Variable font (weight selection not supported directly, but can still look thinner)
-                "/usr/share/fonts/google-noto-vf/NotoSansArabic[wght].ttf",
-                # Regular Noto (widely available on Fedora)
-                "/usr/share/fonts/noto/NotoSansArabic-Regular.ttf",
-                "/usr/share/fonts/noto/NotoNaskhArabic-Regular.ttf",
-                # DejaVu (fallback, decent Arabic glyphs)
-                "/usr/share/fonts/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                # Project/local fallbacks
-                "NotoSansArabic-ExtraLight.ttf",
-                "NotoSansArabic-Light.ttf",
-                "NotoNaskhArabic-Light.ttf",
-                "NotoSansArabic-Regular.ttf",
-                "NotoNaskhArabic-Regular.ttf",
-                "Vazirmatn-Regular.ttf",
-                "IRANSans.ttf",
-                "Sahel.ttf",
-                "DejaVuSans.ttf",
-            ]
-        
-        for path in candidates:
-            if os.path.exists(path):
-                return path
-        return None
-
-    _regular_fa_font_path = _find_regular_fa_font_path()
-    font_fa_regular_small = (
-        ImageFont.truetype(_regular_fa_font_path, 24)  # Increased from 22
-        if _regular_fa_font_path
-        else font_small
-    )
-    font_fa_regular_normal = (
-        ImageFont.truetype(_regular_fa_font_path, 28)  # Increased from 26
-        if _regular_fa_font_path
-        else font_normal
-    )
-
-    # 🧰 توابع فارسی
-    def fa_shape(text):
-        if HAS_RAQM:
-            return text
-        elif BIDI_AVAILABLE:
-            return get_display(reshape(text))
-        else:
-            # Fallback: just reshape without bidi processing
-            try:
-                return reshape(text)
-            except:
-                return text
-    def draw_fa_text(xy, text, font, fill="black"):
-        kwargs = {"direction": "rtl", "language": "fa"} if HAS_RAQM else {}
-        # Add text stroke for better clarity
-        shaped_text = fa_shape(text)
-        # Draw stroke (outline) in white first
-        for adj in [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]:
-            draw.text((xy[0] + adj[0], xy[1] + adj[1]), shaped_text, font=font, fill="white", **kwargs)
-        # Draw main text
-        draw.text(xy, shaped_text, font=font, fill=fill, **kwargs)
-
-    def draw_text_with_stroke(xy, text, font, fill="black"):
-        """Draw English text with stroke for better clarity"""
-        # Draw stroke (outline) in white first
-        for adj in [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]:
-            draw.text((xy[0] + adj[0], xy[1] + adj[1]), text, font=font, fill="white")
-        # Draw main text
-        draw.text(xy, text, font=font, fill=fill)
-
-    def text_size(text, font):
-        bbox = draw.textbbox((0, 0), text, font=font)
-        return bbox[2] - bbox[0], bbox[3] - bbox[1]
-
-    def fa_text_size(text, font):
-        kwargs = {"direction": "rtl", "language": "fa"} if HAS_RAQM else {}
-        shaped = fa_shape(text)
-        bbox = draw.textbbox((0, 0), shaped, font=font, **kwargs)
-        return bbox[2] - bbox[0], bbox[3] - bbox[1]
-
-    # 🏷 عنوان انگلیسی
-    title = "OFFER COFFEE"
-    tw, th = text_size(title, font_title)
-    draw_text_with_stroke(((LABEL_W - tw) / 2, 25), title, font_title, fill="black")
-
-    # 🏷 عنوان فارسی
-    brand = "قهوه آفر"
-    bw, bh = fa_text_size(brand, font_brand)
-    draw_fa_text(((LABEL_W - bw) / 2, 140), brand, font=font_brand, fill="black")  # Moved down from 120 to 140
-
-    # 🏢 آدرس‌ها
-    addresses = [
-        "شعبه مرکزی: خ پلیس، خ اجاره داری، پ ۵۵۵",
-        "شعبه ۲: خ بنی‌هاشم، خ رسول‌رحیمی، اتحاد، پ ۱۷",
-        "امور بازرگانی: خیابان شریعتی، خ پلیس، اجاره داری، ۳۸",
-        "مرکز تماس: ۹۰۰۰۴۵۰۵ (خط ویژه بدون کد تماس) (رایگان)"
-    ]
-    y_address = 210  # Moved down from 190 to 210
-    for line in addresses:
-        lw, lh = fa_text_size(line, font_small)
-        draw_fa_text((LABEL_W - lw - 30, y_address), line, font=font_small)
-        y_address += 40  # Increased spacing from 33 to 40
-
-    # 🧾 بخش ترکیبات و جزئیات محصول - با تراز عمودی بهبود یافته
-    y_center_section = 400  # موقعیت مرکزی برای بخش ترکیبات - moved down from 380 to 400
-    
-    # محاسبه موقعیت شروع بخش ترکیبات (سمت راست)
-    comp_title = "ترکیبات:"
-    comp_title_w, comp_title_h = fa_text_size(comp_title, font_bold)
-    comp_start_x = LABEL_W - comp_title_w - 30  # 30px margin from right edge
-    
+    # 🧾 بخش ترکیبات و جزئیات محصول
     # محاسبه موقعیت شروع بخش جزئیات (سمت چپ) - کمی پایین‌تر برای تراز بهتر
     # بررسی اینکه آیا وزن قبلاً واحد دارد یا نه
     weight_display = weight
     if not any(unit in weight for unit in ['گرم', 'کیلوگرم']):
         weight_display = f"{weight} گرم"
-    
+
     product_details = [
         f"وزن: {weight_display}",
-        f"آسیاب شود: {grind}", 
+        f"آسیاب شود: {grind}",
         "اسپرسوساز"
     ]
-    
-    # تراز عمودی: بخش ترکیبات در موقعیت اصلی، جزئیات کمی پایین‌تر
-    y_comp = y_center_section
-    y_details = y_center_section + 35  # 35 پیکسل پایین‌تر برای تراز بهتر
-    
-    # رسم عنوان ترکیبات
-    draw_fa_text((comp_start_x, y_comp), comp_title, font=font_bold)
-    
-    # رسم جزئیات محصول (سمت چپ)
-    for detail in product_details:
-        dw, dh = fa_text_size(detail, font_fa_regular_normal)
-        draw_fa_text((60, y_details), detail, font=font_fa_regular_normal)
-        y_details += 40
-    
-    # رسم جزئیات ترکیبات (سمت راست)
-    composition_lines = composition.split('\n')
-    y_comp_current = y_comp + 40
-
-    # محاسبه حداکثر عرض مورد نیاز برای خطوط ترکیبات
-    max_detail_width = max(fa_text_size(line, font_fa_regular_normal)[0] for line in composition_lines)
-
-    # تنظیم موقعیت شروع در صورت نیاز
-    if comp_start_x + max_detail_width > LABEL_W - 30:
-        comp_start_x = LABEL_W - max_detail_width - 30
-
-    # رسم هر خط ترکیبات
-    for line in composition_lines:
-        draw_fa_text((comp_start_x, y_comp_current), line, font=font_fa_regular_normal)
-        y_comp_current += 40
-
-    # ➖ خط جداکننده بالا
-    # Create dashed line by drawing multiple small segments
-    x_start, x_end = 60, LABEL_W - 60
-    y = 380  # Moved down from 360 to 380
-    dash_length = 8
-    gap_length = 4
-    current_x = x_start
-    while current_x < x_end:
-        end_x = min(current_x + dash_length, x_end)
-        draw.line([(current_x, y), (end_x, y)], fill="black", width=2)
-        current_x += dash_length + gap_length
-
-    # ➖ خط جداکننده پایین
-    # Create dashed line by drawing multiple small segments
-    x_start, x_end = 60, LABEL_W - 60
-    y = 640  # Moved down from 620 to 640
-    dash_length = 8
-    gap_length = 4
-    current_x = x_start
-    while current_x < x_end:
-        end_x = min(current_x + dash_length, x_end)
-        draw.line([(current_x, y), (end_x, y)], fill="black", width=2)
-        current_x += dash_length + gap_length
-
-
-    # ☕ توضیح پایانی
-    desc_lines = [
-        "قهوه آفر عرضه کننده مرغوب ترین دانه قهوه",
-        "قهوه فوری و تجهیزات"
-    ]
-    y_desc = 650  # Moved down from 630 to 650
-    for line in desc_lines:
-        lw, lh = fa_text_size(line, font_fa_regular_small)
-        draw_fa_text(((LABEL_W - lw) / 2, y_desc), line, font=font_fa_regular_small)
-        y_desc += 32
 
-    # 🌐 وب‌سایت
-    website = "www.offercoffee.ir"
-    ww, wh = text_size(website, font_website)
-    draw_text_with_stroke(((LABEL_W - ww) / 2, LABEL_H - wh - 45), website, font=font_website, fill="black")  # Moved up from 25 to 45
+    # 🖼 کپی از لایه ثابت و رسم جزئیات محصول (سمت چپ) و ترکیبات (سمت راست)
+    img = _static_base().copy()
+    _plan().fill(img, {"details": product_details, "composition": composition.split('\n')})
 
     # 📤 ذخیره و نمایش
     # Save with high DPI for better print quality
-    img.save(output_path, dpi=(300, 300), quality=95)
-    print(f"✅ برچسب میکس سفارش {order_no} در '{output_path}' ذخیره شد.")
-    return True
+    # ذخیره فایل اختیاری است؛ مسیر چاپ مستقیماً از تصویر در حافظه استفاده می‌کند
+    img = finalize(img)
+    if output_path:
+        img.save(output_path, **save_options(SAVE_OPTIONS))
+        print(f"✅ برچسب میکس سفارش {order_no} در '{output_path}' ذخیره شد.")
+    return img
 
 # تابع تست برای اجرای مستقل
 def main():
@@ -357,4 +216,4 @@ def main():
     generate_mixed_label(sample_order, "test_mixed_label.jpg")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+متریک‌های Prometheus برای مراحل پردازش سفارش
+
+برای هر مرحله (تأیید امضا، بررسی پرداخت، درخواست ووکامرس، شکل‌دهی متن، رسم،
+فشرده‌سازی تصویر، نوشتن روی دیسک و چاپ) یک هیستوگرام زمان با برچسب نوع
+لیبل نگه داشته می‌شود؛ به همراه شمارنده سفارش‌ها، لیبل‌ها، برخورد/عدم برخورد
+کش‌ها و خطاها. وب‌سرور آن‌ها را در /metrics (قالب متنی Prometheus) می‌دهد و
+cron در پایان هر اجرا همین متن را در فایل snapshot می‌نویسد.
+
+زمان شکل‌دهی متن داخل پروسه‌های رندر اندازه‌گیری می‌شود: collect_stages
+زمان‌های یک لیبل را در ترد جاری جمع می‌کند و render_executor آن‌ها را همراه
+تصویر به پروسه اصلی برمی‌گرداند.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import METRICS_CONFIG
+
+PREFIX = 'offercoffee_'
+
+# مراحل هیستوگرام offercoffee_stage_seconds
+STAGES = ('signature', 'payment_check', 'woocommerce_fetch', 'text_shaping',
+          'drawing', 'encoding', 'disk_write', 'printing')
+
+# شمارنده‌ها: نام -> توضیح
+COUNTERS = {
+    'orders_total': 'سفارش‌های پردازش‌شده به تفکیک منبع و وضعیت نهایی',
+    'labels_total': 'لیبل‌های رندرشده به تفکیک نوع و نتیجه',
+    'cache_hits_total': 'برخورد کش‌ها (فونت، قالب، QR، متن)',
+    'cache_misses_total': 'عدم برخورد کش‌ها',
+    'failures_total': 'خطاها به تفکیک مرحله',
+}
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: LabelSet) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """هیستوگرام‌های زمان مراحل و شمارنده‌ها (thread-safe)"""
+
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = tuple(sorted(buckets or METRICS_CONFIG.get('buckets') or DEFAULT_BUCKETS))
+        self._lock = threading.Lock()
+        # (مرحله، نوع لیبل) -> [تعداد در هر بازه..., تعداد کل، مجموع ثانیه‌ها]
+        self._histograms: Dict[Tuple[str, str], List[float]] = {}
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+
+    def observe(self, stage: str, seconds: float, label: str = '') -> None:
+        """ثبت زمان یک مرحله؛ label نوع لیبل (خالی برای مراحل سطح سفارش)"""
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._histograms.get((stage, label))
+            if entry is None:
+                entry = self._histograms[(stage, label)] = [0] * (len(self.buckets) + 1) + [0, 0.0]
+            entry[index] += 1
+            entry[-2] += 1
+            entry[-1] += seconds
+
+    def observe_stages(self, stages: Dict[str, float], label: str = '') -> None:
+        for stage, seconds in stages.items():
+            self.observe(stage, seconds, label)
+
+    @contextmanager
+    def timer(self, stage: str, label: str = '') -> Iterator[None]:
+        """اندازه‌گیری زمان بلوک (حتی در صورت خطا)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, label)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        if name not in COUNTERS:
+            raise ValueError(f"شمارنده نامعتبر: {name}")
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def count_caches(self, hits: Dict[str, int], misses: Dict[str, int]) -> None:
+        """افزودن برخورد/عدم برخورد کش‌ها (تفاضل‌های گزارش‌شده از پروسه رندر)"""
+        for cache, value in hits.items():
+            if value:
+                self.inc('cache_hits_total', value, cache=cache)
+        for cache, value in misses.items():
+            if value:
+                self.inc('cache_misses_total', value, cache=cache)
+
+    def render(self) -> str:
+        """متن قالب exposition نسخه 0.0.4 Prometheus"""
+        with self._lock:
+            histograms = {key: list(entry) for key, entry in self._histograms.items()}
+            counters = dict(self._counters)
+
+        out = [f'# HELP {PREFIX}stage_seconds زمان هر مرحله پردازش به تفکیک نوع لیبل',
+               f'# TYPE {PREFIX}stage_seconds histogram']
+        for (stage, label), entry in sorted(histograms.items()):
+            base = (('stage', stage), ('label', label))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), entry):
+                cumulative += count
+                out.append(f'{PREFIX}stage_seconds_bucket{_labels(base + (("le", _number(bound)),))} {cumulative}')
+            out.append(f'{PREFIX}stage_seconds_count{_labels(base)} {entry[-2]}')
+            out.append(f'{PREFIX}stage_seconds_sum{_labels(base)} {entry[-1]!r}')
+
+        for name, help_text in COUNTERS.items():
+            out.append(f'# HELP {PREFIX}{name} {help_text}')
+            out.append(f'# TYPE {PREFIX}{name} counter')
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    out.append(f'{PREFIX}{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(out) + '\n'
+
+    def write_snapshot(self, path: Optional[str] = None) -> str:
+        """
+        نوشتن متریک‌ها در فایل (جایگزینی اتمی؛ مناسب textfile collector)
+
+        Returns:
+            مسیر فایل
+        """
+        path = path or METRICS_CONFIG.get('snapshot_path', os.path.join('data', 'cron_metrics.prom'))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        text = self.render()
+        text += f'# TYPE {PREFIX}snapshot_timestamp_seconds gauge\n{PREFIX}snapshot_timestamp_seconds {time.time():.3f}\n'
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# -----------------------
+# زمان مراحل داخل رندر یک لیبل
+# -----------------------
+_local = threading.local()
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """جمع‌آوری زمان مراحل (add_stage) در ترد جاری تا پایان بلوک"""
+    previous = getattr(_local, 'stages', None)
+    stages: Dict[str, float] = {}
+    _local.stages = stages
+    try:
+        yield stages
+    finally:
+        _local.stages = previous
+
+
+def add_stage(stage: str, seconds: float) -> None:
+    """افزودن زمان به مرحله؛ خارج از collect_stages کاری نمی‌کند"""
+    stages = getattr(_local, 'stages', None)
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """نمونه مشترک متریک‌ها در این پروسه"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+دفتر سفارش‌های پردازش‌شده در SQLite (جایگزین data/processed_orders.txt)
+
+برای هر سفارش وضعیت و زمان آخرین تغییر، و برای هر لیبل آن مسیر، نوع، تعداد
+نسخه، نسخه قالب و وضعیت ثبت می‌شود. هر تغییر فقط یک سطر را درج یا به‌روز
+می‌کند و بررسی «قبلاً پردازش شده» با کلید اصلی انجام می‌شود (به جای خواندن
+و بازنویسی کل فایل متنی در هر سفارش). فایل متنی قدیمی یک بار به دفتر منتقل
+و با پسوند .migrated کنار گذاشته می‌شود.
+
+webhook و cron قبل از رسم لیبل‌های یک سفارش آن را claim می‌کنند: در یک
+تراکنش BEGIN IMMEDIATE اگر سفارش قبلاً پردازش شده یا در اجاره (lease)
+معتبر پروسه/ترد دیگری است رد می‌شود، وگرنه اجاره با مهلت lease_seconds
+ثبت می‌شود. release وضعیت نهایی را ثبت و اجاره را آزاد می‌کند؛ اجاره
+پروسه‌ای که وسط کار متوقف شده بعد از پایان مهلت دوباره قابل claim است.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import LEDGER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# وضعیت‌های سفارش و لیبل
+FETCHED = 'fetched'
+RENDERED = 'rendered'
+PRINTED = 'printed'
+FAILED = 'failed'
+
+# نتیجه claim
+CLAIMED = 'claimed'   # اجاره گرفته شد؛ سفارش را پردازش کنید
+BUSY = 'busy'         # پروسه/ترد دیگری در حال پردازش است
+DONE = 'done'         # قبلاً پردازش شده است
+
+# سفارش‌هایی که دوباره پردازش نمی‌شوند (لیبل‌ها رسم شده‌اند؛ چاپ یا فقط بایگانی)
+DONE_STATES = (RENDERED, PRINTED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    state TEXT NOT NULL,
+    source TEXT,
+    last_error TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_state ON orders (state, updated_at);
+CREATE TABLE IF NOT EXISTS labels (
+    order_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    copies INTEGER NOT NULL DEFAULT 1,
+    template_version INTEGER,
+    state TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (order_id, path)
+);
+"""
+
+LabelRecord = Tuple[str, str, int, Optional[int]]  # (مسیر، نوع، تعداد نسخه، نسخه قالب)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _owner() -> str:
+    """شناسه اجاره‌دار: میزبان، پروسه و ترد فعلی"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class OrderLedger:
+    """وضعیت سفارش‌ها و لیبل‌هایشان (ایمن برای چند ترد و چند پروسه)"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or LEDGER_CONFIG.get('db_path', 'data/orders.db')
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(_SCHEMA)
+            # ستون‌های اجاره و شمار تلاش برای دفترهای ساخته‌شده قبل از اضافه شدن آن‌ها
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(orders)")}
+            for name, decl in (('lease_owner', 'TEXT'), ('lease_expires', 'REAL'),
+                               ('attempts', 'INTEGER NOT NULL DEFAULT 0')):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE orders ADD COLUMN {name} {decl}")
+
+    def _conn(self) -> sqlite3.Connection:
+        # هر ترد اتصال مخصوص خودش را دارد
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # -----------------------
+    # خواندن
+    # -----------------------
+    def state(self, order_id: int) -> Optional[str]:
+        row = self._conn().execute("SELECT state FROM orders WHERE id = ?", (int(order_id),)).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, order_id: int) -> bool:
+        return self.state(order_id) in DONE_STATES
+
+    def done_ids(self, order_ids: Iterable[int]) -> Set[int]:
+        """شناسه سفارش‌هایی از لیست که قبلاً پردازش شده‌اند"""
+        ids = sorted({int(oid) for oid in order_ids})
+        done: Set[int] = set()
+        conn = self._conn()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT id FROM orders WHERE id IN ({placeholders}) AND state IN (?, ?)",
+                chunk + list(DONE_STATES)
+            )
+            done.update(row[0] for row in rows)
+        return done
+
+    def exhausted_ids(self, order_ids: Iterable[int], max_attempts: Optional[int] = None) -> Set[int]:
+        """شناسه سفارش‌های ناموفقی که به سقف تلاش (max_attempts) رسیده‌اند"""
+        max_attempts = int(max_attempts or LEDGER_CONFIG.get('max_attempts', 3))
+        ids = sorted({int(oid) for oid in order_ids})
+        exhausted: Set[int] = set()
+        conn = self._conn()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT id FROM orders WHERE id IN ({placeholders}) AND state = ? AND attempts >= ?",
+                chunk + [FAILED, max_attempts]
+            )
+            exhausted.update(row[0] for row in rows)
+        return exhausted
+
+    def labels(self, order_id: int) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT path, kind, copies, template_version, state, updated_at FROM labels "
+            "WHERE order_id = ? ORDER BY rowid",
+            (int(order_id),)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # -----------------------
+    # نوشتن
+    # -----------------------
+    def mark(self, order_id: int, state: str, source: Optional[str] = None,
+             error: Optional[str] = None) -> None:
+        """ثبت وضعیت سفارش (درج یا به‌روزرسانی یک سطر)"""
+        now = _now()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO orders (id, state, source, last_error, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    state = excluded.state,
+                    source = COALESCE(excluded.source, orders.source),
+                    last_error = excluded.last_error,
+                    updated_at = excluded.updated_at
+                """,
+                (int(order_id), state, source, error, now, now)
+            )
+
+    def claim(self, order_id: int, source: str, lease_seconds: Optional[float] = None) -> str:
+        """
+        گرفتن اجاره پردازش سفارش (اتمیک بین پروسه‌ها)؛ هر claim موفق یک تلاش شمرده می‌شود
+
+        Returns:
+            CLAIMED، BUSY (اجاره معتبر دیگری وجود دارد) یا DONE (قبلاً پردازش شده)
+        """
+        lease_seconds = float(lease_seconds or LEDGER_CONFIG.get('lease_seconds', 600))
+        owner = _owner()
+        now, stamp = time.time(), _now()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state, lease_owner, lease_expires FROM orders WHERE id = ?", (int(order_id),)
+            ).fetchone()
+            if row is not None and row['state'] in DONE_STATES:
+                result = DONE
+            elif (row is not None and row['lease_owner'] and row['lease_owner'] != owner
+                  and (row['lease_expires'] or 0) > now):
+                result = BUSY
+            else:
+                conn.execute(
+                    """
+                    INSERT INTO orders (id, state, source, lease_owner, lease_expires, attempts, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        state = excluded.state,
+                        source = excluded.source,
+                        last_error = NULL,
+                        lease_owner = excluded.lease_owner,
+                        lease_expires = excluded.lease_expires,
+                        attempts = orders.attempts + 1,
+                        updated_at = excluded.updated_at
+                    """,
+                    (int(order_id), FETCHED, source, owner, now + lease_seconds, stamp, stamp)
+                )
+                result = CLAIMED
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return result
+
+    def release(self, order_id: int, state: str, error: Optional[str] = None) -> bool:
+        """
+        ثبت وضعیت نهایی سفارش و آزاد کردن اجاره (فقط توسط همان اجاره‌دار)
+
+        Returns:
+            False اگر اجاره دیگر متعلق به این ترد نبود (مهلت تمام شده و دیگری claim کرده)
+        """
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE orders SET state = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (state, error, _now(), int(order_id), _owner())
+            )
+        return cur.rowcount > 0
+
+    def record_labels(self, order_id: int, labels: Iterable[LabelRecord], state: str) -> None:
+        """ثبت لیبل‌های سفارش با وضعیت مشترک"""
+        now = _now()
+        rows = [(int(order_id), path, kind, int(copies), version, state, now)
+                for path, kind, copies, version in labels]
+        if not rows:
+            return
+        with self._conn() as conn:
+            conn.executemany(
+                """
+                INSERT INTO labels (order_id, path, kind, copies, template_version, state, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(order_id, path) DO UPDATE SET
+                    kind = excluded.kind,
+                    copies = excluded.copies,
+                    template_version = excluded.template_version,
+                    state = excluded.state,
+                    updated_at = excluded.updated_at
+                """,
+                rows
+            )
+
+    def set_labels_state(self, order_id: int, state: str, paths: Optional[Iterable[str]] = None) -> None:
+        """تغییر وضعیت همه لیبل‌های سفارش (یا فقط paths)"""
+        now = _now()
+        with self._conn() as conn:
+            if paths is None:
+                conn.execute("UPDATE labels SET state = ?, updated_at = ? WHERE order_id = ?",
+                             (state, now, int(order_id)))
+            else:
+                conn.executemany("UPDATE labels SET state = ?, updated_at = ? WHERE order_id = ? AND path = ?",
+                                 [(state, now, int(order_id), path) for path in paths])
+
+    def migrate_text_file(self, path: str) -> int:
+        """
+        انتقال یک‌باره فایل متنی قدیمی (یک شناسه سفارش در هر خط)
+
+        سفارش‌های فایل با وضعیت printed ثبت می‌شوند (سفارش‌های موجود در دفتر
+        تغییر نمی‌کنند) و فایل به path.migrated تغییر نام می‌دهد.
+
+        Returns:
+            تعداد شناسه‌های منتقل‌شده
+        """
+        if not os.path.exists(path):
+            return 0
+        ids: Set[int] = set()
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ids.add(int(line))
+                except ValueError:
+                    continue
+
+        now = _now()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO orders (id, state, source, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(oid, PRINTED, 'migrated', now, now) for oid in sorted(ids)]
+            )
+        os.replace(path, path + '.migrated')
+        return len(ids)
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._conn()
+        rows = conn.execute("SELECT state, COUNT(*) FROM orders GROUP BY state").fetchall()
+        counts = {FETCHED: 0, RENDERED: 0, PRINTED: 0, FAILED: 0}
+        counts.update({row[0]: row[1] for row in rows})
+        counts['leased'] = conn.execute(
+            "SELECT COUNT(*) FROM orders WHERE lease_owner IS NOT NULL AND lease_expires > ?", (time.time(),)
+        ).fetchone()[0]
+        return counts
+
+
+_ledger: Optional[OrderLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> OrderLedger:
+    """نمونه مشترک دفتر سفارش‌ها در این پروسه (فایل متنی قدیمی در اولین استفاده منتقل می‌شود)"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = OrderLedger()
+            legacy_path = LEDGER_CONFIG.get('legacy_path', 'data/processed_orders.txt')
+            migrated = _ledger.migrate_text_file(legacy_path)
+            if migrated:
+                logger.info(f"🗂️ {migrated} سفارش از {legacy_path} به دفتر سفارش‌ها منتقل شد")
+        return _ledger
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+لایه مشترک چاپ لیبل‌ها
+
+همه لیبل‌های یک سفارش به صورت یک کار چاپ چندصفحه‌ای ارسال می‌شوند (هر
+لیبل به تعداد نسخه‌هایش صفحه دارد). چاپگر فقط یک بار پیدا و باز می‌شود و
+اتصال آن برای کارهای بعدی نگه داشته می‌شود.
+
+پیاده‌سازی‌ها (PRINTER_CONFIG['mode']):
+    gdi   - درایور ویندوز (win32print/win32ui)؛ بدون pywin32 فقط بایگانی
+    ezpl  - دستورات خام EZPL روی سوکت TCP یا فایل دستگاه (ezpl_printer.py)
+    file  - هر کار یک فایل PDF چندصفحه‌ای در spool_dir (تست و بنچمارک روی لینوکس)
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from config import PRINTER_CONFIG
+from ezpl_printer import get_ezpl_printer, print_ezpl
+from metrics import get_metrics
+
+try:
+    import win32print, win32ui
+    from PIL import ImageWin
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
+
+module_logger = logging.getLogger(__name__)
+
+PrintPage = Tuple[Any, int, Optional[str]]  # (تصویر یا مسیر فایل، تعداد نسخه، نوع لیبل)
+
+
+def _open_image(label) -> Image.Image:
+    return Image.open(label) if isinstance(label, str) else label
+
+
+class PrinterBackend:
+    """رابط مشترک چاپگرها؛ زیرکلاس‌ها فقط _print را پیاده می‌کنند"""
+
+    name = 'base'
+    available = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {'jobs': 0, 'labels': 0, 'pages': 0, 'failed_jobs': 0, 'seconds': 0.0}
+
+    def print_job(self, pages: List[PrintPage], title: str = "Offer Coffee Label",
+                  logger: Optional[logging.Logger] = None) -> bool:
+        """
+        چاپ چند لیبل در یک کار
+
+        Args:
+            pages: لیست (تصویر یا مسیر، تعداد نسخه، نوع لیبل)
+            title: نام کار در صف چاپ
+            logger: لاگر فراخوان (پیش‌فرض: لاگر همین ماژول)
+
+        Returns:
+            True اگر کار ارسال شد (یا چاپگر در دسترس نیست و لیبل‌ها فقط بایگانی می‌شوند)
+        """
+        logger = logger or module_logger
+        pages = [(label, max(1, int(copies)), kind) for label, copies, kind in pages]
+        if not pages:
+            return True
+        page_count = sum(copies for _, copies, _ in pages)
+
+        # کارهای تردهای مختلف با هم قاطی نمی‌شوند
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                self._print(pages, title, logger)
+                ok = True
+            except Exception as e:
+                logger.error(f"❌ خطا در چاپ {title}: {e}")
+                self._reset()
+                ok = False
+            seconds = time.perf_counter() - started
+            self._stats['jobs'] += 1
+            self._stats['seconds'] += seconds
+            if ok:
+                self._stats['labels'] += len(pages)
+                self._stats['pages'] += page_count
+            else:
+                self._stats['failed_jobs'] += 1
+
+        # برچسب متریک: نوع لیبل‌های کار (مثلاً details+main)
+        label = '+'.join(sorted({kind or 'unknown' for _, _, kind in pages}))
+        get_metrics().observe('printing', seconds, label)
+        if not ok:
+            get_metrics().inc('failures_total', stage='printing', label=label)
+
+        if ok:
+            logger.info(f"🖨️ {title}: {len(pages)} لیبل، {page_count} صفحه در یک کار ({self.name}، {seconds * 1000:.0f}ms)")
+        return ok
+
+    def ready(self) -> bool:
+        """آیا کارها واقعاً چاپ می‌شوند (نه فقط بایگانی)"""
+        return self.available
+
+    def _print(self, pages: List[PrintPage], title: str, logger: logging.Logger) -> None:
+        raise NotImplementedError
+
+    def _reset(self) -> None:
+        """کنار گذاشتن اتصال خراب؛ کار بعدی دوباره وصل می‌شود"""
+
+    def close(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, backend=self.name, available=self.available)
+        stats['seconds'] = round(stats['seconds'], 3)
+        return stats
+
+
+class NullBackend(PrinterBackend):
+    """بدون چاپگر (مثلاً pywin32 نصب نیست): لیبل‌ها فقط بایگانی می‌شوند"""
+
+    name = 'none'
+    available = False
+
+    def _print(self, pages, title, logger):
+        logger.info(f"💾 چاپگر در دسترس نیست - {title} فقط بایگانی می‌شود")
+
+
+class Win32Backend(PrinterBackend):
+    """چاپ با درایور ویندوز؛ handle و DC چاپگر بین کارها نگه داشته می‌شوند"""
+
+    name = 'gdi'
+
+    def __init__(self, printer_name: Optional[str] = None):
+        super().__init__()
+        self.printer_name = printer_name or PRINTER_CONFIG.get('printer_name', 'Godex G500')
+        self._printer: Optional[str] = None
+        self._handle = None
+        self._dc = None
+
+    def _discover(self, logger: logging.Logger) -> Optional[str]:
+        if self._printer is not None:
+            return self._printer
+
+        all_printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
+        printer_names = [printer[2] for printer in all_printers]
+        logger.info(f"🖨️ چاپگرهای در دسترس: {', '.join(printer_names) if printer_names else 'هیچ'}")
+
+        # جستجوی نام چاپگر بدون حساسیت به حروف کوچک و بزرگ
+        wanted = self.printer_name.lower()
+        for printer_name in printer_names:
+            if wanted in printer_name.lower() or printer_name.lower() in wanted:
+                self._printer = printer_name
+                self._handle = win32print.OpenPrinter(printer_name)
+                logger.info(f"✅ چاپگر مورد نظر یافت شد: {printer_name}")
+                return printer_name
+
+        logger.warning(f"⚠️ چاپگر '{self.printer_name}' در لیست چاپگرهای موجود نیست")
+        return None
+
+    def ready(self):
+        with self._lock:
+            return self._discover(module_logger) is not None
+
+    def _print(self, pages, title, logger):
+        printer = self._discover(logger)
+        if printer is None:
+            # print_job نباید کار چاپ‌نشده را موفق گزارش کند
+            raise RuntimeError(f"چاپگر '{self.printer_name}' یافت نشد - {title} فقط بایگانی می‌شود")
+
+        if self._dc is None:
+            self._dc = win32ui.CreateDC()
+            self._dc.CreatePrinterDC(printer)
+
+        pdc = self._dc
+        pdc.StartDoc(title)
+        try:
+            for label, copies, _ in pages:
+                img = _open_image(label)
+                dib = ImageWin.Dib(img)
+                for _ in range(copies):
+                    pdc.StartPage()
+                    dib.draw(pdc.GetHandleOutput(), (0, 0, img.width, img.height))
+                    pdc.EndPage()
+        except Exception:
+            pdc.AbortDoc()
+            raise
+        pdc.EndDoc()
+
+    def _reset(self):
+        if self._dc is not None:
+            try:
+                self._dc.DeleteDC()
+            except Exception:
+                pass
+            self._dc = None
+        if self._handle is not None:
+            try:
+                win32print.ClosePrinter(self._handle)
+            except Exception:
+                pass
+            self._handle = None
+        # چاپگر در کار بعدی دوباره جستجو می‌شود (ممکن است جدا/وصل شده باشد)
+        self._printer = None
+
+
+class EzplBackend(PrinterBackend):
+    """چاپ با دستورات EZPL روی اتصال پایدار ezpl_printer"""
+
+    name = 'ezpl'
+
+    def _print(self, pages, title, logger):
+        sent = 0
+        for label, copies, kind in pages:
+            sent += print_ezpl(label, copies, kind)
+        logger.info(f"📤 {title}: {sent} بایت EZPL ارسال شد")
+
+    def _reset(self):
+        get_ezpl_printer().close_connection()
+
+    def stats(self):
+        stats = super().stats()
+        stats['ezpl'] = get_ezpl_printer().stats()
+        return stats
+
+
+class FileBackend(PrinterBackend):
+    """هر کار چاپ یک فایل PDF چندصفحه‌ای در spool_dir (جایگزین چاپگر روی لینوکس)"""
+
+    name = 'file'
+
+    def __init__(self, spool_dir: Optional[str] = None):
+        super().__init__()
+        self.spool_dir = spool_dir or PRINTER_CONFIG.get('spool_dir', 'data/print_spool')
+        self._counter = 0
+
+    def _print(self, pages, title, logger):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        images = []
+        for label, copies, _ in pages:
+            img = _open_image(label)
+            images.extend([img] * copies)
+
+        self._counter += 1
+        path = os.path.join(self.spool_dir, f"job_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}_{self._counter}.pdf")
+        images[0].save(path, format="PDF", save_all=True, append_images=images[1:],
+                       resolution=PRINTER_CONFIG.get('dpi', 203))
+        logger.info(f"📄 {title} در {path} ذخیره شد")
+
+
+def create_printer_backend(mode: Optional[str] = None) -> PrinterBackend:
+    mode = mode or PRINTER_CONFIG.get('mode', 'gdi')
+    if mode == 'ezpl':
+        return EzplBackend()
+    if mode == 'file':
+        return FileBackend()
+    if mode == 'gdi':
+        return Win32Backend() if WIN32_AVAILABLE else NullBackend()
+    raise ValueError(f"حالت چاپگر نامعتبر: {mode}")
+
+
+_backend: Optional[PrinterBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_printer_backend() -> PrinterBackend:
+    """چاپگر مشترک این پروسه"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_printer_backend()
+        return _backend
+
+
+def close_printer_backend() -> None:
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+کپی محلی کاتالوگ محصولات WooCommerce در SQLite
+
+لیبل جزئیات لینک QR محصول را فقط از این جدول می‌خواند و در مسیر رسم
+هیچ درخواست شبکه‌ای ارسال نمی‌شود. جدول با دریافت گروهی
+(products?include=...) برای محصولات جدید و همگام‌سازی افزایشی
+(modified_after) برای محصولات تغییر کرده به‌روز نگه داشته می‌شود.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import CATALOG_CONFIG
+
+# حداکثر تعداد شناسه در هر درخواست include (محدودیت per_page ووکامرس)
+INCLUDE_CHUNK = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    slug TEXT,
+    permalink TEXT,
+    name TEXT,
+    date_modified_gmt TEXT,
+    synced_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ProductCatalog:
+    """کپی محلی محصولات (id، slug، permalink، name)"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or CATALOG_CONFIG.get('db_path', 'data/products.db')
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # هر ترد اتصال مخصوص خودش را دارد
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # -----------------------
+    # خواندن
+    # -----------------------
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT id, slug, permalink, name, date_modified_gmt FROM products WHERE id = ?",
+            (int(product_id),)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def missing_ids(self, product_ids: Iterable[int]) -> List[int]:
+        ids = sorted({int(pid) for pid in product_ids if pid})
+        if not ids:
+            return []
+        known = set()
+        conn = self._conn()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(f"SELECT id FROM products WHERE id IN ({placeholders})", chunk)
+            known.update(row[0] for row in rows)
+        return [pid for pid in ids if pid not in known]
+
+    def product_link(self, product_id: int, site_url: str) -> Optional[str]:
+        """لینک محصول از کاتالوگ محلی (permalink یا ساخته‌شده از slug)"""
+        product = self.get(product_id)
+        if not product:
+            return None
+        if product.get('permalink'):
+            return product['permalink']
+        if product.get('slug'):
+            return f"{site_url.rstrip('/')}/product/{product['slug'].strip('/')}/"
+        return None
+
+    # -----------------------
+    # نوشتن
+    # -----------------------
+    def upsert_many(self, products: Iterable[Dict[str, Any]]) -> int:
+        now = datetime.utcnow().isoformat(timespec='seconds')
+        rows = [
+            (int(p['id']), p.get('slug'), p.get('permalink'), p.get('name'), p.get('date_modified_gmt'), now)
+            for p in products if p and p.get('id')
+        ]
+        if not rows:
+            return 0
+        with self._conn() as conn:
+            conn.executemany(
+                """
+                INSERT INTO products (id, slug, permalink, name, date_modified_gmt, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    slug = excluded.slug,
+                    permalink = excluded.permalink,
+                    name = excluded.name,
+                    date_modified_gmt = excluded.date_modified_gmt,
+                    synced_at = excluded.synced_at
+                """,
+                rows
+            )
+        return len(rows)
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    # -----------------------
+    # همگام‌سازی با ووکامرس
+    # -----------------------
+    def ensure_products(self, api, product_ids: Iterable[int]) -> int:
+        """دریافت گروهی محصولاتی که هنوز در کاتالوگ نیستند"""
+        missing = self.missing_ids(product_ids)
+        fetched = 0
+        for start in range(0, len(missing), INCLUDE_CHUNK):
+            chunk = missing[start:start + INCLUDE_CHUNK]
+            products = api.get_products(include=chunk, per_page=len(chunk))
+            if products:
+                fetched += self.upsert_many(products)
+        return fetched
+
+    def sync_modified(self, api, per_page: int = 100) -> int:
+        """همگام‌سازی افزایشی محصولاتی که از آخرین اجرا تغییر کرده‌اند"""
+        cursor = self._get_state('modified_after')
+        if not cursor:
+            # اولین اجرا: فقط نقطه شروع ثبت می‌شود؛ محصولات به مرور با ensure_products اضافه می‌شوند
+            self._set_state('modified_after', datetime.utcnow().isoformat(timespec='seconds'))
+            return 0
+
+        synced = 0
+        latest = cursor
+        page = 1
+        while True:
+            products = api.get_products(modified_after=cursor, per_page=per_page, page=page)
+            if products is None:
+                # خطای شبکه - نشانگر جلو نمی‌رود تا اجرای بعد دوباره تلاش شود
+                return synced
+            synced += self.upsert_many(products)
+            for p in products:
+                modified = p.get('date_modified_gmt')
+                if modified and modified > latest:
+                    latest = modified
+            if len(products) < per_page:
+                break
+            page += 1
+
+        if latest != cursor:
+            self._set_state('modified_after', latest)
+        return synced
+
+
+_catalog: Optional[ProductCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> ProductCatalog:
+    """نمونه مشترک کاتالوگ در این پروسه"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ProductCatalog()
+        return _catalog
+
+
+def order_product_ids(order_data: Dict[str, Any]) -> List[int]:
+    """شناسه محصولات یک سفارش"""
+    ids = []
+    for item in order_data.get('line_items', []):
+        try:
+            ids.append(int(item.get('product_id')))
+        except (TypeError, ValueError):
+            continue
+    return ids
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+کش LRU برای تصاویر QR کد
+
+QR هر لینک با اندازه و سطح تصحیح خطای مشخص فقط یک بار ساخته می‌شود.
+به جای ساخت تصویر بزرگ و resize، اندازه هر ماژول (box_size) طوری انتخاب
+می‌شود که کد مستقیماً در اندازه مقصد جا شود و باقی‌مانده (کمتر از یک ماژول)
+با حاشیه سفید پر شود. برای لینک‌های بلند (مثلاً نامک فارسی percent-encoded)
+که با ماژول صحیح خیلی کوچک‌تر از جای خود می‌شوند، کد با NEAREST تا اندازه
+مقصد بزرگ می‌شود (مثل قبل کل جای QR را پر می‌کند و هرگز بریده نمی‌شود).
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+import qrcode
+from PIL import Image
+
+from config import LABEL_CONFIG
+
+ERROR_CORRECT_M = qrcode.constants.ERROR_CORRECT_M
+
+QR_BORDER = 4  # حاشیه استاندارد (quiet zone) بر حسب ماژول
+
+_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, int, int], Image.Image]" = OrderedDict()
+_max_entries = int(LABEL_CONFIG.get('qr_cache_size', 256))
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _build_qr(data: str, size: int, error_correction: int) -> Image.Image:
+    qr = qrcode.QRCode(error_correction=error_correction, box_size=1, border=QR_BORDER)
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    modules = qr.modules_count + 2 * QR_BORDER
+    box_size = max(1, size // modules)
+    qr.box_size = box_size
+    code = qr.make_image(fill_color="black", back_color="white").get_image().convert("1")
+
+    if code.size == (size, size):
+        return code
+    if code.width > size or size - code.width >= box_size:
+        # کد بزرگ‌تر از جای خود یا خیلی کوچک‌تر از آن: تغییر اندازه بدون برش
+        return code.resize((size, size), Image.NEAREST)
+
+    # قرار دادن کد در مرکز یک بوم سفید با اندازه دقیق مقصد
+    canvas = Image.new("1", (size, size), 1)
+    offset = (size - code.width) // 2
+    canvas.paste(code, (offset, offset))
+    return canvas
+
+
+def get_qr(data: str, size: int, error_correction: int = ERROR_CORRECT_M) -> Image.Image:
+    """
+    دریافت تصویر QR (حالت 1 بیتی) در اندازه size×size
+
+    تصویر برگشتی بین فراخوانی‌ها مشترک است؛ فقط paste کنید و تغییرش ندهید.
+    """
+    key = (data, size, error_correction)
+    with _lock:
+        img = _cache.get(key)
+        if img is not None:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return img
+        _stats["misses"] += 1
+
+    img = _build_qr(data, size, error_correction)
+
+    with _lock:
+        _cache[key] = img
+        _cache.move_to_end(key)
+        while len(_cache) > _max_entries:
+            _cache.popitem(last=False)
+            _stats["evictions"] += 1
+    return img
+
+
+def qr_cache_stats() -> Dict[str, Any]:
+    """آمار کش QR برای مانیتورینگ"""
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "evictions": _stats["evictions"],
+            "entries": len(_cache),
+            "max_entries": _max_entries,
+            "hit_rate": round(_stats["hits"] / total, 4) if total else 0.0,
+        }
+
+
+def clear_qr_cache() -> None:
+    """خالی کردن کش QR"""
+    with _lock:
+        _cache.clear()
+        _stats["hits"] = _stats["misses"] = _stats["evictions"] = 0
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+اجرای موازی رندر لیبل‌ها در چند پروسه
+
+هر پروسه کارگر هنگام شروع (initializer) فونت‌ها و لایه‌های ثابت هر سه نوع
+لیبل را یک بار آماده می‌کند؛ سپس کارهای (نوع لیبل، سفارش تک‌محصولی، مسیر خروجی)
+به صورت مستقل و موازی اجرا می‌شوند. نتیجه هر کار تصویر لیبل در حافظه است و
+ذخیره فایل در مسیر خروجی (در صورت وجود) به بایگانی غیرهمزمان سپرده می‌شود.
+آمار هر کارگر (تعداد لیبل و زمان رندر) برای مانیتورینگ نگه داشته می‌شود؛
+زمان مراحل هر لیبل و شمارنده کش‌های کارگر همراه تصویر برگردانده و در
+متریک‌های پروسه اصلی ثبت می‌شوند.
+"""
+
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import RENDER_CONFIG
+from font_cache import font_cache_stats
+from label_archive import get_archiver
+from label_layout import layout_stats
+from metrics import collect_stages, get_metrics
+from qr_cache import qr_cache_stats
+from render_mode import color_mode, save_options
+from template_cache import template_cache_stats
+from text_cache import text_cache_stats
+
+# نوع لیبل -> (ماژول، تابع تولید)
+LABEL_GENERATORS = {
+    'main': ('label_main', 'generate_main_label'),
+    'details': ('label_details', 'generate_details_label'),
+    'mixed': ('label_mixed', 'generate_mixed_label'),
+}
+
+RenderJob = Tuple[str, Dict[str, Any], Optional[str]]  # (نوع لیبل، داده سفارش، مسیر بایگانی)
+
+
+def _module(kind: str):
+    return __import__(LABEL_GENERATORS[kind][0])
+
+
+def template_version(kind: str) -> int:
+    """نسخه قالب لیبل (برای ثبت در دفتر سفارش‌ها)"""
+    return _module(kind).TEMPLATE_VERSION
+
+
+def prewarm() -> None:
+    """بارگذاری فونت‌ها، لایه‌های ثابت (با QR) و برنامه‌های رسم همه لیبل‌ها در همین پروسه"""
+    for module_name, _ in LABEL_GENERATORS.values():
+        __import__(module_name).prewarm()
+
+
+def _init_worker() -> None:
+    """آماده‌سازی پروسه کارگر: بارگذاری فونت‌ها و ساخت لایه‌های ثابت"""
+    # کارگر با fork هندلر سیگنال پروسه اصلی (مثلاً توقف نرم cron --daemon) را به ارث می‌برد
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    prewarm()
+
+
+def _cache_counters() -> Dict[str, Tuple[int, int]]:
+    """(برخورد، عدم برخورد) تجمعی کش‌های این پروسه"""
+    font, qr, text = font_cache_stats(), qr_cache_stats(), text_cache_stats()
+    template, layout = template_cache_stats(), layout_stats()
+    return {
+        'font': (font['hits'], font['misses']),
+        'font_fit': (font['fit_hits'], font['fit_misses']),
+        'qr': (qr['hits'], qr['misses']),
+        'text': (text['hits'], text['misses']),
+        'template': (template['hits'], template['builds']),
+        'layout': (layout['hits'], layout['compiles']),
+    }
+
+
+def _render(kind: str, order_data: Dict[str, Any]) -> Tuple[Any, ...]:
+    module = _module(kind)
+    started = time.perf_counter()
+    with collect_stages() as stages:
+        img = getattr(module, LABEL_GENERATORS[kind][1])(order_data)
+    seconds = time.perf_counter() - started
+    # رسم = کل زمان تولید لیبل منهای شکل‌دهی متن‌های جدید (صفر اگر همه متن‌ها در کش بودند)
+    stages.setdefault('text_shaping', 0.0)
+    stages['drawing'] = max(0.0, seconds - stages['text_shaping'])
+    return os.getpid(), img, seconds, save_options(module.SAVE_OPTIONS), stages, _cache_counters()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def default_workers() -> int:
+    workers = int(RENDER_CONFIG.get('workers', 0) or 0)
+    if workers <= 0:
+        workers = min(4, os.cpu_count() or 1)
+    return workers
+
+
+class RenderExecutor:
+    """صف رندر لیبل؛ با workers=1 در همین پروسه اجرا می‌شود"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers if workers is not None else default_workers()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._stats_lock = threading.Lock()
+        self._per_worker: Dict[int, Dict[str, float]] = {}
+        self._cache_seen: Dict[int, Dict[str, Tuple[int, int]]] = {}
+
+    def _record(self, pid: int, kind: str, ok: bool, seconds: float, stages: Dict[str, float],
+                caches: Dict[str, Tuple[int, int]]) -> None:
+        metrics = get_metrics()
+        metrics.observe_stages(stages, kind)
+        metrics.inc('labels_total', label=kind, state='rendered' if ok else 'failed')
+        if not ok:
+            metrics.inc('failures_total', stage='render', label=kind)
+        with self._stats_lock:
+            entry = self._per_worker.setdefault(pid, {'labels': 0, 'failed': 0, 'seconds': 0.0})
+            entry['labels' if ok else 'failed'] += 1
+            entry['seconds'] += seconds
+            # شمارنده‌های کش تجمعی‌اند؛ فقط افزایش نسبت به آخرین گزارش همین پروسه ثبت می‌شود
+            # (گزارش‌های تردهای همزمان ممکن است خارج از ترتیب برسند)
+            seen = self._cache_seen.setdefault(pid, {})
+            hits, misses = {}, {}
+            for cache, (hit, miss) in caches.items():
+                last_hit, last_miss = seen.get(cache, (0, 0))
+                hits[cache], misses[cache] = max(0, hit - last_hit), max(0, miss - last_miss)
+                seen[cache] = (max(hit, last_hit), max(miss, last_miss))
+        metrics.count_caches(hits, misses)
+
+    def _record_error(self, kind: str) -> None:
+        metrics = get_metrics()
+        metrics.inc('labels_total', label=kind, state='failed')
+        metrics.inc('failures_total', stage='render', label=kind)
+
+    def _finish(self, kind: str, rendered, output_path: Optional[str]):
+        pid, img, seconds, save_options, stages, caches = rendered
+        self._record(pid, kind, img is not None, seconds, stages, caches)
+        if img is not None and output_path:
+            get_archiver().archive(img, output_path, save_options, kind)
+        return img
+
+    def submit(self, kind: str, order_data: Dict[str, Any], output_path: Optional[str] = None) -> Future:
+        """
+        ارسال یک کار رندر
+
+        Returns:
+            Future تصویر لیبل (None در صورت ناموفق بودن)؛ اگر output_path داده شود
+            تصویر به صورت غیرهمزمان در آن مسیر بایگانی می‌شود
+        """
+        if kind not in LABEL_GENERATORS:
+            raise ValueError(f"نوع لیبل نامعتبر: {kind}")
+
+        result: Future = Future()
+        if self._pool is None:
+            try:
+                result.set_result(self._finish(kind, _render(kind, order_data), output_path))
+            except Exception as e:
+                self._record_error(kind)
+                result.set_exception(e)
+            return result
+
+        def _done(inner: Future) -> None:
+            try:
+                result.set_result(self._finish(kind, inner.result(), output_path))
+            except Exception as e:
+                self._record_error(kind)
+                result.set_exception(e)
+
+        self._pool.submit(_render, kind, order_data).add_done_callback(_done)
+        return result
+
+    def warm_up(self) -> None:
+        """راه‌اندازی همه پروسه‌ها از قبل تا اولین سفارش منتظر آماده‌سازی نماند"""
+        if self._pool is None:
+            prewarm()
+            return
+        for future in [self._pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def render_many(self, jobs: List[RenderJob]) -> List[Any]:
+        """رندر موازی چند لیبل؛ تصاویر به ترتیب ورودی (خطا = None)"""
+        futures = [self.submit(kind, order_data, path) for kind, order_data, path in jobs]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"❌ خطا در رندر لیبل: {e}")
+                results.append(None)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """تعداد لیبل و سرعت رندر هر کارگر"""
+        with self._stats_lock:
+            workers = {}
+            for pid, entry in self._per_worker.items():
+                seconds = entry['seconds']
+                workers[str(pid)] = {
+                    'labels': entry['labels'],
+                    'failed': entry['failed'],
+                    'render_s': round(seconds, 3),
+                    'labels_per_s': round(entry['labels'] / seconds, 2) if seconds else 0.0,
+                }
+            return {
+                'workers': self.workers,
+                'mode': 'process' if self._pool is not None else 'inline',
+                'color_mode': color_mode(),
+                'labels': sum(e['labels'] for e in self._per_worker.values()),
+                'per_worker': workers,
+            }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_executor: Optional[RenderExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor(workers: Optional[int] = None) -> RenderExecutor:
+    """
+    نمونه مشترک اجراکننده رندر در این پروسه
+
+    Args:
+        workers: تعداد پروسه‌های رندر در اولین فراخوانی (پیش‌فرض RENDER_CONFIG)
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RenderExecutor(workers)
+        return _executor
+
+
+def shutdown_render_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
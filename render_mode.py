@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+حالت رنگ رندر لیبل‌ها (RGB / L / 1 بیتی)
+
+چاپگر حرارتی فقط سیاه و سفید چاپ می‌کند؛ در حالت‌های L و 1 بوم لیبل
+از ابتدا خاکستری (۱ بایت برای هر پیکسل به جای ۴) است و خروجی با فرمت
+بدون افت (PNG یا PBM) ذخیره می‌شود. در حالت 1 تصویر نهایی با آستانه
+تنظیم‌شده برای فونت‌های BTitr سیاه و سفید می‌شود.
+"""
+
+from typing import Any, Dict
+
+from PIL import Image
+
+from config import LABEL_CONFIG
+from template_cache import get_final_layer
+
+COLOR_MODES = ('RGB', 'L', '1')
+
+# آستانه پیش‌فرض: لبه‌های نرم حروف نازک BTitr تا این روشنایی سیاه می‌مانند
+DEFAULT_MONO_THRESHOLD = 160
+
+
+def color_mode() -> str:
+    mode = LABEL_CONFIG.get('color_mode', 'RGB')
+    if mode not in COLOR_MODES:
+        raise ValueError(f"حالت رنگ نامعتبر: {mode}")
+    return mode
+
+
+def canvas_mode() -> str:
+    """حالت بوم رسم (در حالت 1 رسم با لبه نرم روی L و آستانه در پایان)"""
+    return 'RGB' if color_mode() == 'RGB' else 'L'
+
+
+def new_canvas(size) -> Image.Image:
+    return Image.new(canvas_mode(), size, "white")
+
+
+def _threshold_table(threshold: int):
+    return [255 if v >= threshold else 0 for v in range(256)]
+
+
+def finalize(img: Image.Image) -> Image.Image:
+    """تبدیل بوم رسم‌شده به حالت خروجی (فقط در حالت 1 تغییر می‌کند)"""
+    if color_mode() != '1' or img.mode == '1':
+        return img
+    threshold = int(LABEL_CONFIG.get('mono_threshold', DEFAULT_MONO_THRESHOLD))
+    return img.convert('L').point(_threshold_table(threshold), '1')
+
+
+def finalize_static(name: str, base: Image.Image) -> Image.Image:
+    """finalize لایه ثابت قالب (با کش؛ در حالت 1 هر بار دوباره آستانه‌گذاری نمی‌شود)"""
+    variant = (color_mode(), int(LABEL_CONFIG.get('mono_threshold', DEFAULT_MONO_THRESHOLD)))
+    return get_final_layer(name, base, variant, finalize)
+
+
+def label_extension() -> str:
+    """پسوند فایل بایگانی لیبل (.jpg برای RGB، در غیر این صورت png یا pbm)"""
+    if color_mode() == 'RGB':
+        return '.jpg'
+    return '.' + LABEL_CONFIG.get('lossless_format', 'png').lower()
+
+
+def save_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """پارامترهای ذخیره متناسب با فرمت (quality مخصوص JPEG است)"""
+    if color_mode() == 'RGB':
+        return options
+    if label_extension() == '.pbm':
+        return {}
+    return {key: value for key, value in options.items() if key != 'quality'}
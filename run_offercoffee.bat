@@ -23,7 +23,7 @@ echo [%date% %time%] Using Python: %PYTHON_EXE% >> logs\cron_windows.out
 
 rem Append output to a rolling log file
 set "LOG_FILE=logs\cron_windows.out"
-"%PYTHON_EXE%" "cron_processor.py" >> "%LOG_FILE" 2>>&1
+"%PYTHON_EXE%" "cron_processor.py" %* >> "%LOG_FILE" 2>>&1
 
 exit /b %ERRORLEVEL%
 
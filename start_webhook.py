@@ -108,8 +108,8 @@ def main():
     print("\n⏳ در حال شروع سرور...")
     
     try:
-        # اجرای سرور
-        subprocess.run([sys.executable, 'webhook_server.py'])
+        # اجرای سرور با وب‌سرور تولید (gunicorn/waitress، تنظیمات در SERVER_CONFIG)
+        subprocess.run([sys.executable, 'wsgi.py'])
     except KeyboardInterrupt:
         print("\n⏹️ سرور متوقف شد")
     except Exception as e:
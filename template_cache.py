@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+کش لایه ثابت (قالب پایه) لیبل‌ها
+
+بخش‌های ثابت هر لیبل (عنوان، برند، آدرس‌ها، توضیحات، خطوط جداکننده،
+وبسایت و QR پروانه بهداشت) یک بار در هر پروسه رسم می‌شوند و هر لیبل
+فقط یک کپی از این تصویر پایه می‌گیرد و فیلدهای سفارش را روی آن می‌کشد.
+
+کلید هر قالب شامل نسخه قالب، اندازه بوم و در صورت نیاز تاریخ روز است؛
+با تغییر کلید (مثلاً تغییر TEMPLATE_VERSION یا عوض شدن روز) پایه دوباره ساخته می‌شود.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from PIL import Image
+
+_lock = threading.Lock()
+_bases: Dict[str, Tuple[Hashable, Image.Image]] = {}
+# نام قالب -> (پایه، نوع تبدیل، لایه نهایی)؛ لایه ثابت خروجی (مثلاً 1 بیتی) برای EZPL
+_finals: Dict[str, Tuple[Image.Image, Hashable, Image.Image]] = {}
+_stats = {"hits": 0, "builds": 0}
+
+
+def get_static_base(name: str, key: Hashable, builder: Callable[[], Image.Image]) -> Image.Image:
+    """
+    دریافت تصویر پایه قالب از کش یا ساخت آن
+
+    Args:
+        name: نام قالب (main، details، mixed و ...)
+        key: کلید اعتبار قالب؛ با تغییر آن پایه قبلی کنار گذاشته می‌شود
+        builder: تابعی که لایه ثابت را رسم می‌کند
+
+    Returns:
+        تصویر پایه (نباید مستقیماً تغییر کند؛ قبل از رسم copy بگیرید)
+    """
+    with _lock:
+        cached = _bases.get(name)
+        if cached is not None and cached[0] == key:
+            _stats["hits"] += 1
+            return cached[1]
+
+    base = builder()
+
+    with _lock:
+        cached = _bases.get(name)
+        if cached is not None and cached[0] == key:
+            # ترد دیگری همزمان همین پایه را ساخته است
+            _stats["hits"] += 1
+            return cached[1]
+        _bases[name] = (key, base)
+        _stats["builds"] += 1
+    return base
+
+
+def get_final_layer(name: str, base: Image.Image, variant: Hashable,
+                    convert: Callable[[Image.Image], Image.Image]) -> Image.Image:
+    """
+    نسخه تبدیل‌شده (finalize) پایه قالب؛ تا وقتی پایه و variant عوض نشده‌اند
+    همان تصویر برگردانده می‌شود
+    """
+    with _lock:
+        cached = _finals.get(name)
+        if cached is not None and cached[0] is base and cached[1] == variant:
+            return cached[2]
+
+    final = convert(base)
+
+    with _lock:
+        _finals[name] = (base, variant, final)
+    return final
+
+
+def invalidate_templates(name: Optional[str] = None) -> None:
+    """باطل کردن پایه یک قالب یا همه قالب‌ها"""
+    with _lock:
+        if name is None:
+            _bases.clear()
+            _finals.clear()
+        else:
+            _bases.pop(name, None)
+            _finals.pop(name, None)
+
+
+def template_cache_stats() -> Dict[str, Any]:
+    """آمار کش قالب‌ها"""
+    with _lock:
+        return {"hits": _stats["hits"], "builds": _stats["builds"], "templates": sorted(_bases)}
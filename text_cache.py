@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+کش متن‌های فارسی شکل‌دهی‌شده و ابعاد آن‌ها برای تمام تولیدکننده‌های لیبل
+
+وجود raqm فقط یک بار هنگام بارگذاری ماژول بررسی می‌شود. بدون raqm متن با
+arabic_reshaper و bidi شکل‌دهی می‌شود؛ نتیجه (و bbox هر متن با هر فونت)
+کش می‌شود تا متن‌های تکراری مثل آدرس‌ها، عنوان‌ها و نام محصولات هر بار
+دوباره پردازش نشوند.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from arabic_reshaper import reshape
+from PIL import features
+
+from config import LABEL_CONFIG
+from metrics import add_stage
+
+# Handle bidi import with fallback for Windows DLL issues
+try:
+    from bidi.algorithm import get_display
+    BIDI_AVAILABLE = True
+except ImportError as e:
+    print(f"⚠️ Warning: bidi package not available ({e}). Using fallback for text shaping.")
+    BIDI_AVAILABLE = False
+
+    # Fallback function that just returns the text as-is
+    def get_display(text):
+        return text
+
+HAS_RAQM = features.check("raqm")
+
+# پارامترهای draw.text/textbbox برای متن فارسی (فقط با raqm)
+RTL_KWARGS: Dict[str, str] = {"direction": "rtl", "language": "fa"} if HAS_RAQM else {}
+
+_lock = threading.Lock()
+_max_entries = int(LABEL_CONFIG.get('text_cache_size', 4096))
+_shaped: "OrderedDict[str, str]" = OrderedDict()
+_bboxes: "OrderedDict[Tuple[Any, ...], Tuple[int, int, int, int]]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _store(cache: OrderedDict, key, value) -> None:
+    with _lock:
+        cache[key] = value
+        while len(cache) > _max_entries:
+            cache.popitem(last=False)
+
+
+def _lookup(cache: OrderedDict, key):
+    with _lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+        return value
+
+
+def shape_uncached(text: str) -> str:
+    """شکل‌دهی متن فارسی بدون کش (برای مقایسه در بنچمارک)"""
+    if HAS_RAQM:
+        return text
+    elif BIDI_AVAILABLE:
+        return get_display(reshape(text))
+    else:
+        # Fallback: just reshape without bidi processing
+        try:
+            return reshape(text)
+        except Exception:
+            return text
+
+
+def fa_shape(text: str) -> str:
+    """متن فارسی آماده رسم (با raqm بدون تغییر)"""
+    if HAS_RAQM:
+        return text
+    shaped = _lookup(_shaped, text)
+    if shaped is None:
+        started = time.perf_counter()
+        shaped = shape_uncached(text)
+        add_stage('text_shaping', time.perf_counter() - started)
+        _store(_shaped, text, shaped)
+    return shaped
+
+
+def _font_key(font) -> Tuple[Any, ...]:
+    # فونت‌ها در font_cache برای کل پروسه نگه داشته می‌شوند؛ مسیر و اندازه شناسه پایدار آن‌هاست
+    path = getattr(font, "path", None)
+    if path is None:
+        return ("id", id(font))
+    return (path, getattr(font, "size", None), getattr(font, "index", 0))
+
+
+def text_bbox(text: str, font, fa: bool = False) -> Tuple[int, int, int, int]:
+    """bbox متن در مبدأ (0، 0) - معادل draw.textbbox((0, 0), ...)"""
+    key = (text, _font_key(font), fa)
+    bbox = _lookup(_bboxes, key)
+    if bbox is None:
+        shaped = fa_shape(text) if fa else text
+        started = time.perf_counter()
+        if fa:
+            bbox = font.getbbox(shaped, mode="L", **RTL_KWARGS)
+        else:
+            bbox = font.getbbox(shaped, mode="L")
+        bbox = tuple(bbox)
+        # اندازه‌گیری متن جدید (با raqm شامل شکل‌دهی) جزو مرحله شکل‌دهی است
+        add_stage('text_shaping', time.perf_counter() - started)
+        _store(_bboxes, key, bbox)
+    return bbox
+
+
+def measure_text(text: str, font, fa: bool = False) -> Tuple[int, int]:
+    """عرض و ارتفاع متن"""
+    bbox = text_bbox(text, font, fa)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
+def draw_stroked_text(draw, xy, text: str, font, fill="black", stroke_fill="white", fa: bool = False) -> None:
+    """
+    رسم متن با حاشیه ۱ پیکسلی در یک فراخوانی (stroke_width داخلی Pillow)
+
+    جایگزین حلقه ۹ مرحله‌ای (۸ جابه‌جایی سفید + متن اصلی).
+    """
+    shaped = fa_shape(text) if fa else text
+    kwargs = RTL_KWARGS if fa else {}
+    draw.text(xy, shaped, font=font, fill=fill, stroke_width=1, stroke_fill=stroke_fill, **kwargs)
+
+
+def text_cache_stats() -> Dict[str, Any]:
+    """آمار کش متن برای مانیتورینگ"""
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            "raqm": HAS_RAQM,
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "shaped": len(_shaped),
+            "bboxes": len(_bboxes),
+            "hit_rate": round(_stats["hits"] / total, 4) if total else 0.0,
+        }
+
+
+def clear_text_cache() -> None:
+    """خالی کردن کش متن"""
+    with _lock:
+        _shaped.clear()
+        _bboxes.clear()
+        _stats["hits"] = _stats["misses"] = 0
@@ -17,29 +17,30 @@ import hashlib
 import base64
 import json
 import logging
+import threading
 from datetime import datetime
-from flask import Flask, request, jsonify
-from typing import Dict, Any, Optional
+from flask import Flask, Response, request, jsonify
+from typing import Dict, Any, List, Optional, Tuple
 
 # Import existing modules
 from woocommerce_api import WooCommerceAPI
 from config import WOOCOMMERCE_CONFIG, LABEL_CONFIG
-from label_main import generate_main_label
-from label_details import generate_details_label
-from label_mixed import generate_mixed_label
-
-# Import printing functionality
-try:
-    import win32print, win32ui
-    from PIL import ImageWin
-    PRINTING_AVAILABLE = True
-except ImportError:
-    PRINTING_AVAILABLE = False
-    print("⚠️ ماژول‌های چاپ در دسترس نیستند - فقط ذخیره تصاویر انجام می‌شود")
+from font_cache import font_cache_stats
+from template_cache import template_cache_stats
+from qr_cache import qr_cache_stats
+from text_cache import text_cache_stats
+from label_layout import layout_stats
+from product_catalog import get_catalog, order_product_ids
+from job_queue import JobQueue, JobWorkerPool
+from render_executor import get_render_executor, template_version
+from label_archive import get_archiver
+from printer_backend import get_printer_backend
+from render_mode import label_extension
+from order_ledger import get_ledger, BUSY, CLAIMED, FAILED, PRINTED, RENDERED, LabelRecord
+from metrics import get_metrics
 
 # تنظیمات
 WEBHOOK_SECRET = "your_webhook_secret_here"  # این رو در WooCommerce هم بذار
-PRINTER_NAME = "Godex G500"  # نام چاپگر
 
 # تنظیم لاگ با پشتیبانی کامل از UTF-8 برای کنسول و فایل
 try:
@@ -107,44 +108,6 @@ def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> boo
         logger.error(f"❌ خطا در تأیید امضا: {e}")
         return False
 
-def print_label(image_path: str) -> bool:
-    """چاپ لیبل یا ذخیره به عنوان فالبک"""
-    try:
-        if not PRINTING_AVAILABLE:
-            logger.info(f"💾 چاپگر در دسترس نیست - تصویر ذخیره شد: {image_path}")
-            return True
-            
-        # بررسی وجود چاپگر
-        printers = [printer[2] for printer in win32print.EnumPrinters(2)]
-        if PRINTER_NAME not in printers:
-            logger.warning(f"⚠️ چاپگر '{PRINTER_NAME}' یافت نشد - تصویر ذخیره شد: {image_path}")
-            return True
-        
-        # بارگذاری تصویر
-        from PIL import Image
-        img = Image.open(image_path)
-        
-        # چاپ
-        hprinter = win32print.OpenPrinter(PRINTER_NAME)
-        pdc = win32ui.CreateDC()
-        pdc.CreatePrinterDC(PRINTER_NAME)
-        pdc.StartDoc("Offer Coffee Label")
-        pdc.StartPage()
-        
-        dib = ImageWin.Dib(img)
-        dib.draw(pdc.GetHandleOutput(), (0, 0, img.width, img.height))
-        
-        pdc.EndPage()
-        pdc.EndDoc()
-        pdc.DeleteDC()
-        
-        logger.info(f"✅ لیبل با موفقیت چاپ شد: {image_path}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"❌ خطا در چاپ - تصویر ذخیره شد: {e}")
-        return False
-
 def is_payment_completed(order_details: Dict[str, Any]) -> bool:
     """
     بررسی وضعیت پرداخت سفارش
@@ -201,104 +164,265 @@ def is_mixed_order(order_details: Dict[str, Any]) -> bool:
     
     return False
 
-def process_new_order(order_data: Dict[str, Any]) -> bool:
+_api: Optional[WooCommerceAPI] = None
+
+def get_api() -> WooCommerceAPI:
+    """کلاینت مشترک ووکامرس (یک نشست HTTP پایدار برای کل پروسه)"""
+    global _api
+    if _api is None:
+        _api = WooCommerceAPI(
+            WOOCOMMERCE_CONFIG['site_url'],
+            WOOCOMMERCE_CONFIG['consumer_key'],
+            WOOCOMMERCE_CONFIG['consumer_secret']
+        )
+    return _api
+
+def sync_order_products(order_data: Dict[str, Any]) -> None:
+    """افزودن محصولات سفارش به کاتالوگ محلی (لینک QR لیبل جزئیات)"""
+    try:
+        fetched = get_catalog().ensure_products(get_api(), order_product_ids(order_data))
+        if fetched:
+            logger.info(f"🗃️ {fetched} محصول به کاتالوگ محلی اضافه شد")
+    except Exception as e:
+        logger.warning(f"⚠️ خطا در به‌روزرسانی کاتالوگ محصولات: {e}")
+
+_queue: Optional[JobQueue] = None
+_workers: Optional[JobWorkerPool] = None
+_workers_lock = threading.Lock()
+# آیا این پروسه کارهای صف را پردازش (و چاپ) می‌کند؛ در gunicorn فقط یک پروسه
+_queue_consumer = True
+
+def get_job_queue() -> JobQueue:
+    """
+    صف پایدار سفارش‌ها و تردهای پردازش آن (یک بار برای کل پروسه)
+    
+    تردهای پردازش فقط در پروسه مصرف‌کننده صف شروع می‌شوند؛ پروسه‌های دیگر
+    gunicorn فقط کار به صف اضافه می‌کنند (یک اتصال و یک کار چاپ در هر لحظه).
+    """
+    global _queue, _workers
+    with _workers_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        if _workers is None and _queue_consumer:
+            _workers = JobWorkerPool(_queue, process_queued_job)
+            _workers.start()
+        return _queue
+
+def notify_job_workers() -> None:
+    """بیدار کردن تردهای صف بعد از افزودن کار (در پروسه‌های دیگر با poll_interval)"""
+    if _workers is not None:
+        _workers.notify()
+
+def stop_job_workers() -> None:
+    """توقف تردهای صف بعد از پایان کارهای در حال اجرا (خروج پروسه وب‌سرور)"""
+    global _workers
+    with _workers_lock:
+        if _workers is not None:
+            _workers.stop()
+            _workers = None
+
+def start_background(render_workers: Optional[int] = None, consume_jobs: bool = True) -> None:
+    """
+    آماده‌سازی پروسه‌های رندر (فونت‌ها و لایه‌های ثابت) و شروع تردهای صف قبل از اولین سفارش
+    
+    Args:
+        consume_jobs: False برای پروسه‌هایی که فقط webhook می‌پذیرند (پردازش
+            و چاپ در پروسه مصرف‌کننده صف؛ wsgi.py)
+    """
+    global _queue_consumer
+    _queue_consumer = consume_jobs
+    if not consume_jobs:
+        return
+    get_render_executor(render_workers).warm_up()
+    # کارهای باقی‌مانده از اجرای قبلی بلافاصله پردازش می‌شوند
+    get_job_queue()
+
+def check_settings() -> bool:
+    """بررسی تنظیمات قبل از اجرای سرور (False اگر ووکامرس تنظیم نشده باشد)"""
+    if WEBHOOK_SECRET == "your_webhook_secret_here":
+        logger.warning("⚠️ لطفاً WEBHOOK_SECRET را در فایل تنظیم کنید")
+    
+    if (WOOCOMMERCE_CONFIG['site_url'] == 'https://yoursite.com' or 
+        WOOCOMMERCE_CONFIG['consumer_key'] == 'ck_your_consumer_key_here' or
+        WOOCOMMERCE_CONFIG['consumer_secret'] == 'cs_your_consumer_secret_here'):
+        logger.error("❌ لطفاً تنظیمات WooCommerce را در فایل config.py تکمیل کنید")
+        return False
+    return True
+
+def process_new_order(order_data: Dict[str, Any], use_ledger: bool = True) -> bool:
     """
     پردازش سفارش جدید و تولید لیبل‌ها
     
     Args:
         order_data: داده‌های سفارش از WooCommerce
+        use_ledger: گرفتن اجاره سفارش در دفتر سفارش‌ها (مشترک با cron)؛
+            برای سفارش‌های تستی False است
         
     Returns:
         True اگر پردازش موفق باشد
     """
+    metrics = get_metrics()
     try:
         order_id = order_data.get('id')
         logger.info(f"📦 پردازش سفارش جدید: {order_id}")
         
         # بررسی وضعیت پرداخت قبل از تولید لیبل
-        if not is_payment_completed(order_data):
+        with metrics.timer('payment_check'):
+            paid = is_payment_completed(order_data)
+        if not paid:
             logger.warning(f"🚫 سفارش {order_id} پرداخت نشده - لیبل تولید نمی‌شود")
+            metrics.inc('orders_total', source='webhook', state='unpaid')
             return False
         
-        # ایجاد پوشه خروجی
-        os.makedirs(LABEL_CONFIG['output_dir'], exist_ok=True)
+        if not use_ledger:
+            return generate_and_print_labels(order_data)[0] != FAILED
         
-        # بررسی نوع سفارش
-        if is_mixed_order(order_data):
-            logger.info(f"🔀 سفارش {order_id} یک سفارش میکس است - تولید برچسب میکس...")
-            
-            # تولید لیبل میکس
-            mixed_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_mixed.jpg"
-            generate_mixed_label(order_data, mixed_label_path)
-            
-            logger.info(f"✅ لیبل میکس سفارش {order_id} با موفقیت تولید شد")
-            logger.info(f"   📁 لیبل میکس: {mixed_label_path}")
-            
-            # چاپ لیبل میکس
-            print_label(mixed_label_path)
-            
-        else:
-            logger.info(f"📦 سفارش {order_id} یک سفارش عادی است - تولید برچسب‌های معمولی...")
-            
-            # تولید لیبل‌های اصلی (back) برای هر محصول
-            line_items = order_data.get('line_items', [])
-            logger.info(f"📋 {len(line_items)} محصول در سفارش یافت شد")
-            
-            # لیست تمام لیبل‌های تولید شده برای این سفارش
-            all_labels = []
-            
-            # شمارنده‌های جداگانه برای لیبل‌ها
-            back_counter = 1
-            details_counter = 1
-            
-            # تولید لیبل‌ها برای هر محصول با در نظر گیری quantity
-            for i, item in enumerate(line_items):
-                quantity = item.get('quantity', 1)
-                logger.info(f"📦 محصول {i+1}: {item.get('name', 'نامشخص')} - تعداد: {quantity}")
-                
-                # تولید لیبل‌های back برای هر عدد از این محصول
-                for qty in range(int(quantity)):
-                    back_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_back_{back_counter}.jpg"
-                    logger.info(f"🏷️ تولید لیبل پشت {back_counter}: {item.get('name', 'نامشخص')}")
-                    
-                    # ایجاد کپی از order_data با فقط این محصول
-                    single_product_order = order_data.copy()
-                    single_product_order['line_items'] = [item]
-                    
-                    generate_main_label(single_product_order, back_label_path)
-                    all_labels.append(back_label_path)
-                    back_counter += 1
-                
-                # تولید لیبل‌های details برای هر عدد از این محصول
-                for qty in range(int(quantity)):
-                    details_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_details_{details_counter}.jpg"
-                    logger.info(f"📋 تولید لیبل جزئیات {details_counter}: {item.get('name', 'نامشخص')}")
-                    
-                    # ایجاد کپی از order_data با فقط این محصول
-                    single_product_order = order_data.copy()
-                    single_product_order['line_items'] = [item]
-                    
-                    generate_details_label(single_product_order, details_label_path)
-                    all_labels.append(details_label_path)
-                    details_counter += 1
-            
-            # چاپ تمام لیبل‌های این سفارش به ترتیب
-            logger.info(f"🖨️ شروع چاپ {len(all_labels)} لیبل برای سفارش {order_id}...")
-            for i, label_path in enumerate(all_labels):
-                print_success = print_label(label_path)
-                if print_success:
-                    logger.info(f"✅ لیبل {i+1}/{len(all_labels)} چاپ شد: {os.path.basename(label_path)}")
-                else:
-                    logger.warning(f"⚠️ لیبل {i+1}/{len(all_labels)} ذخیره شد: {os.path.basename(label_path)}")
-            
-            logger.info(f"✅ تمام لیبل‌های سفارش {order_id} پردازش شدند")
+        # اجاره مشترک با cron: سفارشی که آن طرف پردازش کرده یا در حال پردازش دارد رد می‌شود
+        ledger = get_ledger()
+        claim = ledger.claim(order_id, 'webhook')
+        if claim == BUSY:
+            logger.info(f"⏳ سفارش {order_id} در حال پردازش توسط پروسه دیگر است")
+            metrics.inc('orders_total', source='webhook', state='busy')
+            return False
+        if claim != CLAIMED:
+            logger.info(f"⏭️ سفارش {order_id} قبلاً پردازش شده است")
+            metrics.inc('orders_total', source='webhook', state='duplicate')
+            return True
         
-        return True
+        try:
+            state, rendered, failed = generate_and_print_labels(order_data)
+        except Exception as e:
+            ledger.release(order_id, FAILED, error=str(e))
+            raise
+        ledger.record_labels(order_id, rendered, PRINTED if state == PRINTED else RENDERED)
+        ledger.record_labels(order_id, failed, FAILED)
+        ledger.release(order_id, state, error='label rendering failed' if state == FAILED else None)
+        metrics.inc('orders_total', source='webhook', state=state)
+        return state != FAILED
         
     except Exception as e:
         logger.error(f"❌ خطا در پردازش سفارش {order_data.get('id', 'نامشخص')}: {e}")
+        metrics.inc('orders_total', source='webhook', state=FAILED)
+        metrics.inc('failures_total', stage='order')
         return False
 
+def process_queued_job(payload: Dict[str, Any]) -> bool:
+    """handler صف: سفارش webhook، یا سفارش تستی که پروسه دیگری به صف داده است"""
+    if 'test_order' in payload:
+        return process_new_order(payload['test_order'], use_ledger=False)
+    return process_new_order(payload)
+
+def generate_and_print_labels(order_data: Dict[str, Any]) -> Tuple[str, List[LabelRecord], List[LabelRecord]]:
+    """
+    تولید و چاپ لیبل‌های سفارش پرداخت‌شده
+    
+    Returns:
+        (وضعیت سفارش در دفتر، لیبل‌های رسم‌شده، لیبل‌های ناموفق)
+    """
+    order_id = order_data.get('id')
+    printer = get_printer_backend()
+    
+    # ایجاد پوشه خروجی
+    os.makedirs(LABEL_CONFIG['output_dir'], exist_ok=True)
+    
+    # لینک محصولات برای QR لیبل جزئیات
+    sync_order_products(order_data)
+    
+    # بررسی نوع سفارش
+    if is_mixed_order(order_data):
+        logger.info(f"🔀 سفارش {order_id} یک سفارش میکس است - تولید برچسب میکس...")
+        
+        # تولید لیبل میکس
+        mixed_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_mixed{label_extension()}"
+        mixed_record = (mixed_label_path, 'mixed', 1, template_version('mixed'))
+        mixed_img = get_render_executor().submit('mixed', order_data, mixed_label_path).result()
+        if mixed_img is None:
+            logger.error(f"❌ تولید لیبل میکس سفارش {order_id} ناموفق بود")
+            return FAILED, [], [mixed_record]
+        
+        logger.info(f"✅ لیبل میکس سفارش {order_id} با موفقیت تولید شد")
+        logger.info(f"   📁 لیبل میکس: {mixed_label_path}")
+        
+        # چاپ لیبل میکس
+        printed = False
+        if printer.ready():
+            printed = printer.print_job([(mixed_img, 1, 'mixed')], title=f"Offer Coffee - order {order_id}")
+        else:
+            logger.info(f"💾 چاپگر آماده نیست - لیبل میکس سفارش {order_id} فقط ذخیره شد")
+        return (PRINTED if printed else RENDERED), [mixed_record], []
+    
+    logger.info(f"📦 سفارش {order_id} یک سفارش عادی است - تولید برچسب‌های معمولی...")
+    
+    # تولید لیبل‌های اصلی (back) برای هر محصول
+    line_items = order_data.get('line_items', [])
+    logger.info(f"📋 {len(line_items)} محصول در سفارش یافت شد")
+    
+    # هر لیبل یکتا یک بار رسم و به تعداد quantity چاپ می‌شود: (مسیر، تعداد نسخه)
+    all_labels = []
+    render_jobs = []
+    
+    # لیبل پشت فقط به شماره سفارش وابسته است؛ برای کل سفارش یک بار رسم می‌شود
+    back_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_back{label_extension()}"
+    
+    for i, item in enumerate(line_items):
+        quantity = int(item.get('quantity', 1))
+        logger.info(f"📦 محصول {i+1}: {item.get('name', 'نامشخص')} - تعداد: {quantity}")
+        if quantity <= 0:
+            continue
+        
+        # ایجاد کپی از order_data با فقط این محصول
+        single_product_order = order_data.copy()
+        single_product_order['line_items'] = [item]
+        
+        if not render_jobs:
+            render_jobs.append(('main', single_product_order, back_label_path))
+        all_labels.append((back_label_path, quantity))
+        
+        details_label_path = f"{LABEL_CONFIG['output_dir']}/order_{order_id}_details_{i+1}{label_extension()}"
+        render_jobs.append(('details', single_product_order, details_label_path))
+        all_labels.append((details_label_path, quantity))
+    
+    # رندر موازی لیبل‌ها
+    logger.info(f"🏷️ رندر {len(render_jobs)} لیبل برای سفارش {order_id}...")
+    results = get_render_executor().render_many(render_jobs)
+    images = {path: img for (_, _, path), img in zip(render_jobs, results) if img is not None}
+    failed_paths = {path for _, _, path in render_jobs if path not in images}
+    
+    # رکورد لیبل‌ها برای دفتر سفارش‌ها (تعداد نسخه هر مسیر = مجموع نسخه‌ها)
+    kinds = {path: kind for kind, _, path in render_jobs}
+    copies_by_path: Dict[str, int] = {}
+    for path, copies in all_labels:
+        copies_by_path[path] = copies_by_path.get(path, 0) + copies
+    records = [(path, kinds[path], copies_by_path[path], template_version(kinds[path])) for path in kinds]
+    rendered_records = [r for r in records if r[0] in images]
+    failed_records = [r for r in records if r[0] in failed_paths]
+    
+    if failed_paths:
+        logger.warning(f"⚠️ {len(failed_paths)} لیبل سفارش {order_id} رندر نشد")
+        all_labels = [(path, copies) for path, copies in all_labels if path not in failed_paths]
+    rendered = len(render_jobs) - len(failed_paths)
+    if not all_labels:
+        # سفارش بدون آیتم قابل چاپ فقط وقتی ناموفق است که رندر لیبل‌هایش شکست خورده باشد
+        return (FAILED if failed_paths else RENDERED), rendered_records, failed_records
+    
+    copies_total = sum(copies for _, copies in all_labels)
+    logger.info(f"📊 سفارش {order_id}: {rendered} لیبل رسم شد، {copies_total} نسخه برای چاپ")
+    
+    # چاپ تمام لیبل‌های این سفارش در یک کار چندصفحه‌ای (بدون تداخل با سفارش‌های تردهای دیگر)
+    # مثل cron: بدون چاپگر آماده، سفارش RENDERED می‌ماند تا بعداً چاپ شود
+    printed = False
+    if printer.ready():
+        logger.info(f"🖨️ شروع چاپ {copies_total} لیبل برای سفارش {order_id}...")
+        pages = [(images[path], copies, kinds[path]) for path, copies in all_labels]
+        printed = printer.print_job(pages, title=f"Offer Coffee - order {order_id}")
+        if not printed:
+            logger.warning(f"⚠️ لیبل‌های سفارش {order_id} چاپ نشدند")
+    else:
+        logger.info(f"💾 چاپگر آماده نیست - لیبل‌های سفارش {order_id} فقط ذخیره شدند")
+    
+    logger.info(f"✅ تمام لیبل‌های سفارش {order_id} پردازش شدند")
+    return (PRINTED if printed else RENDERED), rendered_records, failed_records
+
 @app.route('/webhook/new-order', methods=['POST'])
 @app.route('/webhook/new-order/', methods=['POST'])  # پشتیبانی از URL با اسلش
 def handle_new_order():
@@ -314,8 +438,11 @@ def handle_new_order():
         signature = request.headers.get('X-WC-Webhook-Signature')
         
         # تأیید امضا
-        if not verify_webhook_signature(request.data, signature, WEBHOOK_SECRET):
+        with get_metrics().timer('signature'):
+            valid = verify_webhook_signature(request.data, signature, WEBHOOK_SECRET)
+        if not valid:
             logger.warning("❌ امضای webhook نامعتبر")
+            get_metrics().inc('failures_total', stage='signature')
             return jsonify({"error": "Invalid signature", "received_signature": signature}), 403
         
         # دریافت داده‌های سفارش
@@ -327,24 +454,39 @@ def handle_new_order():
         order_id = order_data.get('id')
         logger.info(f"📨 دریافت webhook برای سفارش: {order_id}")
         
-        # پردازش سفارش
-        if process_new_order(order_data):
-            logger.info(f"✅ سفارش {order_id} با موفقیت پردازش شد")
-            return jsonify({"status": "success", "order_id": order_id, "message": "Labels generated successfully"}), 200
-        else:
-            # بررسی دلیل عدم پردازش
-            if not is_payment_completed(order_data):
-                logger.warning(f"⚠️ سفارش {order_id} پرداخت نشده - لیبل تولید نشد")
-                return jsonify({"status": "skipped", "order_id": order_id, "message": "Order not paid - labels not generated"}), 200
-            else:
-                logger.error(f"❌ خطا در پردازش سفارش {order_id}")
-                return jsonify({"status": "error", "order_id": order_id, "message": "Processing failed"}), 500
+        # سفارش پرداخت‌نشده وارد صف نمی‌شود
+        with get_metrics().timer('payment_check'):
+            paid = is_payment_completed(order_data)
+        if not paid:
+            logger.warning(f"⚠️ سفارش {order_id} پرداخت نشده - لیبل تولید نشد")
+            return jsonify({"status": "skipped", "order_id": order_id, "message": "Order not paid - labels not generated"}), 200
+        
+        # ذخیره در صف و پاسخ فوری؛ تولید و چاپ در پس‌زمینه انجام می‌شود
+        delivery_id = request.headers.get('X-WC-Webhook-Delivery-ID')
+        queue = get_job_queue()
+        job_id = queue.enqueue(order_data, dedupe_key=f"delivery:{delivery_id}" if delivery_id else None)
+        if job_id is None:
+            logger.info(f"⏭️ webhook تکراری برای سفارش {order_id} (delivery {delivery_id})")
+            return jsonify({"status": "duplicate", "order_id": order_id, "message": "Delivery already queued"}), 202
+        notify_job_workers()
+        logger.info(f"📥 سفارش {order_id} در صف قرار گرفت (کار {job_id})")
+        return jsonify({"status": "queued", "order_id": order_id, "job_id": job_id, "message": "Order queued for label generation"}), 202
             
     except Exception as e:
         logger.error(f"❌ خطای غیرمنتظره در webhook: {e}")
         logger.error(f"❌ جزئیات خطا: {str(e)}")
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
+@app.route('/webhook/jobs', methods=['GET'])
+def job_statuses():
+    """وضعیت کارهای صف: /webhook/jobs?ids=1,2,3 (حداکثر ۵۰۰ شناسه)"""
+    try:
+        ids = [int(v) for v in request.args.get('ids', '').split(',') if v.strip()]
+    except ValueError:
+        return jsonify({"error": "Invalid job ids"}), 400
+    statuses = get_job_queue().statuses(ids)
+    return jsonify({str(job_id): status for job_id, status in statuses.items()})
+
 @app.route('/webhook/test', methods=['GET'])
 def test_webhook():
     """تست webhook"""
@@ -367,8 +509,14 @@ def test_order_without_signature():
         order_id = order_data.get('id')
         logger.info(f"🧪 تست سفارش (بدون امضا): {order_id}")
         
-        # پردازش سفارش
-        if process_new_order(order_data):
+        if not _queue_consumer:
+            # چاپ فقط در پروسه مصرف‌کننده صف انجام می‌شود
+            job_id = get_job_queue().enqueue({'id': order_id, 'test_order': order_data})
+            notify_job_workers()
+            return jsonify({"status": "queued", "order_id": order_id, "job_id": job_id, "message": "Test order queued for the printing process"}), 202
+        
+        # پردازش سفارش (بدون ثبت در دفتر سفارش‌ها تا تست‌های تکراری رد نشوند)
+        if process_new_order(order_data, use_ledger=False):
             logger.info(f"✅ سفارش تست {order_id} با موفقیت پردازش شد")
             return jsonify({"status": "success", "order_id": order_id, "message": "Test order processed successfully"}), 200
         else:
@@ -384,8 +532,7 @@ def check_payment_status(order_id):
     """بررسی وضعیت پرداخت یک سفارش خاص"""
     try:
         # دریافت اطلاعات سفارش از WooCommerce
-        api = WooCommerceAPI()
-        order_data = api.get_order(order_id)
+        order_data = get_api().get_order_details(order_id)
         
         if not order_data:
             return jsonify({"error": "Order not found"}), 404
@@ -435,9 +582,27 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "printing_available": PRINTING_AVAILABLE
+        "printing_available": get_printer_backend().available,
+        "font_cache": font_cache_stats(),
+        "template_cache": template_cache_stats(),
+        "qr_cache": qr_cache_stats(),
+        "text_cache": text_cache_stats(),
+        "layouts": layout_stats(),
+        "pid": os.getpid(),
+        "job_consumer": _workers is not None,
+        "job_queue": _queue.stats() if _queue is not None else None,
+        "orders": get_ledger().stats(),
+        "render": get_render_executor().stats(),
+        "archive": get_archiver().stats(),
+        "printer": get_printer_backend().stats(),
+        "woocommerce": get_api().latency_stats() if _api is not None else None
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """متریک‌ها در قالب متنی Prometheus"""
+    return Response(get_metrics().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/', methods=['GET'])
 def home():
     """صفحه اصلی"""
@@ -450,7 +615,9 @@ def home():
             "test_order": "/webhook/test-order",
             "verify_signature": "/webhook/verify-signature",
             "health": "/health",
-            "check_payment": "/check-payment/<order_id>"
+            "metrics": "/metrics",
+            "check_payment": "/check-payment/<order_id>",
+            "job_statuses": "/webhook/jobs?ids=<job_id>,..."
         },
         "status": "running",
         "webhook_secret_configured": WEBHOOK_SECRET != "your_webhook_secret_here"
@@ -458,16 +625,12 @@ def home():
 
 if __name__ == '__main__':
     # بررسی تنظیمات
-    if WEBHOOK_SECRET == "your_webhook_secret_here":
-        logger.warning("⚠️ لطفاً WEBHOOK_SECRET را در فایل تنظیم کنید")
-    
-    if (WOOCOMMERCE_CONFIG['site_url'] == 'https://yoursite.com' or 
-        WOOCOMMERCE_CONFIG['consumer_key'] == 'ck_your_consumer_key_here' or
-        WOOCOMMERCE_CONFIG['consumer_secret'] == 'cs_your_consumer_secret_here'):
-        logger.error("❌ لطفاً تنظیمات WooCommerce را در فایل config.py تکمیل کنید")
+    if not check_settings():
         sys.exit(1)
     
-    logger.info("🚀 شروع سرور webhook...")
+    logger.info("🚀 شروع سرور webhook (سرور توسعه Flask؛ برای تولید: python wsgi.py)...")
+    
+    start_background()
     logger.info("📡 سرور در حال اجرا روی http://0.0.0.0:5443")
     logger.info("🔗 آدرس webhook: http://your-server:5443/webhook/new-order")
     
@@ -1,62 +1,239 @@
 import requests
 import json
+import threading
+import time
+from collections import deque
 from datetime import datetime
 import jdatetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import WOOCOMMERCE_CONFIG
+from metrics import get_metrics
 
 class WooCommerceAPI:
-    def __init__(self, site_url, consumer_key, consumer_secret):
+    def __init__(self, site_url, consumer_key, consumer_secret,
+                 connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff_factor=None, pool_size=None):
         self.site_url = site_url.rstrip('/')
         self.consumer_key = consumer_key
         self.consumer_secret = consumer_secret
         self.api_url = f"{self.site_url}/wp-json/wc/v3"
-        
+
+        # تنظیمات اتصال (پیش‌فرض‌ها از config.py)
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else WOOCOMMERCE_CONFIG.get('connect_timeout', 5),
+            read_timeout if read_timeout is not None else WOOCOMMERCE_CONFIG.get('read_timeout', 30),
+        )
+        self.max_retries = max_retries if max_retries is not None else WOOCOMMERCE_CONFIG.get('max_retries', 3)
+        self.backoff_factor = backoff_factor if backoff_factor is not None else WOOCOMMERCE_CONFIG.get('backoff_factor', 0.5)
+        self.pool_size = pool_size if pool_size is not None else WOOCOMMERCE_CONFIG.get('pool_size', 10)
+
+        self.session = self._build_session()
+
+        # ثبت زمان هر درخواست برای محاسبه هزینه ووکامرس به ازای هر سفارش
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._totals = {'requests': 0, 'errors': 0, 'seconds': 0.0}
+
+    def _build_session(self):
+        """نشست پایدار با connection pool، keep-alive و تلاش مجدد با backoff نمایی"""
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def _get(self, endpoint, params=None):
+        """ارسال درخواست GET با احراز هویت، timeout و ثبت زمان پاسخ"""
+        url = f"{self.api_url}/{endpoint}"
+        query = {
+            'consumer_key': self.consumer_key,
+            'consumer_secret': self.consumer_secret
+        }
+        if params:
+            query.update(params)
+
+        started = time.perf_counter()
+        status = None
+        try:
+            response = self.session.get(url, params=query, timeout=self.timeout)
+            status = response.status_code
+            response.raise_for_status()
+            return response
+        finally:
+            self._record(endpoint, time.perf_counter() - started, status)
+
+    def _record(self, endpoint, seconds, status):
+        # شناسه‌ها از نام endpoint حذف می‌شوند تا آمار قابل تجمیع باشد
+        name = '/'.join('{id}' if part.isdigit() else part for part in endpoint.split('/'))
+        failed = status is None or status >= 400
+        with self._stats_lock:
+            self._latencies.append((name, seconds, status))
+            self._totals['requests'] += 1
+            self._totals['seconds'] += seconds
+            if failed:
+                self._totals['errors'] += 1
+        get_metrics().observe('woocommerce_fetch', seconds)
+        if failed:
+            get_metrics().inc('failures_total', stage='woocommerce_fetch', endpoint=name)
+
+    def latency_stats(self):
+        """خلاصه زمان درخواست‌ها (کل و به تفکیک endpoint)"""
+        with self._stats_lock:
+            per_endpoint = {}
+            for name, seconds, status in self._latencies:
+                entry = per_endpoint.setdefault(name, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+                entry['count'] += 1
+                entry['total_s'] += seconds
+                entry['max_s'] = max(entry['max_s'], seconds)
+            for entry in per_endpoint.values():
+                entry['avg_s'] = round(entry['total_s'] / entry['count'], 4)
+                entry['total_s'] = round(entry['total_s'], 4)
+                entry['max_s'] = round(entry['max_s'], 4)
+            return {
+                'requests': self._totals['requests'],
+                'errors': self._totals['errors'],
+                'total_s': round(self._totals['seconds'], 4),
+                'endpoints': per_endpoint,
+            }
+
+    def reset_latency_stats(self):
+        """شروع دوباره آمار زمان درخواست‌ها (مثلاً در هر دور حالت دائمی cron)"""
+        with self._stats_lock:
+            self._latencies.clear()
+            self._totals = {'requests': 0, 'errors': 0, 'seconds': 0.0}
+
+    def close(self):
+        self.session.close()
+
     def get_orders(self, status='processing', per_page=10):
         """دریافت سفارشات از WooCommerce"""
-        url = f"{self.api_url}/orders"
         params = {
-            'consumer_key': self.consumer_key,
-            'consumer_secret': self.consumer_secret,
             'status': status,
             'per_page': per_page,
             'orderby': 'date',
             'order': 'desc'
         }
-        
+
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = self._get('orders', params)
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"خطا در دریافت سفارشات: {e}")
             return []
-    
-    def get_order_details(self, order_id):
-        """دریافت جزئیات یک سفارش خاص"""
-        url = f"{self.api_url}/orders/{order_id}"
+
+    def iter_orders(self, statuses=('processing',), modified_after=None, per_page=100):
+        """
+        پیمایش تمام صفحات سفارشات (چند وضعیت در یک درخواست)
+
+        Args:
+            statuses: لیست وضعیت‌ها (مثلاً processing و on-hold)
+            modified_after: فقط سفارشاتی که بعد از این زمان (GMT، ISO8601) تغییر کرده‌اند
+            per_page: تعداد سفارش در هر صفحه (حداکثر 100)
+
+        Yields:
+            سفارش‌ها به ترتیب زمان تغییر (قدیمی‌ترین ابتدا)
+
+        خطاهای شبکه (RequestException) به فراخوان منتقل می‌شوند تا نشانگر
+        همگام‌سازی در صورت ناقص بودن پیمایش جلو نرود.
+        """
         params = {
-            'consumer_key': self.consumer_key,
-            'consumer_secret': self.consumer_secret
+            'status': ','.join(statuses) if not isinstance(statuses, str) else statuses,
+            'per_page': per_page,
+            'orderby': 'modified',
+            'order': 'asc'
         }
-        
+        if modified_after:
+            params['modified_after'] = modified_after
+            params['dates_are_gmt'] = 'true'
+
+        page = 1
+        while True:
+            params['page'] = page
+            response = self._get('orders', params)
+            orders = response.json() or []
+            for order in orders:
+                yield order
+
+            try:
+                total_pages = int(response.headers.get('X-WP-TotalPages', 0))
+            except ValueError:
+                total_pages = 0
+            if not orders or len(orders) < per_page or (total_pages and page >= total_pages):
+                break
+            page += 1
+
+    def get_order_details(self, order_id):
+        """دریافت جزئیات یک سفارش خاص"""
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = self._get(f'orders/{order_id}')
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"خطا در دریافت جزئیات سفارش {order_id}: {e}")
             return None
 
+    def get_orders_by_ids(self, order_ids, per_page=100):
+        """
+        دریافت گروهی چند سفارش با orders?include=... (هر درخواست حداکثر per_page سفارش)
+
+        Returns:
+            (لیست سفارش‌ها، تعداد درخواست‌های ارسال‌شده)؛ در صورت خطای شبکه
+            سفارش‌های همان دسته در لیست نیستند
+        """
+        ids = list(dict.fromkeys(int(oid) for oid in order_ids))
+        orders = []
+        requests_made = 0
+        for start in range(0, len(ids), per_page):
+            chunk = ids[start:start + per_page]
+            params = {
+                'include': ','.join(str(oid) for oid in chunk),
+                'per_page': len(chunk),
+                'status': 'any'
+            }
+            requests_made += 1
+            try:
+                response = self._get('orders', params)
+                orders.extend(response.json() or [])
+            except requests.exceptions.RequestException as e:
+                print(f"خطا در دریافت گروهی سفارشات ({len(chunk)} سفارش): {e}")
+        return orders, requests_made
+
     def get_product(self, product_id: int):
         """دریافت جزئیات یک محصول (برای گرفتن permalink/slug)"""
-        url = f"{self.api_url}/products/{product_id}"
+        try:
+            response = self._get(f'products/{product_id}')
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"خطا در دریافت محصول {product_id}: {e}")
+            return None
+
+    def get_products(self, include=None, modified_after=None, per_page=100, page=1):
+        """دریافت گروهی محصولات (بر اساس لیست شناسه‌ها یا تاریخ آخرین تغییر)"""
         params = {
-            'consumer_key': self.consumer_key,
-            'consumer_secret': self.consumer_secret
+            'per_page': per_page,
+            'page': page
         }
+        if include:
+            params['include'] = ','.join(str(pid) for pid in include)
+        if modified_after:
+            params['modified_after'] = modified_after
+            params['dates_are_gmt'] = 'true'
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            response = self._get('products', params)
             return response.json()
         except requests.exceptions.RequestException as e:
-            print(f"خطا در دریافت محصول {product_id}: {e}")
+            print(f"خطا در دریافت محصولات: {e}")
             return None
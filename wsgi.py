@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اجرای سرور webhook با وب‌سرور تولید (به جای سرور توسعه Flask)
+
+gunicorn (لینوکس): برنامه با preload در پروسه اصلی بارگذاری می‌شود و فونت‌ها،
+لایه‌های ثابت لیبل‌ها (با QR) و برنامه‌های رسم قبل از fork آماده می‌شوند تا
+همه پروسه‌ها آن‌ها را copy-on-write به اشتراک بگذارند. همه پروسه‌ها webhook
+می‌پذیرند و کار به صف اضافه می‌کنند، ولی فقط یک پروسه (دارنده قفل فایل
+job_consumer.lock کنار صف) تردهای صف، رندر و چاپ را اجرا می‌کند تا چاپگر
+(مثلاً یک اتصال EZPL روی پورت 9100) در هر لحظه فقط یک کار از یک پروسه بگیرد.
+اگر آن پروسه خارج شود، پروسه دیگری قفل را می‌گیرد و کارهای نیمه‌کاره را
+دوباره در صف قرار می‌دهد. متریک‌ها و آمار /health مخصوص همان پروسه‌ای است
+که درخواست را پاسخ داده است.
+
+waitress (ویندوز): یک پروسه با چند ترد؛ رندر در پروسه‌های render_executor.
+
+استفاده:
+    python wsgi.py [--server auto|gunicorn|waitress|flask] [--workers 4] [--threads 4]
+    waitress-serve --port 5443 --call wsgi:create_app
+"""
+
+import argparse
+import gc
+import os
+import sys
+import threading
+
+# Ensure we run from the project root (so relative font files work)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+os.chdir(BASE_DIR)
+
+from config import QUEUE_CONFIG, SERVER_CONFIG
+from label_archive import get_archiver
+from render_executor import default_workers, prewarm, shutdown_render_executor
+from webhook_server import app, check_settings, logger, start_background, stop_job_workers
+
+try:
+    import fcntl
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    # gunicorn روی ویندوز اجرا نمی‌شود
+    GUNICORN_AVAILABLE = False
+
+try:
+    import waitress
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
+SERVERS = ('gunicorn', 'waitress', 'flask')
+
+
+def create_app():
+    """برنامه WSGI برای وب‌سرورهای تک‌پروسه‌ای (waitress-serve --call wsgi:create_app)"""
+    start_background()
+    return app
+
+
+def preload_app():
+    """
+    برنامه WSGI برای gunicorn با preload (در پروسه اصلی، قبل از fork)
+
+    تردها، اتصال‌های SQLite و پروسه‌های رندر اینجا ساخته نمی‌شوند؛ بعد از fork
+    در پروسه مصرف‌کننده صف شروع می‌شوند.
+    """
+    prewarm()
+    # اشیای بارگذاری‌شده از GC بیرون می‌مانند تا شمارش GC صفحات مشترک را کپی نکند
+    gc.freeze()
+    return app
+
+
+def resolve_server(name=None):
+    name = name or SERVER_CONFIG.get('server', 'auto')
+    if name == 'auto':
+        if GUNICORN_AVAILABLE:
+            return 'gunicorn'
+        return 'waitress' if WAITRESS_AVAILABLE else 'flask'
+    if name == 'gunicorn' and not GUNICORN_AVAILABLE:
+        raise RuntimeError("gunicorn نصب نیست (pip install gunicorn؛ روی ویندوز از waitress استفاده کنید)")
+    if name == 'waitress' and not WAITRESS_AVAILABLE:
+        raise RuntimeError("waitress نصب نیست (pip install waitress)")
+    if name not in SERVERS:
+        raise ValueError(f"وب‌سرور نامعتبر: {name}")
+    return name
+
+
+# فایل قفل مصرف‌کننده صف (تا خروج پروسه باز می‌ماند)
+_consumer_lock_file = None
+
+
+def consumer_lock_path() -> str:
+    directory = os.path.dirname(QUEUE_CONFIG.get('db_path', 'data/jobs.db')) or '.'
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, 'job_consumer.lock')
+
+
+def _consume_when_elected(render_workers: int) -> None:
+    """انتظار برای قفل مصرف‌کننده صف (تا خروج دارنده قبلی) و سپس شروع پردازش در این پروسه"""
+    global _consumer_lock_file
+    lock_file = open(consumer_lock_path(), 'a')
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    _consumer_lock_file = lock_file
+    logger.info(f"👑 پروسه {os.getpid()} مصرف‌کننده صف و چاپ است")
+    start_background(render_workers)
+
+
+if GUNICORN_AVAILABLE:
+    class GunicornServer(BaseApplication):
+        """اجرای gunicorn از داخل پایتون با تنظیمات SERVER_CONFIG"""
+
+        def __init__(self, options, render_workers):
+            self.options = options
+            self.render_workers = render_workers
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+            self.cfg.set('post_fork', self._post_fork)
+            self.cfg.set('worker_exit', self._worker_exit)
+
+        def load(self):
+            return preload_app()
+
+        def _post_fork(self, server, worker):
+            # همه پروسه‌ها فقط به صف اضافه می‌کنند تا یکی قفل مصرف‌کننده را بگیرد
+            start_background(consume_jobs=False)
+            threading.Thread(target=_consume_when_elected, args=(self.render_workers,),
+                             name="queue-consumer-election", daemon=True).start()
+
+        @staticmethod
+        def _worker_exit(server, worker):
+            stop_job_workers()
+            shutdown_render_executor()
+            get_archiver().flush()
+
+
+def serve(server=None, host=None, port=None, workers=None, threads=None, render_workers=None):
+    """اجرای سرور webhook با وب‌سرور انتخاب‌شده (تا توقف)"""
+    server = resolve_server(server)
+    host = host or SERVER_CONFIG.get('host', '0.0.0.0')
+    port = int(port or SERVER_CONFIG.get('port', 5443))
+    threads = int(threads or SERVER_CONFIG.get('threads', 4))
+
+    if server == 'gunicorn':
+        workers = int(workers or SERVER_CONFIG.get('workers', 0) or default_workers())
+        render_workers = int(render_workers or SERVER_CONFIG.get('render_workers', 1))
+        logger.info(f"🚀 gunicorn روی http://{host}:{port} - {workers} پروسه × {threads} ترد، "
+                    f"صف و چاپ در یک پروسه با {render_workers} پروسه رندر")
+        options = {
+            'bind': f"{host}:{port}",
+            'workers': workers,
+            'threads': threads,
+            'worker_class': 'gthread',
+            'preload_app': True,
+            'timeout': int(SERVER_CONFIG.get('timeout', 60)),
+            'graceful_timeout': int(SERVER_CONFIG.get('timeout', 60)),
+        }
+        GunicornServer(options, render_workers).run()
+        return
+
+    start_background(render_workers)
+    if server == 'waitress':
+        logger.info(f"🚀 waitress روی http://{host}:{port} - {threads} ترد")
+        waitress.serve(app, host=host, port=port, threads=threads)
+    else:
+        logger.warning(f"⚠️ اجرا با سرور توسعه Flask روی http://{host}:{port} (برای تولید gunicorn یا waitress را نصب کنید)")
+        app.run(host=host, port=port, debug=False, threaded=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offer Coffee webhook server (production WSGI)")
+    parser.add_argument("--server", choices=('auto',) + SERVERS, help="پیش‌فرض: SERVER_CONFIG['server']")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, help="پروسه‌های gunicorn")
+    parser.add_argument("--threads", type=int, help="ترد هر پروسه")
+    parser.add_argument("--render-workers", type=int, help="پروسه‌های رندر (در پروسه مصرف‌کننده صف)")
+    args = parser.parse_args(argv)
+
+    if not check_settings():
+        return 1
+    serve(args.server, args.host, args.port, args.workers, args.threads, args.render_workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())